@@ -0,0 +1,398 @@
+"""An in-process stand-in for the WoTKit API, used by the benchmarks.
+
+It serves /sensors (with fields and data), /subscribe, /control/sub and /data from an in-memory store over HTTP/1.1
+keep-alive connections, with one thread per connection, or in process as a WSGI application. Authentication is
+accepted but not checked.
+
+Example:
+server = FakeWotkit()
+api_url = server.start()
+...
+server.stop()
+
+or, without a socket:
+proxy = wotkitpy.WotkitProxy(api_url = server.api_url, transport = wotkitpy.InMemoryTransport(server.wsgi_app))
+"""
+
+import json
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs
+
+_EPOCH = datetime(1970, 1, 1)
+
+def _iso(millis):
+    return (_EPOCH + timedelta(milliseconds = millis)).strftime("%Y-%m-%dT%H:%M:%S.") + "%03dZ" % (millis % 1000)
+
+def _millis(timestamp):
+    try:
+        return int(timestamp)
+    except ValueError:
+        value = timestamp.rstrip("Z")
+        dt = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f" if "." in value else "%Y-%m-%dT%H:%M:%S")
+        delta = dt - _EPOCH
+        return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+class WotkitStore():
+    """The sensors, readings, subscriptions and actuator messages of a FakeWotkit.
+
+    Readings sent to sensors whose name starts with "sink" are parsed but not kept, so write benchmarks can run for
+    any time without the store growing."""
+
+    def __init__(self):
+        self.lock = threading.Condition()
+        self.sensors = {}
+        self.sensors_by_name = {}
+        self.readings = {}
+        self.subscriptions = set()
+        self.control_subscriptions = {}
+        self.next_id = 1
+
+    def _new_id(self):
+        new_id = self.next_id
+        self.next_id += 1
+        return new_id
+
+    def find_sensor(self, sensor_id):
+        """Returns the sensor with an ID, name or owner.name of sensor_id, or None."""
+        if sensor_id.isdigit():
+            return self.sensors.get(int(sensor_id))
+        return self.sensors_by_name.get(sensor_id.split(".")[-1])
+
+    def register(self, registration):
+        """Adds a sensor, returning False if a sensor with its name exists."""
+        with self.lock:
+            if self.find_sensor(str(registration.get("name", ""))) is not None:
+                return False
+            sensor = dict(registration)
+            sensor["id"] = self._new_id()
+            sensor.setdefault("owner", "benchmark")
+            sensor.setdefault("fields", [{"name": "value", "type": "NUMBER"}, {"name": "lat", "type": "NUMBER"},
+                                         {"name": "lng", "type": "NUMBER"}, {"name": "message", "type": "STRING"}])
+            self.sensors[sensor["id"]] = sensor
+            self.sensors_by_name[sensor.get("name")] = sensor
+            self.readings[sensor["id"]] = []
+            return True
+
+    def add_readings(self, sensor, readings):
+        now = int(time.time() * 1000)
+        readings = [ dict(reading, sensor_id = sensor["id"], timestamp = _millis(reading.get("timestamp", now))) for reading in readings ]
+        if str(sensor.get("name", "")).startswith("sink"):
+            return
+        with self.lock:
+            stored = self.readings[sensor["id"]]
+            in_order = not stored or not readings or stored[-1]["timestamp"] <= readings[0]["timestamp"]
+            for reading in readings:
+                reading["id"] = self._new_id()
+                stored.append(reading)
+            if not in_order or any(earlier["timestamp"] > later["timestamp"] for earlier, later in zip(readings, readings[1:])):
+                stored.sort(key = lambda reading: reading["timestamp"])
+
+    def query_readings(self, sensor_ids, params):
+        """Returns the readings of sensor_ids selected by the start, end, after, afterE, before, beforeE and reverse parameters."""
+        with self.lock:
+            readings = []
+            for sensor_id in sensor_ids:
+                readings.extend(self.readings.get(sensor_id, []))
+        if len(sensor_ids) > 1:
+            readings.sort(key = lambda reading: reading["timestamp"])
+        now = int(time.time() * 1000)
+        start = int(params["start"]) if "start" in params else None
+        if "end" in params:
+            readings = [ reading for reading in readings if (start is None or reading["timestamp"] >= start) and reading["timestamp"] <= int(params["end"]) ]
+        elif "after" in params:
+            readings = [ reading for reading in readings if start < reading["timestamp"] <= start + int(params["after"]) ]
+        elif "afterE" in params:
+            readings = [ reading for reading in readings if reading["timestamp"] > start ][:int(params["afterE"])]
+        elif "before" in params:
+            end = now if start is None else start
+            readings = [ reading for reading in readings if end - int(params["before"]) <= reading["timestamp"] <= end ]
+        elif "beforeE" in params:
+            end = now if start is None else start
+            readings = [ reading for reading in readings if reading["timestamp"] <= end ]
+            readings = readings[max(0, len(readings) - int(params["beforeE"])):]
+        else:
+            readings = readings[-1000:]
+        if params.get("reverse") in ("true", "True"):
+            readings = readings[::-1]
+        return [ dict(reading, timestamp = _iso(reading["timestamp"])) for reading in readings ]
+
+class _Exchange():
+    """A request to the WoTKit API and the response of the store to it."""
+
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+        self.status = None
+        self.response = b""
+        self.content_type = "application/json;charset=UTF-8"
+
+    def _send(self, status, body = None):
+        self.status = status
+        self.response = json.dumps(body).encode("utf-8") if body is not None else b""
+
+    def _read_body(self):
+        encoding = self.headers.get("content-encoding")
+        if encoding in ("gzip", "deflate"):
+            return zlib.decompress(self.body, 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS)
+        return self.body
+
+    def _json_body(self):
+        body = self._read_body()
+        if "x-www-form-urlencoded" in (self.headers.get("content-type") or ""):
+            return dict((key, values[0]) for key, values in parse_qs(body.decode("utf-8")).items())
+        return json.loads(body.decode("utf-8")) if body else None
+
+    def handle(self, store, prefix):
+        url = urlparse(self.path)
+        params = dict((key, values[0]) for key, values in parse_qs(url.query).items())
+        path = url.path[len(prefix):] if url.path.startswith(prefix) else url.path
+        try:
+            for pattern, handler in _ROUTES:
+                match = re.match(pattern, path)
+                if match:
+                    return handler(self, store, self.method, params, *match.groups())
+            self._send(404, {"error": {"message": "Not found: " + path}})
+        except Exception as e:
+            self._send(500, {"error": {"message": repr(e)}})
+
+    def sensors(self, store, method, params):
+        if method == "GET":
+            with store.lock:
+                sensors = sorted(store.sensors.values(), key = lambda sensor: sensor["id"])
+            if "text" in params:
+                sensors = [ sensor for sensor in sensors if params["text"] in sensor["name"] + " " + sensor.get("longName", "") ]
+            offset = int(params.get("offset", 0))
+            return self._send(200, sensors[offset:offset + int(params.get("limit", 1000))])
+        registrations = self._json_body()
+        if method == "POST":
+            return self._send(201 if store.register(registrations) else 409)
+        if method == "PUT":
+            # Like a bulk registration on the WoTKit, either every sensor is registered or none is
+            with store.lock:
+                names = [ str(registration.get("name", "")) for registration in registrations ]
+                if len(set(names)) < len(names) or any(store.find_sensor(name) is not None for name in names):
+                    return self._send(409, {"error": {"message": "Sensor exists"}})
+                for registration in registrations:
+                    store.register(registration)
+            return self._send(201)
+        self._send(405)
+
+    def sensor(self, store, method, params, sensor_id):
+        with store.lock:
+            sensor = store.find_sensor(sensor_id)
+            if sensor is None:
+                return self._send(404, {"error": {"message": "No sensor " + sensor_id}})
+            if method == "GET":
+                return self._send(200, sensor)
+            if method == "PUT":
+                store.sensors_by_name.pop(sensor.get("name"), None)
+                sensor.update(self._json_body())
+                store.sensors_by_name[sensor.get("name")] = sensor
+                return self._send(204)
+            if method == "DELETE":
+                del store.sensors[sensor["id"]]
+                store.sensors_by_name.pop(sensor.get("name"), None)
+                store.readings.pop(sensor["id"], None)
+                return self._send(204)
+        self._send(405)
+
+    def fields(self, store, method, params, sensor_id, field_name = None):
+        with store.lock:
+            sensor = store.find_sensor(sensor_id)
+            if sensor is None:
+                return self._send(404)
+            fields = sensor["fields"]
+            if field_name is None:
+                return self._send(200, fields)
+            matching = [ field for field in fields if field["name"] == field_name ]
+            if method == "GET":
+                return self._send(200, matching[0]) if matching else self._send(404)
+            if method == "PUT":
+                field = dict(self._json_body(), name = field_name)
+                sensor["fields"] = [ existing for existing in fields if existing["name"] != field_name ] + [field]
+                return self._send(204)
+            if method == "DELETE":
+                sensor["fields"] = [ existing for existing in fields if existing["name"] != field_name ]
+                return self._send(204)
+        self._send(405)
+
+    def data(self, store, method, params, sensor_id, timestamp = None):
+        with store.lock:
+            sensor = store.find_sensor(sensor_id)
+        if sensor is None:
+            return self._send(404)
+        if method == "GET":
+            return self._send(200, store.query_readings([sensor["id"]], params))
+        if method == "POST":
+            store.add_readings(sensor, [self._json_body()])
+            return self._send(201)
+        if method == "PUT":
+            store.add_readings(sensor, self._json_body())
+            return self._send(204)
+        if method == "DELETE":
+            with store.lock:
+                store.readings[sensor["id"]] = [ reading for reading in store.readings[sensor["id"]] if reading["timestamp"] != _millis(timestamp) ]
+            return self._send(204)
+        self._send(405)
+
+    def data_table(self, store, method, params, sensor_id):
+        with store.lock:
+            sensor = store.find_sensor(sensor_id)
+        if sensor is None:
+            return self._send(404)
+        readings = store.query_readings([sensor["id"]], params)
+        table = {"cols": [{"id": "timestamp", "type": "datetime"}, {"id": "value", "type": "number", "label": sensor.get("longName")}],
+                 "rows": [ {"c": [{"v": reading["timestamp"]}, {"v": reading.get("value")}]} for reading in readings ]}
+        self.status = 200
+        self.content_type = "text/javascript;charset=UTF-8"
+        self.response = ("google.visualization.Query.setResponse(%s);" % json.dumps({"status": "ok", "table": table}, ensure_ascii = False)).encode("utf-8")
+
+    def aggregated_data(self, store, method, params):
+        with store.lock:
+            sensor_ids = list(store.sensors)
+        self._send(200, store.query_readings(sensor_ids, params))
+
+    def subscriptions(self, store, method, params, sensor_id = None):
+        with store.lock:
+            if sensor_id is None:
+                return self._send(200, [ store.sensors[subscribed] for subscribed in sorted(store.subscriptions) if subscribed in store.sensors ])
+            sensor = store.find_sensor(sensor_id)
+            if sensor is None:
+                return self._send(404)
+            if method == "PUT":
+                store.subscriptions.add(sensor["id"])
+            elif method == "DELETE":
+                store.subscriptions.discard(sensor["id"])
+        self._send(204)
+
+    def control(self, store, method, params, target_id):
+        if method == "POST":
+            with store.lock:
+                sensor = store.find_sensor(target_id)
+                if sensor is None:
+                    return self._send(404)
+                subscription_id = store._new_id()
+                store.control_subscriptions[subscription_id] = (sensor["id"], [])
+            return self._send(200, {"subscription": subscription_id})
+        deadline = time.time() + min(float(params.get("wait", 0)), 20)
+        with store.lock:
+            subscription = store.control_subscriptions.get(int(target_id))
+            if subscription is None:
+                return self._send(404, {"error": {"message": "Subscription expired"}})
+            while not subscription[1] and time.time() < deadline:
+                store.lock.wait(deadline - time.time())
+            messages = list(subscription[1])
+            del subscription[1][:]
+        self._send(200, messages)
+
+    def message(self, store, method, params, sensor_id):
+        with store.lock:
+            sensor = store.find_sensor(sensor_id)
+            if sensor is None:
+                return self._send(404)
+            message = dict(params, sensor = sensor["id"], timestamp = _iso(int(time.time() * 1000)))
+            for subscribed_id, messages in store.control_subscriptions.values():
+                if subscribed_id == sensor["id"]:
+                    messages.append(message)
+            store.lock.notify_all()
+        self._send(200)
+
+_ROUTES = [
+    (r"^/sensors/?$", _Exchange.sensors),
+    (r"^/sensors/([^/]+)/fields(?:/([^/]+))?$", _Exchange.fields),
+    (r"^/sensors/([^/]+)/data(?:/([^/]+))?$", _Exchange.data),
+    (r"^/sensors/([^/]+)/message$", _Exchange.message),
+    (r"^/sensors/([^/]+)/dataTable$", _Exchange.data_table),
+    (r"^/sensors/([^/]+)$", _Exchange.sensor),
+    (r"^/subscribe(?:/([^/]+))?$", _Exchange.subscriptions),
+    (r"^/control/sub/([^/]+)$", _Exchange.control),
+    (r"^/data$", _Exchange.aggregated_data),
+]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, which would otherwise wait on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        headers = dict((name.lower(), value) for name, value in self.headers.items())
+        exchange = _Exchange(method, self.path, headers, self.rfile.read(length) if length else b"")
+        exchange.handle(self.server.store, self.server.prefix)
+        self.send_response(exchange.status)
+        self.send_header("Content-Type", exchange.content_type)
+        self.send_header("Content-Length", str(len(exchange.response)))
+        self.end_headers()
+        self.wfile.write(exchange.response)
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+class FakeWotkit():
+    """Serves the WoTKit API from a WotkitStore on a background thread."""
+
+    def __init__(self, host = "127.0.0.1", port = 0, prefix = "/api"):
+        self.store = WotkitStore()
+        self._server = _Server((host, port), _Handler)
+        self._server.store = self.store
+        self._server.prefix = prefix
+        self._thread = None
+        self.api_url = "http://%s:%d%s" % (self._server.server_address[0], self._server.server_address[1], prefix)
+
+    def start(self):
+        """Starts serving and returns the api_url to configure WotkitProxy with."""
+        self._thread = threading.Thread(target = self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.api_url
+
+    def stop(self):
+        """Stops serving and closes the socket. Also closes the socket of a FakeWotkit only used through wsgi_app."""
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def wsgi_app(self, environ, start_response):
+        """Serves the WoTKit API as a WSGI application, e.g. in process through wotkitpy.InMemoryTransport."""
+        length = int(environ.get("CONTENT_LENGTH") or 0)
+        headers = dict((name[5:].replace("_", "-").lower(), value) for name, value in environ.items() if name.startswith("HTTP_"))
+        if environ.get("CONTENT_TYPE"):
+            headers["content-type"] = environ["CONTENT_TYPE"]
+        path = environ.get("SCRIPT_NAME", "") + environ.get("PATH_INFO", "")
+        if environ.get("QUERY_STRING"):
+            path += "?" + environ["QUERY_STRING"]
+        exchange = _Exchange(environ["REQUEST_METHOD"], path, headers, environ["wsgi.input"].read(length) if length else b"")
+        exchange.handle(self.store, self._server.prefix)
+        start_response("%d %s" % (exchange.status, BaseHTTPRequestHandler.responses.get(exchange.status, ("",))[0]),
+                       [("Content-Type", exchange.content_type), ("Content-Length", str(len(exchange.response)))])
+        return [exchange.response]
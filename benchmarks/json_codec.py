@@ -0,0 +1,62 @@
+"""Micro-benchmark of the JSON codecs wotkitpy can use, on payloads shaped like those of each endpoint.
+
+Usage: python benchmarks/json_codec.py [readings]
+
+For every installed codec prints the time to encode the request body or decode the response body of each endpoint, and the speedup over the standard library."""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import wotkitpy
+
+def make_sensor(sensor_id):
+    return {"id": sensor_id, "name": "sensor_%d" % sensor_id, "longName": "Sensor %d" % sensor_id, "owner": "admin",
+            "description": "Benchmark sensor number %d" % sensor_id, "latitude": 49.26, "longitude": -123.25,
+            "visibility": "PUBLIC", "tags": ["benchmark", "traffic"], "lastUpdate": "2013-08-16T14:00:53.590Z",
+            "fields": [{"name": "value", "type": "NUMBER", "required": False, "longName": "Value"},
+                       {"name": "message", "type": "STRING", "required": False, "longName": "Message"}]}
+
+def make_reading(index):
+    return {"id": index, "sensor_id": 1, "timestamp": "2013-08-16T14:%02d:%02d.590Z" % (index // 60 % 60, index % 60),
+            "value": random.random() * 100, "lat": 49.26, "lng": -123.25, "message": "reading %d" % index}
+
+def main():
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    sensor = make_sensor(1)
+    payloads = [
+        ("get_sensor_by_id", "decode", sensor),
+        ("query_sensors", "decode", [ make_sensor(i) for i in range(wotkitpy.QUERY_MAX_SENSORS) ]),
+        ("get_raw_data", "decode", [ make_reading(i) for i in range(readings) ]),
+        ("register_sensor", "encode", sensor),
+        ("register_multiple_sensors", "encode", [ make_sensor(i) for i in range(wotkitpy.REGISTER_MAX_SENSORS) ]),
+        ("send_bulk_data_put", "encode", [ make_reading(i) for i in range(readings) ]),
+    ]
+
+    codecs = []
+    for name in sorted(wotkitpy.JSON_CODECS):
+        try:
+            codecs.append(wotkitpy.JSON_CODECS[name]())
+        except ImportError:
+            pass
+    stdlib = wotkitpy.JSON_CODECS["json"]()
+
+    print("%-26s %-7s %-11s %10s %8s" % ("endpoint", "op", "codec", "ms/call", "speedup"))
+    for endpoint, op, payload in payloads:
+        body = stdlib.dumps(payload)
+        baseline = None
+        for codec in codecs:
+            if op == "decode":
+                run = lambda: codec.loads(body)
+            else:
+                run = lambda: codec.dumps(payload)
+            number = max(1, int(2000000 / len(body)))
+            seconds = min(timeit.repeat(run, number = number, repeat = 3)) / number
+            if codec.name == "json":
+                baseline = seconds
+            print("%-26s %-7s %-11s %10.3f %7.1fx" % (endpoint, op, codec.name, seconds * 1000, (baseline or seconds) / seconds))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""Throughput and latency benchmark of every WotkitProxy method against an in-process FakeWotkit.
+
+Usage: python benchmarks/proxy.py [--payloads 100,1000,10000] [--concurrency 1,4,16] [--duration 2]
+                                  [--methods get_raw_data,send_bulk_data_put] [--transport requests|httpx|memory]
+                                  [--label 1.0.3] [--output results.json] [--compare baseline.json]
+
+Every method is called in a loop by each of concurrency threads for duration seconds. Methods that send or receive
+many readings or sensors are run once per payload size, the others once per concurrency level. The results, with the
+operations per second and the latency percentiles of each run, are printed and can be saved as JSON with --output.
+With --compare, the change in throughput and median latency against the results saved from an earlier version is
+printed as well. --transport selects the transport of the proxy: requests (the default) or httpx over a local socket,
+or memory to call the fake WoTKit in process and measure the client alone."""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from timeit import default_timer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import wotkitpy
+from fake_wotkit import FakeWotkit
+
+START = 1356998400000
+
+def make_reading(index):
+    return {"timestamp": START + index * 1000, "value": index * 0.5, "lat": 49.26, "lng": -123.25, "message": "reading %d" % index}
+
+def make_registration(name):
+    return {"name": name, "longName": "Benchmark sensor " + name, "description": "Sensor registered by the benchmark",
+            "latitude": 49.26, "longitude": -123.25, "visibility": "PUBLIC", "tags": ["benchmark"]}
+
+class Fixture():
+    """The sensors the benchmarks run against, created on a FakeWotkit."""
+
+    def __init__(self, proxy, max_payload):
+        self.proxy = proxy
+        self.names = itertools.count()
+        self.lock = threading.Lock()
+        for index in range(max(1000, max_payload) // wotkitpy.REGISTER_MAX_SENSORS):
+            proxy.register_multiple_sensors([ make_registration("query%d_%d" % (index, offset)) for offset in range(wotkitpy.REGISTER_MAX_SENSORS) ])
+        proxy.register_sensor(make_registration("source"))
+        proxy.register_sensor(make_registration("sink"))
+        proxy.register_sensor(make_registration("actuator"))
+        self.source_id = proxy.get_sensor_by_name("benchmark.source")["id"]
+        self.sink_id = proxy.get_sensor_by_name("benchmark.sink")["id"]
+        self.actuator_id = proxy.get_sensor_by_name("benchmark.actuator")["id"]
+        proxy.send_bulk_data_put(self.source_id, (make_reading(index) for index in range(max_payload)))
+        self.readings = [ make_reading(index) for index in range(max_payload) ]
+
+    def new_name(self, prefix):
+        with self.lock:
+            return "%s%d" % (prefix, next(self.names))
+
+def consume(iterator):
+    for element in iterator:
+        pass
+
+def query_actuator(proxy, fixture, state):
+    if "subscription" not in state:
+        state["subscription"] = proxy.subscribe_actuator(fixture.actuator_id)["subscription"]
+    return proxy.query_actuator(state["subscription"], 0)
+
+# (method, whether it is run per payload size, function(proxy, fixture, payload, thread_state))
+CASES = [
+    ("get_sensor_by_id", False, lambda proxy, fixture, payload, state: proxy.get_sensor_by_id(fixture.source_id)),
+    ("get_sensor_by_name", False, lambda proxy, fixture, payload, state: proxy.get_sensor_by_name("benchmark.source")),
+    ("query_sensors", True, lambda proxy, fixture, payload, state: proxy.query_sensors(limit = min(payload, wotkitpy.QUERY_MAX_SENSORS))),
+    ("query_all_sensors", False, lambda proxy, fixture, payload, state: proxy.query_all_sensors()),
+    ("register_sensor", False, lambda proxy, fixture, payload, state: proxy.register_sensor(make_registration(fixture.new_name("single")))),
+    ("register_multiple_sensors", True, lambda proxy, fixture, payload, state: proxy.register_multiple_sensors([ make_registration(fixture.new_name("multiple")) for index in range(payload) ])),
+    ("update_sensor", False, lambda proxy, fixture, payload, state: proxy.update_sensor(fixture.sink_id, make_registration("sink"))),
+    ("get_sensor_fields", False, lambda proxy, fixture, payload, state: proxy.get_sensor_fields(fixture.source_id)),
+    ("update_sensor_field", False, lambda proxy, fixture, payload, state: proxy.update_sensor_field(fixture.sink_id, "extra", {"name": "extra", "type": "NUMBER"})),
+    ("subscribe_sensor", False, lambda proxy, fixture, payload, state: proxy.subscribe_sensor(fixture.source_id)),
+    ("get_sensor_subscriptions", False, lambda proxy, fixture, payload, state: proxy.get_sensor_subscriptions()),
+    ("send_data_post", False, lambda proxy, fixture, payload, state: proxy.send_data_post(fixture.sink_id, {"value": 1.5, "message": "benchmark"})),
+    ("send_bulk_data_put", True, lambda proxy, fixture, payload, state: proxy.send_bulk_data_put(fixture.sink_id, fixture.readings[:payload])),
+    ("delete_data", False, lambda proxy, fixture, payload, state: proxy.delete_data(fixture.sink_id, START)),
+    ("get_raw_data", True, lambda proxy, fixture, payload, state: proxy.get_raw_data(fixture.source_id, start = START - 1, afterE = payload)),
+    ("get_raw_data_columnar", True, lambda proxy, fixture, payload, state: proxy.get_raw_data(fixture.source_id, start = START - 1, afterE = payload, columnar = True)),
+    ("iter_raw_data", True, lambda proxy, fixture, payload, state: consume(proxy.iter_raw_data(fixture.source_id, start = START - 1, afterE = payload))),
+    ("get_raw_data_range", True, lambda proxy, fixture, payload, state: proxy.get_raw_data_range(fixture.source_id, START, START + (payload - 1) * 1000, shard_rows = 1000)),
+    ("get_aggregated_data", True, lambda proxy, fixture, payload, state: proxy.get_aggregated_data(start = START - 1, afterE = payload)),
+    ("send_actuator_message", False, lambda proxy, fixture, payload, state: proxy.send_actuator_message(fixture.actuator_id, button = "on")),
+    ("subscribe_actuator", False, lambda proxy, fixture, payload, state: proxy.subscribe_actuator(fixture.actuator_id)),
+    ("query_actuator", False, lambda proxy, fixture, payload, state: query_actuator(proxy, fixture, state)),
+]
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def run_case(proxy, fixture, function, payload, concurrency, duration):
+    """Calls function from concurrency threads for duration seconds and returns the result of the run."""
+    latencies = []
+    errors = []
+    barrier = threading.Event()
+    deadline = [None]
+
+    def work():
+        state = {}
+        thread_latencies = []
+        barrier.wait()
+        while default_timer() < deadline[0]:
+            started = default_timer()
+            try:
+                function(proxy, fixture, payload, state)
+            except Exception as e:
+                errors.append(repr(e))
+            thread_latencies.append(default_timer() - started)
+        latencies.extend(thread_latencies)
+
+    threads = [ threading.Thread(target = work) for index in range(concurrency) ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    started = default_timer()
+    deadline[0] = started + duration
+    barrier.set()
+    for thread in threads:
+        thread.join()
+    seconds = default_timer() - started
+
+    latencies.sort()
+    result = {"operations": len(latencies), "errors": len(errors), "seconds": seconds,
+              "throughput": len(latencies) / seconds, "latency_ms": {}}
+    if latencies:
+        result["latency_ms"] = {"mean": 1000 * sum(latencies) / len(latencies), "p50": 1000 * percentile(latencies, 0.5),
+                                "p90": 1000 * percentile(latencies, 0.9), "p99": 1000 * percentile(latencies, 0.99), "max": 1000 * latencies[-1]}
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+def compare(results, baseline):
+    """Prints the change of every run in results against the run with the same method, payload and concurrency in baseline."""
+    previous = dict(((run["method"], run["payload"], run["concurrency"]), run) for run in baseline["results"])
+    print("")
+    print("Compared with %s (%s)" % (baseline.get("label") or "baseline", baseline.get("time")))
+    print("%-26s %8s %5s %12s %12s" % ("method", "payload", "conc", "throughput", "p50 latency"))
+    for run in results["results"]:
+        before = previous.get((run["method"], run["payload"], run["concurrency"]))
+        if before is None or not before["throughput"] or not run["latency_ms"] or not before["latency_ms"]:
+            continue
+        print("%-26s %8s %5d %+11.1f%% %+11.1f%%" % (run["method"], run["payload"] or "-", run["concurrency"],
+                                                   100.0 * (run["throughput"] / before["throughput"] - 1),
+                                                   100.0 * (run["latency_ms"]["p50"] / before["latency_ms"]["p50"] - 1)))
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmark WotkitProxy against an in-process fake WoTKit.")
+    parser.add_argument("--payloads", default = "100,1000,10000", help = "comma separated numbers of readings or sensors per call")
+    parser.add_argument("--concurrency", default = "1,4,16", help = "comma separated numbers of threads")
+    parser.add_argument("--duration", type = float, default = 2.0, help = "seconds each run lasts")
+    parser.add_argument("--methods", help = "comma separated methods to run, all by default")
+    parser.add_argument("--transport", default = "requests", choices = ["requests", "httpx", "memory"], help = "transport of the proxy")
+    parser.add_argument("--label", help = "name of this run saved with the results, e.g. the wotkitpy version or commit")
+    parser.add_argument("--output", help = "file to save the results to as JSON")
+    parser.add_argument("--compare", help = "results saved by an earlier run to compare with")
+    args = parser.parse_args()
+
+    payloads = [ int(payload) for payload in args.payloads.split(",") ]
+    concurrency_levels = [ int(concurrency) for concurrency in args.concurrency.split(",") ]
+    methods = set(args.methods.split(",")) if args.methods else None
+
+    server = FakeWotkit()
+    transport = None
+    if args.transport == "memory":
+        transport = wotkitpy.InMemoryTransport(server.wsgi_app)
+    else:
+        server.start()
+        if args.transport == "httpx":
+            transport = wotkitpy.HttpxTransport(max_connections = max(concurrency_levels))
+    proxy = wotkitpy.WotkitProxy(api_url = server.api_url, username = "benchmark", password = "benchmark",
+                                 pool_maxsize = max(concurrency_levels), transport = transport)
+    fixture = Fixture(proxy, max(payloads))
+
+    results = {"label": args.label, "transport": args.transport, "python": platform.python_version(), "platform": platform.platform(),
+               "json_codec": wotkitpy.get_json_codec().name, "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+               "duration": args.duration, "results": []}
+    print("%-26s %8s %5s %10s %9s %9s %9s %7s" % ("method", "payload", "conc", "ops/s", "p50 ms", "p90 ms", "p99 ms", "errors"))
+    for method, per_payload, function in CASES:
+        if methods is not None and method not in methods:
+            continue
+        if method == "get_raw_data_columnar" and wotkitpy.numpy is None:
+            continue
+        for payload in (payloads if per_payload else [None]):
+            for concurrency in concurrency_levels:
+                run = run_case(proxy, fixture, function, payload, concurrency, args.duration)
+                run.update({"method": method, "payload": payload, "concurrency": concurrency})
+                results["results"].append(run)
+                latency = run["latency_ms"]
+                print("%-26s %8s %5d %10.1f %9.2f %9.2f %9.2f %7d" % (method, payload or "-", concurrency, run["throughput"],
+                                                                     latency.get("p50", 0), latency.get("p90", 0), latency.get("p99", 0), run["errors"]))
+                sys.stdout.flush()
+
+    proxy.close()
+    if transport is not None:
+        transport.close()
+    if args.transport != "memory":
+        server.stop()
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent = 2, sort_keys = True)
+    if args.compare:
+        with open(args.compare) as baseline:
+            compare(results, json.load(baseline))
+
+if __name__ == "__main__":
+    main()
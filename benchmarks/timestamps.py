@@ -0,0 +1,52 @@
+"""Micro-benchmark of converting timestamps between milliseconds since the epoch and the WoTKit ISO format.
+
+Usage: python benchmarks/timestamps.py [timestamps]
+
+The timestamps are those of a backfill with about one reading per second. Compares encode_wotkit_timestamps and decode_wotkit_timestamps, with and without numpy, to converting one timestamp per call the way get_wotkit_timestamp and _timestamp_to_millis do."""
+
+import os
+import random
+import sys
+import timeit
+from datetime import timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import wotkitpy
+
+def encode_per_call(millis):
+    strings = []
+    for value in millis:
+        dt = (wotkitpy._EPOCH + timedelta(milliseconds = value)).isoformat()
+        if '.' not in dt:
+            dt = dt + '.000000'
+        strings.append(dt[:-3] + 'Z')
+    return strings
+
+def decode_per_call(strings):
+    return [ wotkitpy._timestamp_to_millis(string) for string in strings ]
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    start = 1356998400000
+    millis = [ start + i * 1000 + random.randint(0, 999) for i in range(count) ]
+    strings = wotkitpy.encode_wotkit_timestamps(millis)
+
+    runs = [
+        ("encode", "per call", lambda: encode_per_call(millis)),
+        ("encode", "batch", lambda: wotkitpy._encode_timestamps(millis)),
+        ("decode", "per call", lambda: decode_per_call(strings)),
+        ("decode", "batch", lambda: wotkitpy._decode_timestamps(strings)),
+    ]
+    if wotkitpy.numpy is not None:
+        runs.insert(2, ("encode", "numpy", lambda: wotkitpy.encode_wotkit_timestamps(millis)))
+        runs.append(("decode", "numpy", lambda: wotkitpy.decode_wotkit_timestamps(strings)))
+
+    print("%-7s %-9s %12s %8s" % ("op", "path", "ns/stamp", "speedup"))
+    baseline = {}
+    for op, path, run in runs:
+        seconds = min(timeit.repeat(run, number = 1, repeat = 3)) / count
+        baseline.setdefault(op, seconds)
+        print("%-7s %-9s %12.0f %7.1fx" % (op, path, seconds * 1e9, baseline[op] / seconds))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 
-from distutils.core import setup
+import sys
+from setuptools import setup
 
 requires = ["requests"]
 
+# wotkitpy_async uses async/await, which Python 2 cannot even compile
+py_modules = ["wotkitpy"]
+if sys.version_info >= (3, 5):
+    py_modules.append("wotkitpy_async")
+
 setup(name = "wotkitpy",
       description = "WoTKit python client using HTTP",
       author = "Mark Duppenthaler",
@@ -12,12 +18,16 @@ setup(name = "wotkitpy",
       maintainer = "Sensetecnic Systems",
       maintainer_email = "info@sensetecnic.com",
       license = "MIT",
-      py_modules = ["wotkitpy"],
-      requires = requires,
+      py_modules = py_modules,
       install_requires = requires,
+      extras_require = {"async": ["aiohttp; python_version >= '3.5'"],
+                        "columnar": ["numpy", "pandas"],
+                        "http2": ["httpx[http2]; python_version >= '3.6'"]},
       classifiers = [
         "Programming Language :: Python",
+        "Programming Language :: Python :: 2",
         "Programming Language :: Python :: 2.7",
+        "Programming Language :: Python :: 3",
         "Operating System :: OS Independent",
         "Intended Audience :: Developers"
         ]
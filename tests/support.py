@@ -0,0 +1,89 @@
+"""Helpers of the offline tests, which run WotkitProxy against the fake WoTKit of the benchmarks in process through an
+InMemoryTransport, so they need neither a WoTKit server nor the network.
+
+Run them with: python -m unittest discover -s tests
+"""
+
+import json
+import os
+import sys
+import threading
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import wotkitpy
+from fake_wotkit import FakeWotkit
+
+class FailingApp():
+    """Wraps a WSGI application to answer chosen requests with an error instead, and records every request."""
+
+    def __init__(self, app):
+        self.app = app
+        self.requests = []
+        self._failures = []
+        self._lock = threading.Lock()
+
+    def fail(self, status, method = None, path = None, times = None, headers = None, html = False):
+        """Answers the next times requests (all if None) with the given method and a path containing path with status,
+        and a JSON body, or an HTML page if html is True."""
+        with self._lock:
+            self._failures.append({"status": status, "method": method, "path": path, "times": times, "headers": headers or [], "html": html})
+
+    def _take_failure(self, method, path):
+        with self._lock:
+            self.requests.append((method, path))
+            for failure in self._failures:
+                if failure["times"] == 0:
+                    continue
+                if failure["method"] not in (None, method) or (failure["path"] is not None and failure["path"] not in path):
+                    continue
+                if failure["times"] is not None:
+                    failure["times"] -= 1
+                return failure
+        return None
+
+    def count(self, method, path):
+        """Returns the number of requests made with method to a path containing path."""
+        with self._lock:
+            return len([ request for request in self.requests if request[0] == method and path in request[1] ])
+
+    def __call__(self, environ, start_response):
+        path = environ["PATH_INFO"] + ("?" + environ["QUERY_STRING"] if environ.get("QUERY_STRING") else "")
+        failure = self._take_failure(environ["REQUEST_METHOD"], path)
+        if failure is None:
+            return self.app(environ, start_response)
+        if failure["html"]:
+            body = b"<html><body><h1>Injected failure</h1></body></html>"
+            content_type = "text/html;charset=UTF-8"
+        else:
+            body = json.dumps({"error": {"message": "Injected failure"}}).encode("utf-8")
+            content_type = "application/json;charset=UTF-8"
+        start_response("%d Injected" % failure["status"], [("Content-Type", content_type), ("Content-Length", str(len(body)))] + failure["headers"])
+        return [body]
+
+class WotkitTestCase(unittest.TestCase):
+    """Gives each test a fresh fake WoTKit in self.fake, the FailingApp serving it in self.app and a proxy in self.proxy."""
+
+    def setUp(self):
+        self.fake = FakeWotkit()
+        self.addCleanup(self.fake.stop)
+        self.app = FailingApp(self.fake.wsgi_app)
+        self.proxy = self.make_proxy()
+
+    def make_proxy(self, **kwargs):
+        """Returns a new proxy to the fake WoTKit, closed when the test ends."""
+        kwargs.setdefault("username", "tester")
+        kwargs.setdefault("password", "secret")
+        kwargs.setdefault("transport", wotkitpy.InMemoryTransport(self.app))
+        proxy = wotkitpy.WotkitProxy(api_url = self.fake.api_url, **kwargs)
+        self.addCleanup(proxy.close)
+        return proxy
+
+    def register(self, name, **registration):
+        """Registers a sensor on the fake WoTKit and returns its ID as a str."""
+        registration.update({"name": name, "longName": name, "description": "Test sensor"})
+        self.assertTrue(self.fake.store.register(registration))
+        return str(self.fake.store.find_sensor(name)["id"])
@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class WotkitActuatorListenerTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.actuator_ids = [ self.register("actuator%d" % i) for i in range(3) ]
+        self.received = []
+        self.lock = threading.Lock()
+
+    def callback(self, sensor_id, message):
+        with self.lock:
+            self.received.append((sensor_id, message["button"]))
+
+    def start_listener(self, **kwargs):
+        listener = wotkitpy.WotkitActuatorListener(self.proxy, wait_time = 1, **kwargs)
+        for actuator_id in self.actuator_ids:
+            listener.add_actuator(actuator_id, self.callback)
+        listener.start()
+        self.addCleanup(listener.stop)
+        self.wait_for(lambda: listener.stats()["subscriptions"] >= len(self.actuator_ids))
+        return listener
+
+    def wait_for(self, condition, timeout = 5):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                self.fail("Timed out")
+            time.sleep(0.01)
+
+    def test_delivers_messages_in_order(self):
+        listener = self.start_listener(workers = 2)
+        for i in range(3):
+            for actuator_id in self.actuator_ids:
+                self.proxy.send_actuator_message(actuator_id, button = str(i))
+        self.wait_for(lambda: len(self.received) == 9)
+        for actuator_id in self.actuator_ids:
+            self.assertEqual([ button for sensor_id, button in self.received if sensor_id == actuator_id ], ["0", "1", "2"])
+        stats = listener.stats()
+        self.assertEqual((stats["actuators"], stats["messages"], stats["errors"]), (3, 9, 0))
+        self.assertEqual(stats["latency"]["count"], 9)
+
+    def test_subscribes_again_after_failed_poll(self):
+        self.actuator_ids = self.actuator_ids[:1]
+        self.app.fail(404, "GET", "/control/sub/", times = 1)
+        listener = self.start_listener()
+        self.wait_for(lambda: listener.stats()["subscriptions"] == 2)
+        self.proxy.send_actuator_message(self.actuator_ids[0], button = "on")
+        self.wait_for(lambda: len(self.received) == 1)
+        self.assertEqual(listener.stats()["errors"], 1)
+
+    def test_failed_callback_counted(self):
+        self.actuator_ids = self.actuator_ids[:1]
+        self.callback = lambda sensor_id, message: 1 / 0
+        listener = self.start_listener()
+        self.proxy.send_actuator_message(self.actuator_ids[0], button = "on")
+        self.wait_for(lambda: listener.stats()["callback_errors"] == 1)
+        self.assertEqual(listener.stats()["messages"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
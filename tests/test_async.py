@@ -0,0 +1,64 @@
+import unittest
+
+from support import wotkitpy
+
+import fake_wotkit
+
+try:
+    import asyncio
+    import wotkitpy_async
+except (ImportError, SyntaxError):
+    wotkitpy_async = None
+
+START = 1356998400000
+
+@unittest.skipIf(wotkitpy_async is None or wotkitpy_async.aiohttp is None, "requires Python 3.5+ and aiohttp")
+class AsyncWotkitProxyTest(unittest.TestCase):
+    def setUp(self):
+        self.server = fake_wotkit.FakeWotkit()
+        api_url = self.server.start()
+        self.addCleanup(self.server.stop)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(self.loop.close)
+        self.proxy = wotkitpy_async.AsyncWotkitProxy(api_url = api_url, username = "tester", password = "secret")
+        self.addCleanup(self.complete, self.proxy.close())
+
+    def complete(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_sensors(self):
+        self.assertTrue(self.complete(self.proxy.register_sensor({"name": "sensor", "longName": "sensor", "description": "Test sensor"})))
+        sensor = self.complete(self.proxy.get_sensor_by_name("sensor"))
+        self.assertEqual(sensor["name"], "sensor")
+        self.assertIsNone(self.complete(self.proxy.get_sensor_by_id("99999")))
+        self.assertEqual(len(self.complete(self.proxy.query_all_sensors())), 1)
+        self.assertTrue(self.complete(self.proxy.delete_sensor(sensor["id"])))
+
+    def test_concurrent_data(self):
+        self.server.store.register({"name": "sensor"})
+        self.complete(asyncio.gather(*[ self.proxy.send_data_post("1", {"timestamp": START + i, "value": i}) for i in range(20) ]))
+        self.complete(self.proxy.send_bulk_data_put("1", [ {"timestamp": START + 20 + i, "value": 20 + i} for i in range(20) ]))
+        readings = self.complete(self.proxy.get_raw_data("1", start = START - 1, end = START + 39))
+        self.assertEqual(sorted(int(reading["value"]) for reading in readings), list(range(40)))
+
+    def test_formatted_data_matches_sync(self):
+        self.server.store.register({"name": "sensor", "longName": "Temp\u00e9rature"})
+        self.complete(self.proxy.send_bulk_data_put("1", [ {"timestamp": START + i, "value": i} for i in range(3) ]))
+        sync_proxy = wotkitpy.WotkitProxy(api_url = self.server.api_url, username = "tester", password = "secret")
+        self.addCleanup(sync_proxy.close)
+        expected = sync_proxy.get_formatted_data("1", start = START - 1)
+        self.assertIsInstance(expected, bytes)
+        self.assertIn(u"Temp\u00e9rature".encode("utf-8"), expected)
+        self.assertEqual(self.complete(self.proxy.get_formatted_data("1", start = START - 1)), expected)
+
+    def test_error_response(self):
+        self.assertRaises(wotkitpy.WotkitException, self.complete, self.proxy.send_data_post("99999", {"value": 1}))
+
+    def test_closed_proxy(self):
+        self.complete(self.proxy.close())
+        self.assertRaises(wotkitpy.WotkitException, self.complete, self.proxy.get_sensor_by_id("1"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+import proxy as benchmark
+
+class BenchmarkCasesTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.proxy = self.make_proxy(username = "benchmark", password = "benchmark")
+        self.fixture = benchmark.Fixture(self.proxy, 10)
+
+    def test_every_case_runs(self):
+        for method, per_payload, function in benchmark.CASES:
+            if method == "get_raw_data_columnar" and wotkitpy.numpy is None:
+                continue
+            function(self.proxy, self.fixture, 10 if per_payload else None, {})
+
+    def test_run_case(self):
+        function = dict((method, function) for method, per_payload, function in benchmark.CASES)["get_sensor_by_id"]
+        run = benchmark.run_case(self.proxy, self.fixture, function, None, 2, 0.05)
+        self.assertGreater(run["operations"], 0)
+        self.assertEqual(run["errors"], 0)
+        self.assertLessEqual(run["latency_ms"]["p50"], run["latency_ms"]["max"])
+
+class FakeWotkitServerTest(unittest.TestCase):
+    def test_serves_over_socket(self):
+        server = benchmark.FakeWotkit()
+        api_url = server.start()
+        self.addCleanup(server.stop)
+        proxy = wotkitpy.WotkitProxy(api_url = api_url, username = "tester", password = "secret")
+        self.addCleanup(proxy.close)
+        self.assertTrue(proxy.register_sensor({"name": "sensor", "longName": "sensor", "description": "Test sensor"}))
+        self.assertEqual(proxy.get_sensor_by_name("tester.sensor")["name"], "sensor")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+START = 1356998400000
+
+def readings(count):
+    return ({"timestamp": START + i * 1000, "value": i} for i in range(count))
+
+class SendBulkDataPutTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.parts = []
+
+    def stored(self):
+        return self.fake.store.readings[int(self.sensor_id)]
+
+    def test_split_by_records(self):
+        self.proxy.send_bulk_data_put(self.sensor_id, readings(25), max_part_records = 10, on_progress = self.parts.append)
+        self.assertEqual([ part["records"] for part in self.parts ], [10, 10, 5])
+        self.assertEqual([ part["first_record"] for part in self.parts ], [0, 10, 20])
+        self.assertEqual(len(self.stored()), 25)
+
+    def test_split_by_bytes(self):
+        self.proxy.send_bulk_data_put(self.sensor_id, readings(25), max_part_bytes = 200, on_progress = self.parts.append)
+        self.assertTrue(all(part["bytes"] <= 200 for part in self.parts))
+        self.assertEqual(sum(part["records"] for part in self.parts), 25)
+        self.assertEqual(len(self.stored()), 25)
+
+    def test_timestamp_format(self):
+        self.proxy.send_bulk_data_put(self.sensor_id, readings(3), timestamp_format = wotkitpy.TIMESTAMP_ISO)
+        self.assertEqual([ reading["timestamp"] for reading in self.stored() ], [START, START + 1000, START + 2000])
+
+    def test_failed_part_stops(self):
+        self.app.fail(500, "PUT", "/data", times = 1)
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.send_bulk_data_put, self.sensor_id, readings(25), max_part_records = 10)
+        self.assertEqual(self.app.count("PUT", "/data"), 1)
+
+    def test_failed_part_continues_without_stop_on_error(self):
+        self.app.fail(500, "PUT", "/data", times = 1)
+        try:
+            self.proxy.send_bulk_data_put(self.sensor_id, readings(25), max_part_records = 10, stop_on_error = False, on_progress = self.parts.append)
+            self.fail("No WotkitException raised")
+        except wotkitpy.WotkitException as e:
+            self.assertIn("failed parts: 1 (records 0 to 9)", str(e))
+        self.assertIsInstance(self.parts[0]["error"], wotkitpy.WotkitException)
+        self.assertEqual([ part["error"] for part in self.parts[1:] ], [None, None])
+        self.assertEqual(len(self.stored()), 15)
+
+if __name__ == "__main__":
+    unittest.main()
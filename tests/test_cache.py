@@ -0,0 +1,88 @@
+import time
+import unittest
+
+from support import WotkitTestCase
+
+class MetadataCacheTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.proxy = self.make_proxy(cache_size = 10)
+
+    def gets(self):
+        return self.app.count("GET", "/sensors/")
+
+    def test_cached_sensor(self):
+        sensor = self.proxy.get_sensor_by_id(self.sensor_id)
+        sensor["name"] = "changed"
+        self.assertEqual(self.proxy.get_sensor_by_id(self.sensor_id)["name"], "sensor")
+        self.assertEqual(self.gets(), 1)
+        self.assertEqual(self.proxy.cache_stats(), {"hits": 1, "misses": 1, "evictions": 0, "size": 1})
+
+    def test_update_invalidates(self):
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        self.proxy.update_sensor("benchmark.sensor", {"name": "sensor", "longName": "sensor", "description": "Updated"})
+        self.assertEqual(self.proxy.get_sensor_by_id(self.sensor_id)["description"], "Updated")
+        self.assertEqual(self.gets(), 2)
+
+    def test_field_update_invalidates(self):
+        self.proxy.get_sensor_fields(self.sensor_id)
+        self.proxy.update_sensor_field(self.sensor_id, "value", {"name": "value", "type": "NUMBER", "units": "cm"})
+        fields = self.proxy.get_sensor_fields(self.sensor_id)
+        self.assertEqual([ field.get("units") for field in fields if field["name"] == "value" ], ["cm"])
+        self.assertEqual(self.app.count("GET", "/fields"), 2)
+
+    def test_write_under_other_alias_without_sensor_entry(self):
+        field = {"name": "value", "type": "NUMBER"}
+        for read_id, write_id, units in (("benchmark.sensor", self.sensor_id, "cm"), (self.sensor_id, "benchmark.sensor", "mm")):
+            self.proxy.get_sensor_fields(read_id, "value")
+            self.proxy.update_sensor_field(write_id, "value", dict(field, units = units))
+            self.assertEqual(self.proxy.get_sensor_fields(read_id, "value")["units"], units)
+
+    def test_aliases_kept_after_eviction(self):
+        proxy = self.make_proxy(cache_size = 1)
+        other_id = self.register("other")
+        proxy.get_sensor_by_id(self.sensor_id)
+        proxy.get_sensor_fields("benchmark.sensor")
+        proxy.get_sensor_fields(other_id)
+        proxy.update_sensor_field("benchmark.sensor", "value", {"name": "value", "type": "NUMBER"})
+        # The evicted sensor entry told which ID benchmark.sensor has, so the other sensor's entry is kept
+        proxy.get_sensor_fields(other_id)
+        self.assertEqual(self.app.count("GET", "/fields"), 2)
+
+    def test_missing_sensor_remembered(self):
+        proxy = self.make_proxy(cache_size = 10, cache_negative_ttl = 0.05)
+        self.assertIsNone(proxy.get_sensor_by_id("99999"))
+        self.assertIsNone(proxy.get_sensor_by_id("99999"))
+        self.assertEqual(self.gets(), 1)
+        time.sleep(0.06)
+        self.assertIsNone(proxy.get_sensor_by_id("99999"))
+        self.assertEqual(self.gets(), 2)
+
+    def test_entries_expire(self):
+        proxy = self.make_proxy(cache_size = 10, cache_ttl = 0.05)
+        proxy.get_sensor_by_id(self.sensor_id)
+        time.sleep(0.06)
+        proxy.get_sensor_by_id(self.sensor_id)
+        self.assertEqual(self.gets(), 2)
+
+    def test_least_recently_used_evicted(self):
+        proxy = self.make_proxy(cache_size = 2)
+        other_ids = [ self.register("other%d" % i) for i in range(2) ]
+        proxy.get_sensor_by_id(self.sensor_id)
+        proxy.get_sensor_by_id(other_ids[0])
+        proxy.get_sensor_by_id(self.sensor_id)
+        proxy.get_sensor_by_id(other_ids[1])
+        self.assertEqual(proxy.cache_stats()["evictions"], 1)
+        proxy.get_sensor_by_id(self.sensor_id)
+        self.assertEqual(self.gets(), 3)
+
+    def test_disabled_by_default(self):
+        proxy = self.make_proxy()
+        proxy.get_sensor_by_id(self.sensor_id)
+        proxy.get_sensor_by_id(self.sensor_id)
+        self.assertEqual(self.gets(), 2)
+        self.assertIsNone(proxy.cache_stats())
+
+if __name__ == "__main__":
+    unittest.main()
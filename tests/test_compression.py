@@ -0,0 +1,53 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+START = 1356998400000
+
+def readings(count):
+    return [ {"timestamp": START + i * 1000, "value": i, "message": "reading"} for i in range(count) ]
+
+class CompressionTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+
+    def stored(self):
+        return self.fake.store.readings[int(self.sensor_id)]
+
+    def test_compressed_bulk_upload(self):
+        for compression in ("gzip", "deflate"):
+            proxy = self.make_proxy(compression = compression)
+            proxy.send_bulk_data_put(self.sensor_id, readings(100))
+            stats = proxy.compression_stats()
+            self.assertEqual(stats["compressed_requests"], 1)
+            self.assertLess(stats["bytes_after"], stats["bytes_before"])
+        self.assertEqual(len(self.stored()), 200)
+
+    def test_compressed_registration(self):
+        proxy = self.make_proxy(compression = "gzip")
+        proxy.register_multiple_sensors([ {"name": "new%d" % i, "longName": "new", "description": "Test sensor"} for i in range(20) ])
+        self.assertEqual(proxy.compression_stats()["compressed_requests"], 1)
+        self.assertIsNotNone(self.fake.store.find_sensor("new19"))
+
+    def test_small_body_not_compressed(self):
+        proxy = self.make_proxy(compression = "gzip")
+        proxy.send_data_post(self.sensor_id, {"value": 1})
+        self.assertEqual(proxy.compression_stats()["compressed_requests"], 0)
+        self.assertEqual(len(self.stored()), 1)
+
+    def test_rejected_compression_turned_off(self):
+        proxy = self.make_proxy(compression = "gzip")
+        self.app.fail(415, "PUT", "/data", times = 1)
+        proxy.send_bulk_data_put(self.sensor_id, readings(100))
+        self.assertEqual(len(self.stored()), 100)
+        self.assertIsNone(proxy.compression)
+        self.assertEqual(proxy.compression_stats()["fallbacks"], 1)
+        proxy.send_bulk_data_put(self.sensor_id, readings(100))
+        self.assertEqual(proxy.compression_stats()["compressed_requests"], 1)
+
+    def test_unsupported_compression(self):
+        self.assertRaises(wotkitpy.WotkitConfigException, self.make_proxy, compression = "br")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+START = 1356998400000
+
+class WotkitDataTestCase(WotkitTestCase):
+    """Gives each test a sensor with a reading every second from START, timestamps START, START + 1000, ..."""
+
+    readings = 600
+
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.fake.store.add_readings(self.fake.store.find_sensor(self.sensor_id),
+                                     [ {"timestamp": START + i * 1000, "value": i} for i in range(self.readings) ])
+
+class RawDataRangeTest(WotkitDataTestCase):
+    def test_matches_single_request(self):
+        end = START + 599 * 1000
+        readings = self.proxy.get_raw_data_range(self.sensor_id, START, end, shard_duration = 60000, shard_rows = 60, concurrency = 3)
+        self.assertEqual(readings, self.proxy.get_raw_data(self.sensor_id, start = START, end = end))
+        self.assertEqual([ reading["value"] for reading in readings ], list(range(600)))
+        self.assertGreater(self.app.count("GET", "/data?"), 5)
+
+    def test_shards_adapt_to_shard_rows(self):
+        self.proxy.get_raw_data_range(self.sensor_id, START, START + 599 * 1000, shard_duration = 10000, shard_rows = 200, concurrency = 1)
+        # Shards grow up to four times at once until they hold about 200 readings
+        self.assertLessEqual(self.app.count("GET", "/data?"), 6)
+
+    def test_timestamp_format(self):
+        readings = self.proxy.get_raw_data_range(self.sensor_id, START, START + 2000, timestamp_format = wotkitpy.TIMESTAMP_MILLIS)
+        self.assertEqual([ reading["timestamp"] for reading in readings ], [START, START + 1000, START + 2000])
+
+    def test_failed_shard_raises(self):
+        self.app.fail(500, "GET", "/data?")
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.get_raw_data_range, self.sensor_id, START, START + 599 * 1000, shard_duration = 60000)
+
+class WotkitDataCacheTest(WotkitDataTestCase):
+    def make_cache(self, path = ":memory:", **kwargs):
+        data_cache = wotkitpy.WotkitDataCache(self.proxy, path, **kwargs)
+        self.addCleanup(data_cache.close)
+        return data_cache
+
+    def requested_starts(self):
+        return [ int(path.split("start=")[1].split("&")[0]) for method, path in self.app.requests if "/data?" in path ]
+
+    def test_repeated_range_not_fetched(self):
+        data_cache = self.make_cache()
+        readings = data_cache.get_raw_data(self.sensor_id, START, START + 99000)
+        self.assertEqual([ reading["value"] for reading in readings ], list(range(100)))
+        self.assertEqual(data_cache.get_raw_data(self.sensor_id, START, START + 99000), readings)
+        self.assertEqual(self.requested_starts(), [START])
+
+    def test_only_missing_parts_fetched(self):
+        data_cache = self.make_cache()
+        data_cache.get_raw_data(self.sensor_id, START + 100000, START + 199000)
+        readings = data_cache.get_raw_data(self.sensor_id, START, START + 299000)
+        self.assertEqual([ reading["value"] for reading in readings ], list(range(300)))
+        self.assertEqual(sorted(self.requested_starts()), [START, START + 100000, START + 199001])
+
+    def test_recent_data_fetched_again(self):
+        data_cache = self.make_cache(recent_window = 10 ** 13)
+        data_cache.get_raw_data(self.sensor_id, START, START + 9000)
+        data_cache.get_raw_data(self.sensor_id, START, START + 9000)
+        self.assertEqual(self.requested_starts(), [START, START])
+
+    def test_least_recently_used_sensor_evicted(self):
+        other_id = self.register("other")
+        self.fake.store.add_readings(self.fake.store.find_sensor(other_id), [ {"timestamp": START + i * 1000, "value": i} for i in range(10) ])
+        data_cache = self.make_cache(max_rows = 150)
+        data_cache.get_raw_data(other_id, START, START + 9000)
+        data_cache.get_raw_data(self.sensor_id, START, START + 149000)
+        data_cache.get_raw_data(other_id, START, START + 9000)
+        self.assertEqual(len(self.requested_starts()), 3)
+
+    def test_persisted_between_instances(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "data.db")
+        with wotkitpy.WotkitDataCache(self.proxy, path) as data_cache:
+            data_cache.get_raw_data(self.sensor_id, START, START + 9000)
+        with wotkitpy.WotkitDataCache(self.proxy, path) as data_cache:
+            self.assertEqual(len(data_cache.get_raw_data(self.sensor_id, START, START + 9000)), 10)
+        self.assertEqual(len(self.requested_starts()), 1)
+
+@unittest.skipIf(wotkitpy.numpy is None, "requires numpy")
+class ColumnarTest(WotkitDataTestCase):
+    readings = 5
+
+    def setUp(self):
+        WotkitDataTestCase.setUp(self)
+        self.fake.store.add_readings(self.fake.store.find_sensor(self.sensor_id), [ {"timestamp": START + 5000, "message": "no value"} ])
+
+    def test_raw_data_columns(self):
+        columns = self.proxy.get_raw_data(self.sensor_id, start = START - 1, end = START + 5000, columnar = True)
+        self.assertEqual(len(columns), 6)
+        self.assertEqual(columns.timestamps.tolist(), [ START + i * 1000 for i in range(6) ])
+        self.assertEqual(columns["value"].dtype.name, "float64")
+        self.assertEqual(columns["value"].tolist(), [0.0, 1.0, 2.0, 3.0, 4.0, 0.0])
+        self.assertEqual(columns.masks["value"].tolist(), [False] * 5 + [True])
+        self.assertEqual(columns["message"].tolist(), [None] * 5 + ["no value"])
+        self.assertEqual(sorted(columns.columns), ["lat", "lng", "message", "value"])
+
+    def test_aggregated_data_field_types(self):
+        columns = self.proxy.get_aggregated_data(start = START - 1, end = START + 5000, columnar = True, field_types = {"value": "INTEGER"})
+        self.assertEqual(list(columns.columns), ["value"])
+        self.assertEqual(columns["value"].dtype.name, "int64")
+
+    def test_to_dataframe(self):
+        try:
+            import pandas
+        except ImportError:
+            self.skipTest("requires pandas")
+        frame = self.proxy.get_raw_data(self.sensor_id, start = START - 1, end = START + 5000, columnar = True).to_dataframe()
+        self.assertEqual(len(frame), 6)
+        self.assertTrue(pandas.isnull(frame["value"].iloc[5]))
+
+class ColumnarWithoutNumpyTest(WotkitDataTestCase):
+    readings = 1
+
+    def test_requires_numpy(self):
+        numpy = wotkitpy.numpy
+        wotkitpy.numpy = None
+        try:
+            self.assertRaises(wotkitpy.WotkitConfigException, self.proxy.get_raw_data, self.sensor_id, columnar = True)
+        finally:
+            wotkitpy.numpy = numpy
+        self.assertEqual(self.app.requests, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+# (description, function(proxy, sensor_id)) of calls that must raise a WotkitException when the WoTKit answers with an error
+CALLS = [
+    ("get_sensor_by_id", lambda proxy, sensor_id: proxy.get_sensor_by_id(sensor_id)),
+    ("register_sensor", lambda proxy, sensor_id: proxy.register_sensor({"name": "new", "longName": "new", "description": "Test sensor"})),
+    ("query_sensors", lambda proxy, sensor_id: proxy.query_sensors(text = "sensor")),
+    ("get_sensor_subscriptions", lambda proxy, sensor_id: proxy.get_sensor_subscriptions()),
+    ("get_sensor_fields", lambda proxy, sensor_id: proxy.get_sensor_fields(sensor_id)),
+    ("delete_sensor_field", lambda proxy, sensor_id: proxy.delete_sensor_field(sensor_id, "value")),
+    ("send_data_post", lambda proxy, sensor_id: proxy.send_data_post(sensor_id, {"value": 1})),
+    ("delete_data", lambda proxy, sensor_id: proxy.delete_data(sensor_id, 1356998400000)),
+    ("get_raw_data", lambda proxy, sensor_id: proxy.get_raw_data(sensor_id)),
+    ("iter_raw_data", lambda proxy, sensor_id: list(proxy.iter_raw_data(sensor_id))),
+    ("get_formatted_data", lambda proxy, sensor_id: proxy.get_formatted_data(sensor_id)),
+    ("get_aggregated_data", lambda proxy, sensor_id: proxy.get_aggregated_data()),
+    ("send_actuator_message", lambda proxy, sensor_id: proxy.send_actuator_message(sensor_id, button = "on")),
+    ("subscribe_actuator", lambda proxy, sensor_id: proxy.subscribe_actuator(sensor_id)),
+    ("query_actuator", lambda proxy, sensor_id: proxy.query_actuator("1", 0)),
+    ("create_wotkit_user", lambda proxy, sensor_id: proxy.create_wotkit_user({"username": "someone"})),
+]
+
+class ErrorResponseTest(WotkitTestCase):
+    def check_calls(self):
+        sensor_id = self.register("sensor")
+        for description, call in CALLS:
+            try:
+                call(self.proxy, sensor_id)
+                self.fail("%s raised no exception" % description)
+            except wotkitpy.WotkitException as e:
+                self.assertIn("500", str(e), description)
+
+    def test_error_responses_raise_wotkit_exception(self):
+        self.app.fail(500)
+        self.check_calls()
+
+    def test_html_error_responses_raise_wotkit_exception(self):
+        self.app.fail(500, html = True)
+        self.check_calls()
+
+if __name__ == "__main__":
+    unittest.main()
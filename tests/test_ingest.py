@@ -0,0 +1,69 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class WotkitIngestQueueTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.succeeded = []
+        self.failed = []
+
+    def make_queue(self, **kwargs):
+        kwargs.setdefault("max_latency", 60)
+        queue = wotkitpy.WotkitIngestQueue(self.proxy, on_success = lambda sensor_id, readings: self.succeeded.append(len(readings)),
+                                           on_failure = lambda sensor_id, readings, e: self.failed.append((len(readings), e)), **kwargs)
+        self.addCleanup(queue.close)
+        return queue
+
+    def stored(self):
+        return self.fake.store.readings[int(self.sensor_id)]
+
+    def test_coalesces_readings(self):
+        queue = self.make_queue(max_batch_size = 10)
+        for i in range(25):
+            queue.add(self.sensor_id, {"value": i})
+        queue.flush()
+        self.assertEqual(sorted(self.succeeded), [5, 10, 10])
+        self.assertEqual(len(self.stored()), 25)
+
+    def test_close_sends_buffered_readings(self):
+        queue = self.make_queue()
+        queue.add(self.sensor_id, {"value": 1})
+        queue.close()
+        self.assertEqual(len(self.stored()), 1)
+        self.assertRaises(wotkitpy.WotkitException, queue.add, self.sensor_id, {"value": 2})
+
+    def test_failure_callback_gets_wotkit_exception(self):
+        self.app.fail(500, "PUT", "/data", times = 1)
+        queue = self.make_queue()
+        queue.add(self.sensor_id, {"value": 1})
+        queue.add(self.sensor_id, {"value": 2})
+        queue.flush()
+        self.assertEqual(len(self.failed), 1)
+        count, error = self.failed[0]
+        self.assertEqual(count, 2)
+        self.assertIsInstance(error, wotkitpy.WotkitException)
+        self.assertEqual(self.succeeded, [])
+
+    def test_raise_when_full(self):
+        queue = self.make_queue(max_queue_size = 2, backpressure = "raise")
+        queue.add(self.sensor_id, {"value": 1})
+        queue.add(self.sensor_id, {"value": 2})
+        self.assertRaises(wotkitpy.WotkitQueueFullException, queue.add, self.sensor_id, {"value": 3})
+
+    def test_drop_oldest_when_full(self):
+        dropped = []
+        queue = self.make_queue(max_queue_size = 2, backpressure = "drop_oldest", on_drop = lambda sensor_id, reading: dropped.append(reading["value"]))
+        for i in range(4):
+            queue.add(self.sensor_id, {"value": i})
+        queue.flush()
+        self.assertEqual(dropped, [0, 1])
+        self.assertEqual([ reading["value"] for reading in self.stored() ], [2, 3])
+
+    def test_invalid_max_queue_size(self):
+        for backpressure in ("block", "drop_oldest", "raise"):
+            self.assertRaises(wotkitpy.WotkitConfigException, wotkitpy.WotkitIngestQueue, self.proxy, max_queue_size = 0, backpressure = backpressure)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class CountingCodec():
+    def __init__(self):
+        self.loads_calls = 0
+        self.dumps_calls = 0
+
+    def loads(self, data):
+        self.loads_calls += 1
+        return wotkitpy._StdlibJsonCodec().loads(data)
+
+    def dumps(self, obj):
+        self.dumps_calls += 1
+        return wotkitpy._StdlibJsonCodec().dumps(obj)
+
+class JsonCodecTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.addCleanup(wotkitpy.set_json_codec, wotkitpy.get_json_codec())
+
+    def round_trip(self):
+        self.proxy.send_bulk_data_put(self.sensor_id, [{"timestamp": 1356998400000, "value": 1.5, "message": u"café"}])
+        return self.proxy.get_raw_data(self.sensor_id, start = 1356998399999, end = 1356998400000)
+
+    def test_codecs_round_trip(self):
+        for name in sorted(wotkitpy.JSON_CODECS):
+            try:
+                wotkitpy.set_json_codec(name)
+            except wotkitpy.WotkitConfigException:
+                continue
+            self.assertEqual(wotkitpy.get_json_codec().name, name)
+            readings = self.round_trip()
+            self.assertEqual([ (reading["value"], reading["message"]) for reading in readings ], [(1.5, u"café")], name)
+            self.fake.store.readings[int(self.sensor_id)] = []
+
+    def test_custom_codec(self):
+        codec = CountingCodec()
+        wotkitpy.set_json_codec(codec)
+        self.assertEqual(len(self.round_trip()), 1)
+        self.assertEqual((codec.dumps_calls, codec.loads_calls), (1, 1))
+
+    def test_unknown_codec(self):
+        self.assertRaises(wotkitpy.WotkitConfigException, wotkitpy.set_json_codec, "yaml")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class WotkitMetricsTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.metrics = wotkitpy.WotkitMetrics()
+        self.proxy = self.make_proxy(metrics = self.metrics, retry_policy = wotkitpy.RetryPolicy(max_retries = 1, backoff_factor = 0.001))
+
+    def test_endpoints_named_without_ids(self):
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        self.proxy.get_sensor_by_id("99999")
+        self.proxy.send_data_post(self.sensor_id, {"value": 1})
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(sorted(snapshot), ["GET /sensors/{sensor}", "POST /sensors/{sensor}/data"])
+        sensor_metrics = snapshot["GET /sensors/{sensor}"]
+        self.assertEqual((sensor_metrics["requests"], sensor_metrics["errors"], sensor_metrics["status"]), (2, 1, {"200": 1, "404": 1}))
+        self.assertGreater(sensor_metrics["response_bytes"], 0)
+        self.assertGreater(snapshot["POST /sensors/{sensor}/data"]["request_bytes"], 0)
+        self.assertEqual(sensor_metrics["latency"]["buckets"][-1], (float("inf"), 2))
+
+    def test_retries_counted(self):
+        self.app.fail(503, "GET", "/sensors/", times = 1)
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        sensor_metrics = self.metrics.snapshot()["GET /sensors/{sensor}"]
+        self.assertEqual((sensor_metrics["requests"], sensor_metrics["errors"], sensor_metrics["retries"]), (2, 1, 1))
+
+    def test_hooks(self):
+        requests = []
+        self.metrics.add_hook(requests.append)
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        self.metrics.remove_hook(requests.append)
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        self.assertEqual([ (request["method"], request["endpoint"], request["status"]) for request in requests ], [("GET", "/sensors/{sensor}", 200)])
+
+    def test_prometheus(self):
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        text = self.metrics.to_prometheus()
+        self.assertIn('wotkit_requests_total{method="GET",endpoint="/sensors/{sensor}",status="200"} 1\n', text)
+        self.assertIn('wotkit_request_duration_seconds_bucket{method="GET",endpoint="/sensors/{sensor}",le="+Inf"} 1\n', text)
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+
+if __name__ == "__main__":
+    unittest.main()
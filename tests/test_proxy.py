@@ -0,0 +1,59 @@
+import threading
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class PooledSessionTest(WotkitTestCase):
+    def test_session_reused_by_thread(self):
+        transport = wotkitpy.RequestsTransport()
+        session = transport._get_session()
+        self.assertIs(transport._get_session(), session)
+
+        sessions = []
+        thread = threading.Thread(target = lambda: sessions.append(transport._get_session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], session)
+        self.assertIs(sessions[0].get_adapter("http://wotkit.test/"), session.get_adapter("http://wotkit.test/"))
+
+    def test_pool_options(self):
+        proxy = wotkitpy.WotkitProxy(api_url = self.fake.api_url, pool_maxsize = 3, pool_block = True)
+        adapter = proxy.transport._get_session().get_adapter("http://wotkit.test/")
+        self.assertEqual(adapter._pool_maxsize, 3)
+        self.assertTrue(adapter._pool_block)
+
+    def test_keep_alive_off(self):
+        transport = wotkitpy.RequestsTransport(keep_alive = False)
+        self.assertEqual(transport._get_session().headers["Connection"], "close")
+
+    def test_closed_proxy_raises(self):
+        self.proxy.close()
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.get_sensor_by_id, "1")
+
+    def test_context_manager_closes(self):
+        with self.make_proxy() as proxy:
+            self.register("sensor")
+            self.assertEqual(proxy.get_sensor_by_name("tester.sensor")["name"], "sensor")
+        self.assertRaises(wotkitpy.WotkitException, proxy.get_sensor_by_name, "tester.sensor")
+
+    def test_threads_share_proxy(self):
+        sensor_id = self.register("sensor")
+        errors = []
+
+        def work():
+            try:
+                for i in range(20):
+                    self.proxy.send_data_post(sensor_id, {"value": i})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [ threading.Thread(target = work) for i in range(4) ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.fake.store.readings[int(sensor_id)]), 80)
+
+if __name__ == "__main__":
+    unittest.main()
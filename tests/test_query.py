@@ -0,0 +1,57 @@
+import re
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class QueryAllSensorsTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        for i in range(2500):
+            self.fake.store.register({"name": "sensor%d" % i})
+
+    def test_concurrent_pages(self):
+        sensors = dict(self.proxy.query_all_sensors(concurrency = 4))
+        self.assertEqual(len(sensors), 2500)
+        self.assertEqual(sensors, dict(self.proxy.query_all_sensors()))
+
+    def test_stops_after_last_page(self):
+        self.proxy.query_all_sensors(concurrency = 2)
+        # The last window takes two requests and windows past the end are requested speculatively, at most one per worker
+        self.assertIn(self.app.count("GET", "/sensors?"), (5, 6))
+
+    def test_capped_page_size(self):
+        app = self.app
+
+        def capping_app(environ, start_response):
+            environ["QUERY_STRING"] = re.sub(r"limit=\d+", lambda match: "limit=%d" % min(int(match.group(0)[6:]), 300), environ.get("QUERY_STRING", ""))
+            return app(environ, start_response)
+
+        proxy = self.make_proxy(transport = wotkitpy.InMemoryTransport(capping_app))
+        self.assertEqual(len(proxy.query_all_sensors(concurrency = 4)), 2500)
+        self.assertEqual(len(proxy.query_all_sensors()), 2500)
+        self.assertEqual(len(list(proxy.iter_sensors())), 2500)
+
+    def test_failed_page_raises(self):
+        self.app.fail(500, "GET", "offset=1000")
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.query_all_sensors, concurrency = 4)
+
+class IterSensorsTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        for i in range(1500):
+            self.fake.store.register({"name": "sensor%d" % i, "description": "Test sensor"})
+
+    def test_yields_pages_as_they_arrive(self):
+        sensors = self.proxy.iter_sensors()
+        self.assertEqual(next(sensors)["name"], "sensor0")
+        self.assertEqual(self.app.count("GET", "/sensors?"), 1)
+        self.assertEqual(len(list(sensors)), 1499)
+        self.assertEqual(self.app.count("GET", "/sensors?"), 3)
+
+    def test_keys(self):
+        sensors = list(self.proxy.iter_sensors(keys = ["id", "name"]))
+        self.assertEqual(len(sensors), 1500)
+        self.assertEqual(set(sensors[0]), set(["id", "name"]))
+
+if __name__ == "__main__":
+    unittest.main()
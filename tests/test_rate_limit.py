@@ -0,0 +1,48 @@
+import time
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class RateLimiterTest(unittest.TestCase):
+    def test_burst_then_paced(self):
+        rate_limiter = wotkitpy.RateLimiter(rate = 100, burst = 2)
+        started = time.time()
+        delays = [ rate_limiter.acquire() for i in range(5) ]
+        self.assertEqual(delays[:2], [0.0, 0.0])
+        self.assertTrue(all(0.0 < delay <= 0.01 for delay in delays[2:]))
+        self.assertGreaterEqual(time.time() - started, 0.025)
+        self.assertEqual(rate_limiter.stats()[None]["delayed"], 3)
+
+    def test_max_wait(self):
+        rate_limiter = wotkitpy.RateLimiter(rate = 1, max_wait = 0.1)
+        rate_limiter.acquire()
+        self.assertRaises(wotkitpy.WotkitException, rate_limiter.acquire)
+
+    def test_invalid_limits(self):
+        self.assertRaises(wotkitpy.WotkitConfigException, wotkitpy.RateLimiter, rate = 0)
+        self.assertRaises(wotkitpy.WotkitConfigException, wotkitpy.RateLimiter, limits = {"unknown": 1})
+
+class ProxyRateLimitTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+
+    def test_endpoint_classes(self):
+        rate_limiter = wotkitpy.RateLimiter(limits = {wotkitpy.RATE_DATA_WRITE: (1, 1)}, max_wait = 0.1)
+        proxy = self.make_proxy(rate_limiter = rate_limiter)
+        proxy.send_data_post(self.sensor_id, {"value": 1})
+        self.assertRaises(wotkitpy.WotkitException, proxy.send_data_post, self.sensor_id, {"value": 2})
+        proxy.get_sensor_by_id(self.sensor_id)
+        self.assertEqual(self.app.count("POST", "/data"), 1)
+        stats = rate_limiter.stats()
+        self.assertEqual(stats[wotkitpy.RATE_DATA_WRITE]["requests"], 1)
+        self.assertEqual(stats[wotkitpy.RATE_SENSOR_QUERY]["requests"], 1)
+        self.assertGreater(stats[wotkitpy.RATE_DATA_WRITE]["queue_delay"], 0.0)
+
+    def test_shared_between_proxies(self):
+        rate_limiter = wotkitpy.RateLimiter(rate = 1, max_wait = 0.1)
+        self.make_proxy(rate_limiter = rate_limiter).get_sensor_by_id(self.sensor_id)
+        self.assertRaises(wotkitpy.WotkitException, self.make_proxy(rate_limiter = rate_limiter).get_sensor_by_id, self.sensor_id)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+def registrations(count, prefix = "sensor"):
+    return [ {"name": "%s%03d" % (prefix, i), "longName": "Sensor", "description": "Test sensor"} for i in range(count) ]
+
+class RegisterMultipleSensorsTest(WotkitTestCase):
+    def test_chunks_of_100(self):
+        self.proxy.register_multiple_sensors(registrations(250))
+        self.assertEqual(len(self.fake.store.sensors), 250)
+        self.assertEqual(self.app.count("PUT", "/sensors"), 3)
+
+    def test_rejected_chunk_raises(self):
+        self.register("sensor150")
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.register_multiple_sensors, registrations(250))
+
+    def test_concurrently_bisects_to_bad_sensor(self):
+        self.register("sensor150")
+        batch = registrations(250)
+        report = self.proxy.register_multiple_sensors_concurrently(batch, concurrency = 3, bisect = True)
+
+        self.assertEqual(len(report["succeeded"]), 249)
+        self.assertEqual(len(report["failed"]), 1)
+        registration, error = report["failed"][0]
+        self.assertEqual(registration["name"], "sensor150")
+        self.assertIsInstance(error, wotkitpy.WotkitException)
+        self.assertEqual(len(self.fake.store.sensors), 250)
+
+    def test_concurrently_without_bisect_fails_chunk(self):
+        self.register("sensor150")
+        report = self.proxy.register_multiple_sensors_concurrently(registrations(250), concurrency = 3)
+        self.assertEqual(len(report["succeeded"]), 150)
+        self.assertEqual(sorted(registration["name"] for registration, error in report["failed"])[0], "sensor100")
+        self.assertEqual(len(report["failed"]), 100)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import time
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class RetryPolicyTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.proxy = self.make_proxy(retry_policy = wotkitpy.RetryPolicy(max_retries = 2, backoff_factor = 0.001))
+
+    def test_retries_idempotent_request(self):
+        self.app.fail(503, "GET", "/sensors/", times = 2)
+        self.assertEqual(self.proxy.get_sensor_by_id(self.sensor_id)["name"], "sensor")
+        self.assertEqual(self.app.count("GET", "/sensors/"), 3)
+
+    def test_gives_up_after_max_retries(self):
+        self.app.fail(503, "GET", "/sensors/")
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.get_sensor_by_id, self.sensor_id)
+        self.assertEqual(self.app.count("GET", "/sensors/"), 3)
+
+    def test_post_not_retried_on_server_error(self):
+        self.app.fail(503, "POST", "/data", times = 1)
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.send_data_post, self.sensor_id, {"value": 1})
+        self.assertEqual(self.app.count("POST", "/data"), 1)
+
+    def test_post_retried_after_429(self):
+        self.app.fail(429, "POST", "/data", times = 1, headers = [("Retry-After", "0")])
+        self.assertTrue(self.proxy.send_data_post(self.sensor_id, {"value": 1}))
+        self.assertEqual(self.app.count("POST", "/data"), 2)
+
+    def test_retry_after_too_long(self):
+        self.app.fail(503, "GET", "/sensors/", times = 1, headers = [("Retry-After", "3600")])
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.get_sensor_by_id, self.sensor_id)
+        self.assertEqual(self.app.count("GET", "/sensors/"), 1)
+
+class CircuitBreakerTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.breaker = wotkitpy.CircuitBreaker(failure_threshold = 2, recovery_timeout = 0.05)
+        self.proxy = self.make_proxy(circuit_breaker = self.breaker)
+
+    def test_open_circuit_fails_fast(self):
+        self.app.fail(500, "GET", "/sensors/", times = 2)
+        for i in range(2):
+            self.assertRaises(wotkitpy.WotkitException, self.proxy.get_sensor_by_id, self.sensor_id)
+        self.assertEqual(self.breaker.get_state(), wotkitpy.CIRCUIT_OPEN)
+
+        self.assertRaises(wotkitpy.WotkitCircuitOpenException, self.proxy.get_sensor_by_id, self.sensor_id)
+        self.assertRaises(wotkitpy.WotkitCircuitOpenException, self.proxy.send_data_post, self.sensor_id, {"value": 1})
+        self.assertEqual(self.app.count("GET", "/sensors/"), 2)
+        self.assertEqual(self.app.count("POST", "/data"), 0)
+
+    def test_probe_closes_circuit(self):
+        self.app.fail(500, "GET", "/sensors/", times = 2)
+        for i in range(2):
+            self.assertRaises(wotkitpy.WotkitException, self.proxy.get_sensor_by_id, self.sensor_id)
+        time.sleep(0.06)
+        self.assertEqual(self.proxy.get_sensor_by_id(self.sensor_id)["name"], "sensor")
+        self.assertEqual(self.breaker.get_state(), wotkitpy.CIRCUIT_CLOSED)
+
+    def test_client_errors_do_not_open_circuit(self):
+        for i in range(3):
+            self.assertIsNone(self.proxy.get_sensor_by_id("12345"))
+        self.assertEqual(self.breaker.get_state(), wotkitpy.CIRCUIT_CLOSED)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+START = 1356998400000
+
+DOCUMENT = u'[{"id": 1, "value": 3.25, "message": "café \\"quoted\\" ]"}, 12, -0.5e3, true, null, "text", [1, [2]], {}]'
+
+def split(data, size):
+    return [ data[i:i + size] for i in range(0, len(data), size) ]
+
+class IterJsonArrayTest(unittest.TestCase):
+    def test_any_chunk_size(self):
+        data = DOCUMENT.encode("utf-8")
+        for size in range(1, len(data) + 1):
+            self.assertEqual(list(wotkitpy._iter_json_array(split(data, size))), json.loads(DOCUMENT), size)
+
+    def test_empty_array(self):
+        self.assertEqual(list(wotkitpy._iter_json_array([b" [ ", b"]"])), [])
+
+    def test_invalid_documents(self):
+        for data in (b'{"value": 1}', b'[1, 2', b'[1 2]', b'', b'[,,1,,]', b'[,1]', b'[1,,2]', b'[1,]', b'[1, 2,]', b'[{} {}]',
+                     b'["a" "b"]', b'[true false]', b'[1.5x]'):
+            for size in (1, 2, len(data) or 1):
+                self.assertRaises(ValueError, list, wotkitpy._iter_json_array(split(data, size)))
+
+class IterDataTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.fake.store.add_readings(self.fake.store.find_sensor(self.sensor_id), [ {"timestamp": START + i, "value": i} for i in range(100) ])
+
+    def test_iter_raw_data(self):
+        readings = self.proxy.iter_raw_data(self.sensor_id, start = START - 1, end = START + 99)
+        self.assertEqual(list(readings), self.proxy.get_raw_data(self.sensor_id, start = START - 1, end = START + 99))
+
+    def test_iter_aggregated_data(self):
+        readings = self.proxy.iter_aggregated_data(start = START - 1, end = START + 99, timestamp_format = wotkitpy.TIMESTAMP_MILLIS)
+        self.assertEqual([ reading["timestamp"] for reading in readings ], [ START + i for i in range(100) ])
+
+    def test_error_response(self):
+        self.app.fail(500, "GET", "/data")
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.iter_raw_data, self.sensor_id)
+
+if __name__ == "__main__":
+    unittest.main()
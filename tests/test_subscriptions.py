@@ -0,0 +1,45 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class ReconcileSensorSubscriptionsTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_ids = [ self.register("sensor%d" % i) for i in range(3) ]
+
+    def subscribed(self):
+        return sorted(str(sensor_id) for sensor_id in self.fake.store.subscriptions)
+
+    def test_applies_differences(self):
+        self.proxy.subscribe_sensor(self.sensor_ids[0])
+        self.proxy.subscribe_sensor(self.sensor_ids[1])
+        report = self.proxy.reconcile_sensor_subscriptions([self.sensor_ids[0], self.sensor_ids[2]])
+        self.assertEqual(report, {"subscribed": [self.sensor_ids[2]], "unsubscribed": [self.sensor_ids[1]],
+                                  "unchanged": [self.sensor_ids[0]], "failed": []})
+        self.assertEqual(self.subscribed(), sorted([self.sensor_ids[0], self.sensor_ids[2]]))
+
+    def test_failed_subscribe_reported(self):
+        report = self.proxy.reconcile_sensor_subscriptions([self.sensor_ids[0], "99999"])
+        self.assertEqual(report["subscribed"], [self.sensor_ids[0]])
+        self.assertEqual(len(report["failed"]), 1)
+        sensor_id, action, error = report["failed"][0]
+        self.assertEqual((sensor_id, action), ("99999", "subscribe"))
+        self.assertIsInstance(error, wotkitpy.WotkitException)
+        self.assertEqual(self.subscribed(), [self.sensor_ids[0]])
+
+    def test_failed_unsubscribe_reported(self):
+        self.proxy.subscribe_sensor(self.sensor_ids[0])
+        self.app.fail(500, "DELETE", "/subscribe/")
+        report = self.proxy.reconcile_sensor_subscriptions([self.sensor_ids[1]])
+        self.assertEqual(report["subscribed"], [self.sensor_ids[1]])
+        self.assertEqual([ (sensor_id, action) for sensor_id, action, error in report["failed"] ], [(self.sensor_ids[0], "unsubscribe")])
+        self.assertIsInstance(report["failed"][0][2], wotkitpy.WotkitException)
+
+    def test_keeps_subscriptions_without_unsubscribe(self):
+        self.proxy.subscribe_sensor(self.sensor_ids[0])
+        report = self.proxy.reconcile_sensor_subscriptions([self.sensor_ids[1]], unsubscribe = False)
+        self.assertEqual(report["unsubscribed"], [])
+        self.assertEqual(self.subscribed(), sorted(self.sensor_ids[:2]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class SyncSensorsTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.ids = dict((name, int(self.register(name))) for name in ("kept", "described", "fielded", "removed"))
+        self.definitions = [
+            {"name": "kept", "longName": "kept", "description": "Test sensor"},
+            {"name": "described", "longName": "described", "description": "New description"},
+            {"name": "fielded", "fields": [{"name": "value", "type": "NUMBER", "units": "cm"}]},
+            {"name": "added", "longName": "added", "description": "Test sensor"},
+        ]
+
+    def test_dry_run_plan(self):
+        report = self.proxy.sync_sensors(self.definitions, delete = True, dry_run = True)
+        plan = report["plan"]
+        self.assertEqual([ definition["name"] for definition in plan["register"] ], ["added"])
+        self.assertEqual([ sensor_id for sensor_id, update_dict in plan["update"] ], [self.ids["described"]])
+        self.assertEqual([ (sensor_id, field_data["name"]) for sensor_id, field_data in plan["update_fields"] ], [(self.ids["fielded"], "value")])
+        self.assertEqual(plan["delete"], [self.ids["removed"]])
+        self.assertEqual(plan["unchanged"], ["kept"])
+        self.assertEqual((report["succeeded"], report["failed"]), ([], []))
+        self.assertEqual(self.app.count("PUT", "/sensors"), 0)
+
+    def test_applies_plan(self):
+        report = self.proxy.sync_sensors(self.definitions, delete = True)
+        self.assertEqual(report["failed"], [])
+        self.assertEqual(len(report["succeeded"]), 4)
+        store = self.fake.store
+        self.assertIsNotNone(store.find_sensor("added"))
+        self.assertIsNone(store.find_sensor("removed"))
+        self.assertEqual(store.find_sensor("described")["description"], "New description")
+        self.assertEqual(self.proxy.sync_sensors(self.definitions, dry_run = True)["plan"]["unchanged"], ["kept", "described", "fielded", "added"])
+
+    def test_failed_calls_reported(self):
+        self.app.fail(500, "PUT", "/fields/")
+        self.app.fail(500, "DELETE", "/sensors/")
+        report = self.proxy.sync_sensors(self.definitions, delete = True)
+        self.assertEqual(sorted(report["succeeded"]), [("register", "added"), ("update", self.ids["described"])])
+        failed = dict((action, (target, e)) for action, target, e in report["failed"])
+        self.assertEqual(sorted(failed), ["delete", "update_fields"])
+        self.assertEqual(failed["delete"][0], self.ids["removed"])
+        self.assertEqual(failed["update_fields"][0], (self.ids["fielded"], "value"))
+        for target, e in failed.values():
+            self.assertIsInstance(e, wotkitpy.WotkitException)
+        self.assertIsNotNone(self.fake.store.find_sensor("removed"))
+
+if __name__ == "__main__":
+    unittest.main()
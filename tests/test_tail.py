@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+START = 1356998400000
+
+class WotkitDataTailTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.sensor = self.fake.store.find_sensor(self.sensor_id)
+        self.delivered = []
+
+    def add(self, *timestamps):
+        self.fake.store.add_readings(self.sensor, [ {"timestamp": timestamp, "value": 1} for timestamp in timestamps ])
+
+    def callback(self, sensor_id, readings):
+        self.delivered.extend(reading["id"] for reading in readings)
+
+    def test_delivers_new_readings_once(self):
+        tail = wotkitpy.WotkitDataTail(self.proxy, batch_size = 2)
+        tail.add_sensor(self.sensor_id, self.callback, start = START - 10)
+        self.add(START, START + 1, START + 2)
+        self.assertEqual(tail.poll(), {self.sensor_id: 3})
+        self.assertEqual(tail.poll(), {self.sensor_id: 0})
+        self.add(START + 3)
+        self.assertEqual(tail.poll(), {self.sensor_id: 1})
+        self.assertEqual(len(self.delivered), 4)
+        self.assertEqual(tail.get_checkpoint(self.sensor_id), START + 3)
+
+    def test_readings_sharing_checkpoint_millisecond(self):
+        tail = wotkitpy.WotkitDataTail(self.proxy, batch_size = 2)
+        tail.add_sensor(self.sensor_id, self.callback, start = START - 10)
+        self.add(START, START, START, START, START, START + 1)
+        self.assertEqual(tail.poll(), {self.sensor_id: 6})
+        self.assertEqual(sorted(self.delivered), sorted(reading["id"] for reading in self.fake.store.readings[int(self.sensor_id)]))
+
+        self.add(START + 1)
+        self.assertEqual(tail.poll(), {self.sensor_id: 1})
+        self.assertEqual(len(set(self.delivered)), 7)
+
+    def test_resumes_from_checkpoint_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        checkpoint_file = os.path.join(directory, "tail.json")
+        tail = wotkitpy.WotkitDataTail(self.proxy, checkpoint_file = checkpoint_file)
+        tail.add_sensor(self.sensor_id, self.callback, start = START - 10)
+        self.add(START, START + 1)
+        tail.poll()
+
+        self.add(START + 2)
+        resumed = wotkitpy.WotkitDataTail(self.proxy, checkpoint_file = checkpoint_file)
+        resumed.add_sensor(self.sensor_id, self.callback)
+        self.assertEqual(resumed.poll(), {self.sensor_id: 1})
+        self.assertEqual(len(set(self.delivered)), 3)
+
+    def test_failed_callback_is_retried(self):
+        failures = [ValueError("callback failed")]
+
+        def callback(sensor_id, readings):
+            if failures:
+                raise failures.pop()
+            self.callback(sensor_id, readings)
+
+        tail = wotkitpy.WotkitDataTail(self.proxy)
+        tail.add_sensor(self.sensor_id, callback, start = START - 10)
+        self.add(START, START + 1)
+        self.assertEqual(tail.poll(), {self.sensor_id: 0})
+        self.assertEqual(tail.poll(), {self.sensor_id: 2})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta, tzinfo
+import random
+import unittest
+
+from support import wotkitpy
+
+START = 1356998400000
+
+class FixedOffset(tzinfo):
+    def __init__(self, hours):
+        self.offset = timedelta(hours = hours)
+
+    def utcoffset(self, dt):
+        return self.offset
+
+    def dst(self, dt):
+        return timedelta(0)
+
+class EncodeTimestampsTest(unittest.TestCase):
+    def test_formats(self):
+        timestamps = [START, START + 1, datetime(2013, 1, 1, 1, 2, 3, 4000), datetime(2013, 1, 1, 2, 0, tzinfo = FixedOffset(2)), "2013-01-01T00:00:00.000Z"]
+        self.assertEqual(wotkitpy.encode_wotkit_timestamps(timestamps),
+                         ["2013-01-01T00:00:00.000Z", "2013-01-01T00:00:00.001Z", "2013-01-01T01:02:03.004Z", "2013-01-01T00:00:00.000Z", "2013-01-01T00:00:00.000Z"])
+        self.assertEqual(wotkitpy.encode_wotkit_timestamps([]), [])
+
+    def test_matches_pure_python(self):
+        rng = random.Random(1)
+        millis = [ rng.randint(-10 ** 12, 4 * 10 ** 12) for i in range(2000) ]
+        self.assertEqual(wotkitpy.encode_wotkit_timestamps(millis), wotkitpy._encode_timestamps(millis))
+
+class DecodeTimestampsTest(unittest.TestCase):
+    def test_formats(self):
+        timestamps = ["2013-01-01T00:00:00Z", "2013-01-01T00:00:00.5Z", "2013-01-01T00:00:00.123456Z", "2013-01-01T02:00:00.000+02:00", START, str(START)]
+        self.assertEqual(wotkitpy.decode_wotkit_timestamps(timestamps), [START, START + 500, START + 123, START, START, START])
+        self.assertEqual(wotkitpy.decode_wotkit_timestamps([]), [])
+
+    def test_round_trip(self):
+        rng = random.Random(2)
+        millis = [ rng.randint(0, 4 * 10 ** 12) for i in range(2000) ]
+        strings = wotkitpy.encode_wotkit_timestamps(millis)
+        self.assertEqual(wotkitpy.decode_wotkit_timestamps(strings), millis)
+        self.assertEqual(wotkitpy._decode_timestamps(strings), millis)
+
+    def test_converted_readings(self):
+        readings = [ {"timestamp": START + i, "value": i} for i in range(2500) ]
+        converted = list(wotkitpy._iter_converted_timestamps(readings, wotkitpy.TIMESTAMP_ISO))
+        self.assertEqual(converted[2400], {"timestamp": "2013-01-01T00:00:02.400Z", "value": 2400})
+        self.assertEqual(readings[0]["timestamp"], START)
+        self.assertRaises(wotkitpy.WotkitConfigException, list, wotkitpy._iter_converted_timestamps(readings, "seconds"))
+
+if __name__ == "__main__":
+    unittest.main()
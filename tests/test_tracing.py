@@ -0,0 +1,58 @@
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+class WotkitTracerTest(WotkitTestCase):
+    def setUp(self):
+        WotkitTestCase.setUp(self)
+        self.sensor_id = self.register("sensor")
+        self.spans = []
+        self.proxy = self.make_proxy(tracer = wotkitpy.WotkitTracer(self.spans.append))
+
+    def test_span_of_call(self):
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        self.assertEqual(len(self.spans), 1)
+        span = self.spans[0]
+        self.assertEqual(span["name"], "get_sensor_by_id")
+        self.assertIsNone(span["error"])
+        self.assertEqual([ request["status"] for request in span["requests"] ], [200])
+
+    def test_only_endpoints_traced(self):
+        self.proxy.cache_stats()
+        self.proxy.compression_stats()
+        self.assertEqual(self.spans, [])
+
+    def test_span_of_failed_call(self):
+        self.app.fail(500, "GET", "/sensors/")
+        self.assertRaises(wotkitpy.WotkitException, self.proxy.get_sensor_by_id, self.sensor_id)
+        self.assertIn("WotkitException", self.spans[0]["error"])
+
+    def test_generator_span_lasts_until_exhausted(self):
+        self.register("other sensor")
+        sensors = self.proxy.iter_sensors(scope = "contributed")
+        next(sensors)
+        self.assertEqual(self.spans, [])
+        list(sensors)
+        self.assertEqual(len(self.spans), 1)
+        self.assertEqual(self.spans[0]["name"], "iter_sensors")
+        self.assertEqual(len(self.spans[0]["requests"]), 2)
+        self.assertGreater(self.spans[0]["duration"], 0)
+
+    def test_generator_span_finished_when_closed(self):
+        self.fake.store.add_readings(self.fake.store.find_sensor(self.sensor_id), [ {"value": i} for i in range(3) ])
+        readings = self.proxy.iter_raw_data(self.sensor_id)
+        next(readings)
+        readings.close()
+        self.assertEqual(len(self.spans), 1)
+        self.assertEqual(self.spans[0]["name"], "iter_raw_data")
+        self.assertEqual(len(self.spans[0]["requests"]), 1)
+
+    def test_calls_between_items_have_own_spans(self):
+        readings = self.proxy.iter_raw_data(self.sensor_id)
+        self.proxy.get_sensor_by_id(self.sensor_id)
+        list(readings)
+        self.assertEqual([ span["name"] for span in self.spans ], ["get_sensor_by_id", "iter_raw_data"])
+        self.assertEqual([ len(span["requests"]) for span in self.spans ], [1, 1])
+
+if __name__ == "__main__":
+    unittest.main()
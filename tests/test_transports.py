@@ -0,0 +1,99 @@
+import socket
+import sys
+import unittest
+
+from support import WotkitTestCase, wotkitpy
+
+import fake_wotkit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+START = 1356998400000
+
+class RecordingTransport():
+    """Any object with request() and close() can be a transport."""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.methods = []
+        self.closed = False
+
+    def request(self, method, url, **kwargs):
+        self.methods.append(method)
+        return self.transport.request(method, url, **kwargs)
+
+    def close(self):
+        self.closed = True
+
+class TransportTest(WotkitTestCase):
+    def test_custom_transport(self):
+        sensor_id = self.register("sensor")
+        transport = RecordingTransport(wotkitpy.InMemoryTransport(self.app))
+        proxy = self.make_proxy(transport = transport)
+        proxy.get_sensor_by_id(sensor_id)
+        proxy.send_data_post(sensor_id, {"value": 1})
+        proxy.close()
+        self.assertEqual(transport.methods, ["GET", "POST"])
+        self.assertFalse(transport.closed)
+
+    def test_application_error_raised(self):
+        def app(environ, start_response):
+            raise ValueError("application failed")
+        proxy = self.make_proxy(transport = wotkitpy.InMemoryTransport(app))
+        self.assertRaises(wotkitpy.WotkitException, proxy.get_sensor_by_id, "1")
+
+    @unittest.skipIf(httpx is None, "requires httpx")
+    def test_h2_not_installed(self):
+        modules = dict(sys.modules)
+        for name in list(sys.modules):
+            if name == "h2" or name.startswith("h2."):
+                del sys.modules[name]
+        sys.modules["h2"] = None
+        try:
+            self.assertRaises(wotkitpy.WotkitConfigException, wotkitpy.HttpxTransport)
+            wotkitpy.HttpxTransport(http2 = False).close()
+        finally:
+            sys.modules.clear()
+            sys.modules.update(modules)
+
+    def test_httpx_not_installed(self):
+        modules = dict(sys.modules)
+        sys.modules["httpx"] = None
+        try:
+            self.assertRaises(wotkitpy.WotkitConfigException, wotkitpy.HttpxTransport)
+        finally:
+            sys.modules.clear()
+            sys.modules.update(modules)
+
+@unittest.skipIf(httpx is None, "requires httpx")
+class HttpxTransportTest(unittest.TestCase):
+    def setUp(self):
+        self.server = fake_wotkit.FakeWotkit()
+        api_url = self.server.start()
+        self.addCleanup(self.server.stop)
+        self.server.store.register({"name": "sensor"})
+        self.transport = wotkitpy.HttpxTransport(http2 = False)
+        self.addCleanup(self.transport.close)
+        self.proxy = wotkitpy.WotkitProxy(api_url = api_url, username = "tester", password = "secret", transport = self.transport)
+
+    def test_requests(self):
+        self.assertEqual(self.proxy.get_sensor_by_id("1")["name"], "sensor")
+        self.assertIsNone(self.proxy.get_sensor_by_id("99999"))
+        self.proxy.send_data_post("1", {"value": 1, "message": "a b&c"})
+        self.proxy.send_bulk_data_put("1", [ {"timestamp": START + i, "value": i} for i in range(100) ])
+        self.assertEqual(self.server.store.readings[1][-1]["message"], "a b&c")
+        self.assertEqual(len(list(self.proxy.iter_raw_data("1", start = START - 1, end = START + 99))), 100)
+
+    def test_connection_error(self):
+        listener = socket.socket()
+        listener.bind(("127.0.0.1", 0))
+        port = listener.getsockname()[1]
+        listener.close()
+        proxy = wotkitpy.WotkitProxy(api_url = "http://127.0.0.1:%d/api" % port, username = "tester", password = "secret", transport = self.transport)
+        self.assertRaises(wotkitpy.WotkitException, proxy.get_sensor_by_id, "1")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,12 +27,36 @@ THE SOFTWARE.
 
 """
 
+import codecs
+import copy
 import json
 import requests
-
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from requests.compat import unquote, urlparse
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+import urllib3
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import functools
+from email.utils import mktime_tz, parsedate_tz
+import io
 import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
 import traceback
+import types
+import zlib
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 if __name__ == "main":
     logging.basicConfig()
@@ -42,9 +66,81 @@ log = logging.getLogger(__name__)
 QUERY_MAX_SENSORS = 1000
 REGISTER_MAX_SENSORS = 100
 
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_MAX_RETRIES = 0
+
+RANGE_SHARD_DURATION = 3600 * 1000
+RANGE_SHARD_ROWS = 5000
+RANGE_MIN_SHARD_DURATION = 1000
+
+TAIL_BATCH_SIZE = 1000
+TAIL_INTERVAL = 10.0
+
+ACTUATOR_WAIT_TIME = 20
+ACTUATOR_SHARED_WAIT_TIME = 1
+ACTUATOR_MAX_BACKOFF = 30.0
+ACTUATOR_LATENCY_SAMPLES = 1000
+
+DATA_CACHE_MAX_ROWS = 10000000
+DATA_CACHE_RECENT_WINDOW = 5 * 60 * 1000
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+BULK_MAX_PART_BYTES = 4 * 1024 * 1024
+BULK_MAX_PART_RECORDS = 10000
+
+TIMESTAMP_ISO = "iso"
+TIMESTAMP_MILLIS = "millis"
+TIMESTAMP_BLOCK_SIZE = 1000
+
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVEL = 6
+COMPRESSION_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+RETRY_MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_MAX_BACKOFF = 30.0
+RETRY_MAX_RETRY_AFTER = 120.0
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RECOVERY_TIMEOUT = 30.0
+CIRCUIT_HALF_OPEN_MAX_CALLS = 1
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+RATE_DATA_WRITE = "data_write"
+RATE_DATA_READ = "data_read"
+RATE_SENSOR_QUERY = "sensor_query"
+RATE_ACTUATOR = "actuator"
+
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+DEFAULT_CACHE_TTL = 60
+DEFAULT_CACHE_NEGATIVE_TTL = 10
+
+INGEST_MAX_BATCH_SIZE = 1000
+INGEST_MAX_BATCH_BYTES = 1024 * 1024
+INGEST_MAX_LATENCY = 1.0
+INGEST_MAX_QUEUE_SIZE = 100000
+
+BACKPRESSURE_BLOCK = "block"
+BACKPRESSURE_DROP_OLDEST = "drop_oldest"
+BACKPRESSURE_RAISE = "raise"
+
 class WotkitException(Exception):
     pass
 
+class WotkitQueueFullException(WotkitException):
+    pass
+
+class WotkitCircuitOpenException(WotkitException):
+    pass
+
 class WotkitConfigException(Exception):
     pass
 
@@ -55,6 +151,44 @@ def _get_required_field(field, **kwargs):
         raise WotkitConfigException("Missing required argument %s." % field)
     return value
 
+def _parallel_map(func, items, max_workers):
+    """Calls func(item) for every item on up to max_workers threads.
+
+    :rtype: list of (result, exception) tuples in the order of items. exception is None if func returned normally, otherwise result is None."""
+    items = list(items)
+    results = [None] * len(items)
+    lock = threading.Lock()
+    next_index = [0]
+
+    def work():
+        while True:
+            with lock:
+                index = next_index[0]
+                if index >= len(items):
+                    return
+                next_index[0] += 1
+            try:
+                results[index] = (func(items[index]), None)
+            except Exception as e:
+                results[index] = (None, e)
+
+    workers = [ threading.Thread(target = work) for i in range(min(max_workers, len(items)) - 1) ]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+    work()
+    for worker in workers:
+        worker.join()
+    return results
+
+def _sensor_value_differs(key, desired, current):
+    """Returns True if the current value of a sensor or field key differs from the desired one. Tags are compared in any order and the visibility in any case."""
+    if key == "tags" and isinstance(desired, list) and isinstance(current, list):
+        return set(desired) != set(current)
+    if key == "visibility" and hasattr(desired, "upper") and hasattr(current, "upper"):
+        return desired.upper() != current.upper()
+    return desired != current
+
 def get_wotkit_timestamp():
     """Returns the current timestamp in the ISO format WoTKit recognizes.
     :rtype: str. """
@@ -64,13 +198,1319 @@ def get_wotkit_timestamp():
     
     return dt + 'Z'
 
+_EPOCH = datetime(1970, 1, 1)
+
+def _timestamp_to_millis(timestamp):
+    """Converts a UNIX timestamp in milliseconds or an ISO timestamp string, as found in sensor data, to milliseconds since the epoch."""
+    try:
+        return int(timestamp)
+    except ValueError:
+        pass
+    value = timestamp.strip()
+    offset = 0
+    if value.endswith("Z"):
+        value = value[:-1]
+    elif len(value) > 6 and value[-6] in "+-" and value[-3] == ":":
+        offset = (int(value[-5:-3]) * 60 + int(value[-2:])) * 60000
+        if value[-6] == "-":
+            offset = -offset
+        value = value[:-6]
+    dt = datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%f" if "." in value else "%Y-%m-%dT%H:%M:%S")
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000 - offset
+
+def _require_numpy():
+    if numpy is None:
+        raise WotkitConfigException("Columnar results require the numpy package.")
+
+def _timestamps_to_millis_array(timestamps):
+    """Converts a list of timestamps as found in sensor data to an int64 array of milliseconds since the epoch."""
+    values = numpy.array(timestamps)
+    if values.dtype.kind in "iuf":
+        return values.astype(numpy.int64)
+    # ISO timestamps in UTC, without an offset, can be parsed by numpy at once
+    strings = numpy.char.rstrip(values.astype(str), "Z")
+    if numpy.char.str_len(strings).min() >= 19 and (numpy.char.rfind(strings, "+") < 10).all() and (numpy.char.rfind(strings, "-") < 10).all():
+        try:
+            return strings.astype("datetime64[ms]").astype(numpy.int64)
+        except ValueError:
+            pass
+    return numpy.array(_decode_timestamps(timestamps), dtype = numpy.int64)
+
+def _decode_timestamps(timestamps):
+    """Pure Python version of decode_wotkit_timestamps that parses each date only once."""
+    days_cache = {}
+    millis = []
+    for timestamp in timestamps:
+        # Parse "YYYY-MM-DDTHH:MM:SS[.fff...]Z" by slicing, anything else with _timestamp_to_millis
+        if isinstance(timestamp, (str, type(u""))) and len(timestamp) >= 20 and timestamp[10] == "T" and timestamp[-1] == "Z" and timestamp[19] in ".Z":
+            days = days_cache.get(timestamp[:10])
+            if days is None:
+                days = days_cache[timestamp[:10]] = (datetime.strptime(timestamp[:10], "%Y-%m-%d") - _EPOCH).days
+            fraction = timestamp[20:-1]
+            millis.append(((days * 24 + int(timestamp[11:13])) * 60 + int(timestamp[14:16])) * 60000 + int(timestamp[17:19]) * 1000 + (int((fraction + "00")[:3]) if fraction else 0))
+        else:
+            millis.append(_timestamp_to_millis(timestamp))
+    return millis
+
+def decode_wotkit_timestamps(timestamps):
+    """Converts many timestamps as found in sensor data, ISO strings or UNIX timestamps in milliseconds, to milliseconds since the epoch at once.
+
+    :param timestamps: The timestamps to convert.
+    :type timestamps: list.
+    :rtype: list of int."""
+    timestamps = list(timestamps)
+    if not timestamps:
+        return []
+    if numpy is not None:
+        return _timestamps_to_millis_array(timestamps).tolist()
+    return _decode_timestamps(timestamps)
+
+def _encode_timestamps(millis):
+    """Pure Python version of encode_wotkit_timestamps that formats each date only once."""
+    dates_cache = {}
+    strings = []
+    for value in millis:
+        days, remainder = divmod(int(value), 86400000)
+        date = dates_cache.get(days)
+        if date is None:
+            day = _EPOCH + timedelta(days = days)
+            date = dates_cache[days] = "%04d-%02d-%02dT" % (day.year, day.month, day.day)
+        seconds, milliseconds = divmod(remainder, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        strings.append("%s%02d:%02d:%02d.%03dZ" % (date, minutes // 60, minutes % 60, seconds, milliseconds))
+    return strings
+
+def encode_wotkit_timestamps(timestamps):
+    """Converts many timestamps, UNIX timestamps in milliseconds or UTC datetimes, to the ISO format WoTKit recognizes at once. Strings are assumed to be in that format already and are returned unchanged.
+
+    :param timestamps: The timestamps to convert.
+    :type timestamps: list.
+    :rtype: list of str."""
+    timestamps = list(timestamps)
+    if not timestamps:
+        return []
+    if numpy is not None:
+        values = numpy.array(timestamps)
+        if values.dtype.kind in "iuf":
+            return numpy.datetime_as_string(values.astype(numpy.int64).astype("datetime64[ms]"), unit = "ms", timezone = "UTC").tolist()
+
+    millis = []
+    strings = list(timestamps)
+    for index, timestamp in enumerate(timestamps):
+        if isinstance(timestamp, datetime):
+            if timestamp.utcoffset() is not None:
+                timestamp = timestamp.replace(tzinfo = None) - timestamp.utcoffset()
+            delta = timestamp - _EPOCH
+            timestamp = (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+        if not isinstance(timestamp, (str, type(u""))):
+            millis.append((index, timestamp))
+    if len(millis) < len(timestamps) or numpy is None:
+        encoded = _encode_timestamps([ timestamp for index, timestamp in millis ])
+    else:
+        encoded = encode_wotkit_timestamps([ timestamp for index, timestamp in millis ])
+    for (index, timestamp), string in zip(millis, encoded):
+        strings[index] = string
+    return strings
+
+def _iter_converted_timestamps(readings, timestamp_format):
+    """Generator over copies of readings whose timestamps are converted to timestamp_format, TIMESTAMP_ISO or TIMESTAMP_MILLIS, a block at a time."""
+    if timestamp_format not in (TIMESTAMP_ISO, TIMESTAMP_MILLIS):
+        raise WotkitConfigException("Unsupported timestamp format %s." % timestamp_format)
+    convert = encode_wotkit_timestamps if timestamp_format == TIMESTAMP_ISO else decode_wotkit_timestamps
+    readings = iter(readings)
+    while True:
+        block = []
+        for reading in readings:
+            block.append(reading)
+            if len(block) >= TIMESTAMP_BLOCK_SIZE:
+                break
+        if not block:
+            return
+        converted = convert([ reading["timestamp"] for reading in block ])
+        for reading, timestamp in zip(block, converted):
+            reading = dict(reading)
+            reading["timestamp"] = timestamp
+            yield reading
+
+_FIELD_DTYPES = {"NUMBER": "float64", "INTEGER": "int64", "BOOLEAN": "bool"}
+
+class WotkitColumns():
+    """Sensor data in columns: an int64 array of timestamps in milliseconds since the epoch and one numpy array per field.
+
+    Fields of type NUMBER, INTEGER and BOOLEAN become float64, int64 and bool arrays, other fields object arrays. masks holds a bool array per field that is True where a reading has no value for the field, those entries are 0, False or None in the field array."""
+
+    def __init__(self, timestamps, columns, masks):
+        self.timestamps = timestamps
+        self.columns = columns
+        self.masks = masks
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, field_name):
+        return self.columns[field_name]
+
+    def to_dataframe(self):
+        """Returns a pandas DataFrame indexed by the timestamps, with missing values as NaN or None.
+
+        :raises: WotkitConfigException if pandas is not installed"""
+        try:
+            import pandas
+        except ImportError:
+            raise WotkitConfigException("to_dataframe requires the pandas package.")
+        data = {}
+        for name, column in self.columns.items():
+            mask = self.masks[name]
+            if mask.any():
+                column = column.astype("float64" if column.dtype.kind in "iuf" else object)
+                column[mask] = numpy.nan if column.dtype.kind == "f" else None
+            data[name] = column
+        index = pandas.to_datetime(self.timestamps, unit = "ms")
+        return pandas.DataFrame(data, index = index, columns = sorted(self.columns))
+
+def _readings_to_columns(readings, field_types):
+    """Builds WotkitColumns from a list of readings. field_types maps field names to their WoTKit type, or None to infer the type from the values.
+
+    This is not a vectorized decode: the readings are dicts decoded from JSON, so each field still costs a Python level
+    lookup per reading before numpy sees the values, numpy only vectorizes the missing value masks and the type conversions.
+    For 10000 readings of five fields building the columns takes about 5 ms against about 13 ms to decode the JSON, so
+    columnar=True saves memory and later work on the arrays, not time spent fetching."""
+    _require_numpy()
+    timestamps = _timestamps_to_millis_array([ reading["timestamp"] for reading in readings ])
+    columns = {}
+    masks = {}
+    for name, field_type in field_types.items():
+        values = numpy.array([ reading.get(name) for reading in readings ], dtype = object)
+        mask = numpy.equal(values, None)
+        dtype = _FIELD_DTYPES.get(field_type)
+        if field_type is None and len(values) and not mask.all():
+            try:
+                numpy.array(values[~mask], dtype = "float64")
+                dtype = "float64"
+            except (TypeError, ValueError):
+                pass
+        if dtype is not None:
+            try:
+                columns[name] = numpy.where(mask, 0, values).astype(dtype)
+            except (TypeError, ValueError):
+                log.debug("Field %s has values that are not %s, keeping them as objects", name, field_type)
+                dtype = None
+        if dtype is None:
+            columns[name] = values
+        masks[name] = mask
+    return WotkitColumns(timestamps, columns, masks)
+
+class _StdlibJsonCodec():
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps(self, obj):
+        data = json.dumps(obj)
+        return data if isinstance(data, bytes) else data.encode("utf-8")
+
+class _OrjsonCodec():
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+    def dumps(self, obj):
+        try:
+            return self._orjson.dumps(obj, option = self._options)
+        except TypeError:
+            # orjson rejects some values the stdlib accepts, such as integers above 64 bits
+            return _StdlibJsonCodec().dumps(obj)
+
+class _UjsonCodec():
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, data):
+        return self._ujson.loads(data)
+
+    def dumps(self, obj):
+        return self._ujson.dumps(obj, ensure_ascii = False).encode("utf-8")
+
+class _SimplejsonCodec():
+    name = "simplejson"
+
+    def __init__(self):
+        import simplejson
+        self._simplejson = simplejson
+
+    def loads(self, data):
+        return self._simplejson.loads(data)
+
+    def dumps(self, obj):
+        data = self._simplejson.dumps(obj)
+        return data if isinstance(data, bytes) else data.encode("utf-8")
+
+JSON_CODECS = {"json": _StdlibJsonCodec, "orjson": _OrjsonCodec, "ujson": _UjsonCodec, "simplejson": _SimplejsonCodec}
+
+def set_json_codec(codec):
+    """Selects the JSON codec used to encode request bodies and decode responses, for all proxies.
+
+    :param codec: "json" (the standard library), "orjson", "ujson" or "simplejson", or an object with loads(bytes) and dumps(obj) methods where dumps returns UTF-8 encoded bytes.
+    :raises: WotkitConfigException if the codec is unknown or its package is not installed"""
+    global _json_codec
+    if codec in JSON_CODECS:
+        try:
+            codec = JSON_CODECS[codec]()
+        except ImportError:
+            raise WotkitConfigException("JSON codec %s is not installed." % codec)
+    elif not (hasattr(codec, "loads") and hasattr(codec, "dumps")):
+        raise WotkitConfigException("Unknown JSON codec %s." % str(codec))
+    _json_codec = codec
+
+def get_json_codec():
+    """Returns the JSON codec in use. Defaults to orjson when it is installed, otherwise the standard library."""
+    return _json_codec
+
+try:
+    _json_codec = _OrjsonCodec()
+except ImportError:
+    _json_codec = _StdlibJsonCodec()
+
+def _dump_json(obj):
+    """Encodes obj as UTF-8 JSON bytes with the selected codec."""
+    return _json_codec.dumps(obj)
+
+def _load_json(data):
+    """Decodes JSON bytes or str with the selected codec."""
+    return _json_codec.loads(data)
+
+_json_decoder = json.JSONDecoder()
+
+def _iter_json_array(chunks):
+    """Generator over the elements of a JSON array whose UTF-8 text arrives as an iterable of byte chunks. Each element is parsed as soon as it is complete, so only one element and one chunk are held at a time."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    # What may come next: "[" before the array, "first" an element or "]", "element" after a comma, "separator" a comma or "]"
+    expected = "["
+    chunks = iter(chunks)
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n":
+            position += 1
+        if position < len(buffer):
+            char = buffer[position]
+            if expected == "[":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                expected = "first"
+                position += 1
+                continue
+            if expected == "separator":
+                if char == "]":
+                    return
+                if char != ",":
+                    raise ValueError("Expected , or ] in JSON array at: " + buffer[position:position + 20])
+                expected = "element"
+                position += 1
+                continue
+            if char == "]" and expected == "first":
+                return
+            if char in ",]":
+                raise ValueError("Expected an element in JSON array at: " + buffer[position:position + 20])
+            try:
+                element, end = _json_decoder.raw_decode(buffer, position)
+            except ValueError:
+                end = None
+            # A number or literal is only complete once a character that cannot continue it has arrived, ie. "3." could still become "3.5"
+            if end is not None and not isinstance(element, (dict, list, type(u""))) and not buffer[end:].lstrip("0123456789+-.eE"):
+                end = None
+            if end is not None:
+                yield element
+                expected = "separator"
+                position = end
+                continue
+        chunk = next(chunks, None)
+        if chunk is None:
+            raise ValueError("Expected a JSON array" if expected == "[" else "Truncated JSON array")
+        buffer = buffer[position:] + decoder.decode(chunk)
+        position = 0
+
+class _JsonArrayBody():
+    """A file-like request body that reads a list of encoded JSON values as a JSON array, without joining them into one string first."""
+
+    def __init__(self, values):
+        self.values = values
+        self._length = sum([ len(value) for value in values ]) + max(len(values) - 1, 0) + 2
+        self._pieces = self._iter_pieces()
+        self._buffer = b""
+
+    def __len__(self):
+        return self._length
+
+    def copy(self):
+        """Returns a new body over the same values, read from the start."""
+        return _JsonArrayBody(self.values)
+
+    def _iter_pieces(self):
+        yield b"["
+        for index, value in enumerate(self.values):
+            if index:
+                yield b","
+            yield value
+        yield b"]"
+
+    def read(self, size = -1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            piece = next(self._pieces, None)
+            if piece is None:
+                break
+            self._buffer += piece
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
 def _load_response_json(response):
     """Load a the JSON response into Python format."""    
+    span = getattr(_trace_local, "span", None)
+    started = time.time() if span else None
     try:
-        return json.loads(response.text, encoding = response.encoding)
+        return _load_json(response.content)
     except Exception as e:
         raise WotkitException("Invalid JSON. Error: " + str(e))
+    finally:
+        if span:
+            span["decode"] += time.time() - started
      
+_MISSING = object()
+
+class _MetadataCache():
+    """A thread safe LRU cache whose entries expire after a time to live.
+
+    Entries are keyed by the sensor ID or owner.name they were requested with. The aliases of the sensors fetched are
+    remembered, also after their entries are evicted, so a write under one alias invalidates the entries under the other."""
+
+    def __init__(self, max_size, ttl, negative_ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._aliases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns a copy of the cached value, or _MISSING."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] < time.time():
+                self.misses += 1
+                return _MISSING
+            self._entries[key] = entry
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def put(self, key, value):
+        """Caches a copy of value. None values (sensors that don't exist) expire after negative_ttl."""
+        expires = time.time() + (self.negative_ttl if value is None else self.ttl)
+        with self._lock:
+            if key[0] == "sensor" and value is not None:
+                self._add_aliases(key[1], value)
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, copy.deepcopy(value))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last = False)
+                self.evictions += 1
+
+    def _add_aliases(self, sensor_id, sensor):
+        if len(self._aliases) > 3 * self.max_size:
+            # Forgetting aliases only makes invalidation more conservative
+            self._aliases.clear()
+        aliases = set([sensor_id, str(sensor.get("id"))])
+        if "owner" in sensor and "name" in sensor:
+            aliases.add(str(sensor["owner"]) + "." + str(sensor["name"]))
+        aliases = frozenset(aliases)
+        for alias in aliases:
+            self._aliases[alias] = aliases
+
+    def invalidate(self, sensor_id):
+        """Removes all entries of a sensor, under any of the ids and names it was cached with. If the other aliases of
+        the sensor are not known, entries under aliases of the other kind that are not known either are removed too."""
+        sensor_id = str(sensor_id)
+        with self._lock:
+            aliases = self._aliases.get(sensor_id)
+            stale = []
+            for key in self._entries:
+                if aliases is not None:
+                    if key[1] in aliases:
+                        stale.append(key)
+                elif key[1] == sensor_id or (key[1] not in self._aliases and key[1].isdigit() != sensor_id.isdigit()):
+                    stale.append(key)
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "size": len(self._entries)}
+
+class RetryPolicy():
+    """Decides whether and when a failed request made through a WotkitProxy is sent again.
+
+    Idempotent methods (GET, HEAD, OPTIONS, PUT and DELETE) are retried after connection errors,
+    timeouts and responses with a status in retry_statuses. Other methods, such as the POST of
+    send_data_post, may already have been applied by the WoTKit, so they are only retried when
+    the connection could not be made at all or the WoTKit answered 429 (Too Many Requests).
+
+    Retries wait backoff_factor * 2 ** attempt seconds, at most max_backoff, with full jitter.
+    A Retry-After header on the response is honored, and the response is returned as is if it
+    asks to wait longer than max_retry_after seconds.
+
+    Example:
+    wotkit_proxy = WotkitProxy(retry_policy = RetryPolicy(max_retries = 5), **wotkit_config)
+    """
+
+    def __init__(self, max_retries = RETRY_MAX_RETRIES, backoff_factor = RETRY_BACKOFF_FACTOR,
+                 max_backoff = RETRY_MAX_BACKOFF, jitter = True, retry_statuses = RETRY_STATUSES,
+                 idempotent_methods = RETRY_IDEMPOTENT_METHODS, respect_retry_after = True,
+                 max_retry_after = RETRY_MAX_RETRY_AFTER):
+        """
+        :param max_retries: Maximum number of times a request is sent again. (OPTIONAL, defaults to 3)
+        :type max_retries: int.
+        :param backoff_factor: Seconds to wait before the first retry, doubled on every following retry. (OPTIONAL, defaults to 0.5)
+        :type backoff_factor: float.
+        :param max_backoff: Maximum number of seconds to wait between two attempts. (OPTIONAL, defaults to 30)
+        :type max_backoff: float.
+        :param jitter: If True, the wait is a random time between 0 and the backoff so that clients do not retry in lockstep. (OPTIONAL, defaults to True)
+        :type jitter: bool.
+        :param retry_statuses: Response status codes after which idempotent requests are retried. (OPTIONAL, defaults to 429, 502, 503 and 504)
+        :type retry_statuses: tuple of int.
+        :param idempotent_methods: HTTP methods that are safe to send more than once. (OPTIONAL)
+        :type idempotent_methods: tuple of str.
+        :param respect_retry_after: If True, the Retry-After header of 429 and 503 responses is honored. (OPTIONAL, defaults to True)
+        :type respect_retry_after: bool.
+        :param max_retry_after: Responses asking to wait longer than this many seconds are not retried. (OPTIONAL, defaults to 120)
+        :type max_retry_after: float.
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.idempotent_methods = frozenset(method.upper() for method in idempotent_methods)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt):
+        """Returns the seconds to wait before retry number attempt + 1."""
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def retry_after(self, response):
+        """Returns the seconds the Retry-After header of response asks to wait, or None."""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        value = value.strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        parsed = parsedate_tz(value)
+        if parsed is None:
+            return None
+        return max(0.0, mktime_tz(parsed) - time.time())
+
+    def get_delay(self, method, attempt, response = None, exception = None):
+        """Returns the seconds to wait before sending the request again, or None if it should not be retried.
+
+        :param method: HTTP method of the request.
+        :type method: str.
+        :param attempt: Number of retries already made.
+        :type attempt: int.
+        :param response: The response received, if any.
+        :type response: requests.Response.
+        :param exception: The exception raised while sending the request, if any.
+        :type exception: Exception.
+        :rtype: float, or None."""
+        if attempt >= self.max_retries:
+            return None
+        idempotent = method.upper() in self.idempotent_methods
+
+        if exception is not None:
+            if isinstance(exception, requests.exceptions.ConnectTimeout):
+                return self.backoff(attempt)
+            if idempotent and isinstance(exception, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                                                     requests.exceptions.ChunkedEncodingError)):
+                return self.backoff(attempt)
+            return None
+
+        status = response.status_code
+        if status not in self.retry_statuses or (not idempotent and status != 429):
+            return None
+        delay = self.backoff(attempt)
+        if self.respect_retry_after and status in (429, 503):
+            retry_after = self.retry_after(response)
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                delay = max(delay, retry_after)
+        return delay
+
+class CircuitBreaker():
+    """Stops sending requests to a WoTKit that keeps failing.
+
+    After failure_threshold consecutive failures (connection errors, timeouts or 5xx responses)
+    the circuit opens and requests fail with a WotkitCircuitOpenException without reaching the network.
+    Once recovery_timeout seconds have passed the circuit is half open: up to half_open_max_calls
+    probe requests are let through, and the circuit closes again if they succeed or reopens if
+    one of them fails. A breaker can be shared between proxies talking to the same WoTKit.
+
+    Example:
+    wotkit_proxy = WotkitProxy(circuit_breaker = CircuitBreaker(failure_threshold = 10), **wotkit_config)
+    """
+
+    def __init__(self, failure_threshold = CIRCUIT_FAILURE_THRESHOLD, recovery_timeout = CIRCUIT_RECOVERY_TIMEOUT,
+                 half_open_max_calls = CIRCUIT_HALF_OPEN_MAX_CALLS):
+        """
+        :param failure_threshold: Number of consecutive failures that opens the circuit. (OPTIONAL, defaults to 5)
+        :type failure_threshold: int.
+        :param recovery_timeout: Seconds the circuit stays open before probe requests are let through. (OPTIONAL, defaults to 30)
+        :type recovery_timeout: float.
+        :param half_open_max_calls: Number of probe requests allowed at a time while the circuit is half open. (OPTIONAL, defaults to 1)
+        :type half_open_max_calls: int.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._rejected = 0
+        self._times_opened = 0
+
+    def get_state(self):
+        """Returns one of CIRCUIT_CLOSED, CIRCUIT_OPEN or CIRCUIT_HALF_OPEN."""
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def _update_state(self):
+        if self._state == CIRCUIT_OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+            self._state = CIRCUIT_HALF_OPEN
+            self._probes = 0
+
+    def before_request(self):
+        """Called before every request.
+
+        :raises: WotkitCircuitOpenException if the request must not be sent."""
+        with self._lock:
+            self._update_state()
+            if self._state == CIRCUIT_CLOSED:
+                return
+            if self._state == CIRCUIT_HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return
+            self._rejected += 1
+            if self._state == CIRCUIT_OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.time() - self._opened_at))
+                raise WotkitCircuitOpenException("Circuit open after %d consecutive failures, retrying in %.1f seconds." % (self._failures, retry_in))
+            raise WotkitCircuitOpenException("Circuit half open, waiting for probe requests to complete.")
+
+    def record_success(self):
+        """Called when a request completed without a server or network failure."""
+        with self._lock:
+            if self._state != CIRCUIT_CLOSED:
+                log.info("Circuit closed.")
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        """Called when a request failed with a server or network failure."""
+        with self._lock:
+            self._failures += 1
+            if self._state == CIRCUIT_HALF_OPEN or (self._state == CIRCUIT_CLOSED and self._failures >= self.failure_threshold):
+                log.warning("Circuit opened after %d consecutive failures." % self._failures)
+                self._state = CIRCUIT_OPEN
+                self._opened_at = time.time()
+                self._times_opened += 1
+
+    def is_failure(self, response):
+        """Returns True if response counts as a failure of the WoTKit."""
+        return response.status_code >= 500
+
+    def stats(self):
+        """Returns the state, consecutive failures, number of rejected requests and number of times the circuit opened.
+
+        :rtype: dict"""
+        with self._lock:
+            self._update_state()
+            return {"state": self._state, "failures": self._failures, "rejected": self._rejected, "times_opened": self._times_opened}
+
+class _TokenBucket():
+    """A token bucket that hands out future tokens as reservations, so that waiting callers are paced rate apart in the order they arrived."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._updated = time.time()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, now):
+        """Returns the seconds a request made at now would wait for a token."""
+        self._refill(now)
+        return max(0.0, (1.0 - self._tokens) / self.rate)
+
+    def reserve(self, now):
+        """Takes a token, possibly one that only becomes available later, and returns the seconds to wait for it."""
+        delay = self.delay(now)
+        self._tokens -= 1.0
+        return delay
+
+class RateLimiter():
+    """Paces the requests of one or more WotkitProxy objects with token buckets.
+
+    A global rate applies to every request, and separate rates can be set for each class of
+    endpoint: RATE_DATA_WRITE (sending and deleting data), RATE_DATA_READ (getting data),
+    RATE_SENSOR_QUERY (sensors, fields and subscriptions) and RATE_ACTUATOR (actuator messages
+    and subscriptions). A request waits until every bucket it belongs to has a token. Requests
+    beyond the burst are spaced evenly at the configured rate rather than sent together, so the
+    allowed rate is used fully without triggering the server's throttling.
+
+    The limiter is thread safe and can be shared between proxies using the same WoTKit account.
+
+    Example:
+    rate_limiter = RateLimiter(rate = 50, limits = {RATE_DATA_WRITE: 20, RATE_ACTUATOR: (5, 1)})
+    wotkit_proxy = WotkitProxy(rate_limiter = rate_limiter, **wotkit_config)
+    """
+
+    def __init__(self, rate = None, burst = None, limits = None, max_wait = None):
+        """
+        :param rate: Maximum requests per second over all endpoints. (OPTIONAL, defaults to no global limit)
+        :type rate: float.
+        :param burst: Number of requests that can be sent at once after a quiet period. (OPTIONAL, defaults to max(1, rate))
+        :type burst: float.
+        :param limits: Maps endpoint classes to a rate or a (rate, burst) tuple. (OPTIONAL)
+        :type limits: dict.
+        :param max_wait: If set, requests that would have to wait longer than this many seconds raise a WotkitException instead. (OPTIONAL, defaults to None)
+        :type max_wait: float.
+
+        :raises: WotkitConfigException"""
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._global = None
+        if rate is not None:
+            self._global = self._make_bucket(rate, burst)
+        self._buckets = {}
+        for endpoint_class, limit in (limits or {}).items():
+            if endpoint_class not in (RATE_DATA_WRITE, RATE_DATA_READ, RATE_SENSOR_QUERY, RATE_ACTUATOR):
+                raise WotkitConfigException("Unknown endpoint class %s." % endpoint_class)
+            if isinstance(limit, (tuple, list)):
+                self._buckets[endpoint_class] = self._make_bucket(*limit)
+            else:
+                self._buckets[endpoint_class] = self._make_bucket(limit)
+        self._stats = {}
+
+    def _make_bucket(self, rate, burst = None):
+        if rate <= 0:
+            raise WotkitConfigException("Rate must be greater than 0.")
+        if burst is None:
+            burst = max(1.0, rate)
+        return _TokenBucket(rate, burst)
+
+    def _get_buckets(self, endpoint_class):
+        buckets = []
+        if self._global is not None:
+            buckets.append(self._global)
+        if endpoint_class in self._buckets:
+            buckets.append(self._buckets[endpoint_class])
+        return buckets
+
+    def get_queue_delay(self, endpoint_class = None):
+        """Returns the seconds a request of endpoint_class made now would wait before being sent.
+
+        :param endpoint_class: One of the RATE_* endpoint classes, or None for the global limit only.
+        :type endpoint_class: str.
+        :rtype: float"""
+        with self._lock:
+            now = time.time()
+            return max([ bucket.delay(now) for bucket in self._get_buckets(endpoint_class) ] + [0.0])
+
+    def acquire(self, endpoint_class = None):
+        """Blocks until a request of endpoint_class may be sent.
+
+        :param endpoint_class: One of the RATE_* endpoint classes, or None for the global limit only.
+        :type endpoint_class: str.
+        :raises: WotkitException if the request would wait longer than max_wait.
+        :rtype: float, the seconds waited."""
+        with self._lock:
+            now = time.time()
+            buckets = self._get_buckets(endpoint_class)
+            delay = max([ bucket.delay(now) for bucket in buckets ] + [0.0])
+            if self.max_wait is not None and delay > self.max_wait:
+                raise WotkitException("Rate limit exceeded, the request would wait %.2f seconds." % delay)
+            for bucket in buckets:
+                bucket.reserve(now)
+            stats = self._stats.setdefault(endpoint_class, {"requests": 0, "delayed": 0, "wait_time": 0.0})
+            stats["requests"] += 1
+            if delay > 0:
+                stats["delayed"] += 1
+                stats["wait_time"] += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def stats(self):
+        """Returns, for each endpoint class, the number of requests, how many of them were delayed, the total seconds waited and the current queue delay.
+
+        :rtype: dict"""
+        with self._lock:
+            stats = dict((endpoint_class, dict(class_stats)) for endpoint_class, class_stats in self._stats.items())
+        for endpoint_class in stats:
+            stats[endpoint_class]["queue_delay"] = self.get_queue_delay(endpoint_class)
+        return stats
+
+class WotkitMetrics():
+    """Collects the requests a WotkitProxy sends, per HTTP method and endpoint.
+
+    For every endpoint it counts the requests by status code, the errors (exceptions and status codes of 400 and
+    above) and the retries, sums the request and response bytes, and keeps a histogram of the latency until the
+    response was received, or until its headers arrived for streamed responses. Endpoints are named after their URL with the IDs replaced, e.g. /sensors/{sensor}/data.
+    Read the metrics with snapshot() or to_prometheus(), or add a hook to be called with every request.
+
+    The metrics are thread safe and can be shared between proxies.
+
+    Example:
+    metrics = WotkitMetrics()
+    wotkit_proxy = WotkitProxy(metrics = metrics, **wotkit_config)
+    ...
+    print(metrics.to_prometheus())
+    """
+
+    def __init__(self, buckets = METRICS_LATENCY_BUCKETS):
+        """
+        :param buckets: Upper bounds in seconds of the latency histogram buckets. (OPTIONAL)
+        :type buckets: tuple of float."""
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._hooks = []
+
+    def add_hook(self, hook):
+        """Calls hook(request) after every request, where request is a dict with the "method", "endpoint", "status" (None if an exception was raised), "latency" in seconds, "request_bytes", "response_bytes", "retry" (True if the request was a retry) and "error" (the exception or None).
+
+        :param hook: The function to call. Exceptions it raises are logged.
+        :type hook: function."""
+        with self._lock:
+            self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self._hooks = [ added for added in self._hooks if added != hook ]
+
+    def record(self, request):
+        """Adds a request, a dict as passed to the hooks, to the metrics."""
+        status = "error" if request["status"] is None else str(request["status"])
+        with self._lock:
+            endpoint = self._endpoints.get((request["method"], request["endpoint"]))
+            if endpoint is None:
+                endpoint = self._endpoints[(request["method"], request["endpoint"])] = {"requests": 0, "errors": 0, "retries": 0, "status": {},
+                    "request_bytes": 0, "response_bytes": 0, "latency_sum": 0.0, "latency_buckets": [0] * (len(self.buckets) + 1)}
+            endpoint["requests"] += 1
+            endpoint["status"][status] = endpoint["status"].get(status, 0) + 1
+            if request["status"] is None or request["status"] >= 400:
+                endpoint["errors"] += 1
+            if request["retry"]:
+                endpoint["retries"] += 1
+            endpoint["request_bytes"] += request["request_bytes"]
+            endpoint["response_bytes"] += request["response_bytes"]
+            endpoint["latency_sum"] += request["latency"]
+            index = 0
+            while index < len(self.buckets) and request["latency"] > self.buckets[index]:
+                index += 1
+            endpoint["latency_buckets"][index] += 1
+            hooks = self._hooks
+        for hook in hooks:
+            try:
+                hook(request)
+            except Exception:
+                log.warning("Metrics hook failed: " + traceback.format_exc())
+
+    def snapshot(self):
+        """Returns the metrics of every endpoint, keyed by method and endpoint such as "GET /sensors/{sensor}". The latency histogram is a list of (upper bound, count) with cumulative counts, the last upper bound being infinity.
+
+        :rtype: dict"""
+        with self._lock:
+            snapshot = {}
+            for (method, endpoint_name), endpoint in self._endpoints.items():
+                cumulative = 0
+                histogram = []
+                for bound, count in zip(self.buckets + (float("inf"),), endpoint["latency_buckets"]):
+                    cumulative += count
+                    histogram.append((bound, cumulative))
+                snapshot[method + " " + endpoint_name] = {"method": method, "endpoint": endpoint_name, "requests": endpoint["requests"],
+                    "errors": endpoint["errors"], "retries": endpoint["retries"], "status": dict(endpoint["status"]),
+                    "request_bytes": endpoint["request_bytes"], "response_bytes": endpoint["response_bytes"],
+                    "latency": {"count": endpoint["requests"], "sum": endpoint["latency_sum"], "buckets": histogram}}
+            return snapshot
+
+    def to_prometheus(self, prefix = "wotkit"):
+        """Returns the metrics in the Prometheus text exposition format.
+
+        :param prefix: Prefix of the metric names. (OPTIONAL, defaults to "wotkit")
+        :type prefix: str.
+        :rtype: str."""
+        snapshot = self.snapshot()
+        names = sorted(snapshot)
+        lines = []
+
+        def family(name, metric_type, help_text):
+            lines.append("# HELP %s_%s %s" % (prefix, name, help_text))
+            lines.append("# TYPE %s_%s %s" % (prefix, name, metric_type))
+
+        def labels(endpoint, **extra):
+            pairs = [("method", endpoint["method"]), ("endpoint", endpoint["endpoint"])] + sorted(extra.items())
+            return "{" + ",".join([ '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in pairs ]) + "}"
+
+        family("requests_total", "counter", "Requests sent to the WoTKit by status code.")
+        for name in names:
+            for status, count in sorted(snapshot[name]["status"].items()):
+                lines.append("%s_requests_total%s %d" % (prefix, labels(snapshot[name], status = status), count))
+        for metric, help_text in (("errors", "Requests that raised an exception or returned a status code of 400 or above."),
+                                  ("retries", "Requests that were retries of a failed request."),
+                                  ("request_bytes", "Bytes of request bodies sent."),
+                                  ("response_bytes", "Bytes of response bodies received.")):
+            family(metric + "_total", "counter", help_text)
+            for name in names:
+                lines.append("%s_%s_total%s %d" % (prefix, metric, labels(snapshot[name]), snapshot[name][metric]))
+        family("request_duration_seconds", "histogram", "Seconds until the response was received.")
+        for name in names:
+            latency = snapshot[name]["latency"]
+            for bound, count in latency["buckets"]:
+                lines.append("%s_request_duration_seconds_bucket%s %d" % (prefix, labels(snapshot[name], le = "+Inf" if bound == float("inf") else repr(bound)), count))
+            lines.append("%s_request_duration_seconds_sum%s %r" % (prefix, labels(snapshot[name]), latency["sum"]))
+            lines.append("%s_request_duration_seconds_count%s %d" % (prefix, labels(snapshot[name]), latency["count"]))
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Clears the collected metrics."""
+        with self._lock:
+            self._endpoints = {}
+
+# The span of the WotkitProxy call running on each thread: None when there is none, False when it was not sampled
+_trace_local = threading.local()
+
+def _add_connect_time(phase, seconds):
+    timings = getattr(_trace_local, "connect", None)
+    if timings is not None:
+        timings[phase] += seconds
+
+class _TracedHTTPConnection(urllib3.connection.HTTPConnection):
+    def _new_conn(self):
+        started = time.time()
+        try:
+            return urllib3.connection.HTTPConnection._new_conn(self)
+        finally:
+            _add_connect_time("connect", time.time() - started)
+
+class _TracedHTTPSConnection(urllib3.connection.HTTPSConnection):
+    def _new_conn(self):
+        started = time.time()
+        try:
+            return urllib3.connection.HTTPSConnection._new_conn(self)
+        finally:
+            _add_connect_time("connect", time.time() - started)
+
+    def connect(self):
+        # connect() opens the socket with _new_conn() and then does the TLS handshake
+        timings = getattr(_trace_local, "connect", None)
+        started = time.time()
+        connect_before = timings["connect"] if timings is not None else 0.0
+        try:
+            return urllib3.connection.HTTPSConnection.connect(self)
+        finally:
+            if timings is not None:
+                timings["tls"] += time.time() - started - (timings["connect"] - connect_before)
+
+class _TracedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+class _TracedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+class _TracingHTTPAdapter(HTTPAdapter):
+    """An HTTPAdapter whose connections report how long opening the socket and the TLS handshake took."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TracedHTTPConnectionPool, "https": _TracedHTTPSConnectionPool}
+
+class WotkitTracer():
+    """Traces where the time of WotkitProxy calls goes.
+
+    A sampled call produces a span, a dict passed to exporter(span) when the call returns, with the "name" of the
+    method, its "start" time, "duration" in seconds and "error" (repr of the exception raised or None). Its "requests"
+    lists every HTTP request made, with the "method", "endpoint", "status", "error", whether an existing connection was
+    "reused", and the seconds spent on each phase: "connect" (DNS lookup and TCP connect), "tls" (TLS handshake), "wait"
+    (from sending the request until the first byte of the response) and "download" (reading the body, None for
+    streamed responses). The span also holds the total of each phase over its requests, and "decode", the seconds
+    spent decoding JSON responses. "connect" and "tls" are only measured by a RequestsTransport with trace_connections,
+    as the default transport of a proxy with a tracer is; otherwise they are 0 and connections count as reused.
+
+    Calls made from within a traced call, on the same thread, are part of its span. The span of a method that returns a
+    generator, such as iter_sensors or iter_raw_data, stays open until the generator is exhausted or closed.
+
+    Example:
+    tracer = WotkitTracer(lambda span: log.info("%s took %.3fs", span["name"], span["duration"]), sample_rate = 0.01)
+    wotkit_proxy = WotkitProxy(tracer = tracer, **wotkit_config)
+    """
+
+    def __init__(self, exporter, sample_rate = 1.0):
+        """
+        :param exporter: Called as exporter(span) with every finished span. Exceptions it raises are logged.
+        :type exporter: function.
+        :param sample_rate: Fraction of the calls that are traced, between 0 and 1. (OPTIONAL, defaults to 1)
+        :type sample_rate: float."""
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def _start_span(self, name):
+        """Returns a new span, or None if the call is not sampled."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return {"name": name, "start": time.time(), "duration": None, "error": None, "requests": [],
+                "connect": 0.0, "tls": 0.0, "wait": 0.0, "download": 0.0, "decode": 0.0}
+
+    def _finish_span(self, span):
+        span["duration"] = time.time() - span["start"]
+        try:
+            self.exporter(span)
+        except Exception:
+            log.warning("Span exporter failed: " + traceback.format_exc())
+
+def _traced(method):
+    """Decorates a WotkitProxy method to run it in a span of the proxy's tracer."""
+    @functools.wraps(method)
+    def traced(self, *args, **kwargs):
+        if self.tracer is None or getattr(_trace_local, "span", None) is not None:
+            return method(self, *args, **kwargs)
+        span = self.tracer._start_span(method.__name__)
+        _trace_local.span = span if span is not None else False
+        finished = True
+        try:
+            result = method(self, *args, **kwargs)
+            if isinstance(result, types.GeneratorType):
+                finished = False
+                return _traced_iteration(self.tracer, span, result)
+            return result
+        except Exception as e:
+            if span is not None:
+                span["error"] = repr(e)
+            raise
+        finally:
+            _trace_local.span = None
+            if span is not None and finished:
+                self.tracer._finish_span(span)
+    return traced
+
+def _traced_iteration(tracer, span, iterator):
+    """Yields the items of iterator, advancing it within span, which is finished once the iteration ends."""
+    try:
+        while True:
+            previous_span = getattr(_trace_local, "span", None)
+            _trace_local.span = span if span is not None else False
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _trace_local.span = previous_span
+            yield item
+    except Exception as e:
+        if span is not None:
+            span["error"] = repr(e)
+        raise
+    finally:
+        iterator.close()
+        if span is not None:
+            tracer._finish_span(span)
+
+class RequestsTransport():
+    """Sends the requests of a WotkitProxy with the requests library. This is the default transport.
+
+    One HTTPAdapter, and so one urllib3 pool of keep-alive connections, is shared by every thread. Sessions carry
+    per-thread state such as cookies, so each thread gets its own Session mounted on the shared adapter.
+
+    Any object with the same two methods can be passed to WotkitProxy as its transport: request(method, url, **kwargs),
+    which takes the params, data, headers, auth and stream arguments of requests.Session.request and returns an object
+    with the status_code, ok, headers, encoding, content and text attributes and the iter_content() and close() methods
+    of requests.Response, and close().
+    """
+
+    def __init__(self, **kwargs):
+        """
+        :param pool_connections: Number of per-host connection pools to keep. (OPTIONAL, defaults to 10)
+        :type pool_connections: int.
+        :param pool_maxsize: Maximum number of connections kept open to a single host. (OPTIONAL, defaults to 10)
+        :type pool_maxsize: int.
+        :param pool_block: If True, requests wait for a free connection once pool_maxsize connections to a host are in use instead of opening extra connections. (OPTIONAL, defaults to False)
+        :type pool_block: bool.
+        :param max_retries: Number of times a failed connection attempt is retried. Requests that reached the server are never retried. (OPTIONAL, defaults to 0)
+        :type max_retries: int.
+        :param keep_alive: If False, connections are closed after every request. (OPTIONAL, defaults to True)
+        :type keep_alive: bool.
+        :param trace_connections: If True, the time spent opening connections and on TLS handshakes is added to the spans of a WotkitTracer. (OPTIONAL, defaults to False)
+        :type trace_connections: bool.
+        :param adapter: A requests transport adapter to send the requests with, instead of an HTTPAdapter configured with the options above. (OPTIONAL)
+        :type adapter: requests.adapters.BaseAdapter."""
+        self._adapter = kwargs.get("adapter")
+        if self._adapter is None:
+            adapter_class = _TracingHTTPAdapter if kwargs.get("trace_connections") else HTTPAdapter
+            self._adapter = adapter_class(pool_connections = kwargs.get("pool_connections", DEFAULT_POOL_CONNECTIONS),
+                                          pool_maxsize = kwargs.get("pool_maxsize", DEFAULT_POOL_MAXSIZE),
+                                          max_retries = kwargs.get("max_retries", DEFAULT_MAX_RETRIES),
+                                          pool_block = kwargs.get("pool_block", False))
+        self.keep_alive = kwargs.get("keep_alive", True)
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def _get_session(self):
+        """Returns the requests Session of the calling thread, creating it on first use."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            if not self.keep_alive:
+                session.headers["Connection"] = "close"
+            self._local.session = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        """Sends a request and returns the requests.Response."""
+        return self._get_session().request(method, url, **kwargs)
+
+    def close(self):
+        """Closes all pooled connections."""
+        self._adapter.close()
+
+class _WsgiAdapter(requests.adapters.BaseAdapter):
+    """A requests transport adapter that calls a WSGI application in process instead of sending the request."""
+
+    def __init__(self, app):
+        requests.adapters.BaseAdapter.__init__(self)
+        self.app = app
+
+    def send(self, request, stream = False, timeout = None, verify = True, cert = None, proxies = None):
+        url = urlparse(request.url)
+        body = request.body
+        if body is None:
+            body = b""
+        elif hasattr(body, "read"):
+            body = body.read()
+        elif not isinstance(body, bytes):
+            body = body.encode("utf-8")
+
+        environ = {"REQUEST_METHOD": request.method, "SCRIPT_NAME": "", "PATH_INFO": unquote(url.path), "QUERY_STRING": url.query,
+                   "SERVER_NAME": url.hostname, "SERVER_PORT": str(url.port or (443 if url.scheme == "https" else 80)),
+                   "SERVER_PROTOCOL": "HTTP/1.1", "CONTENT_LENGTH": str(len(body)), "wsgi.version": (1, 0),
+                   "wsgi.url_scheme": url.scheme, "wsgi.input": io.BytesIO(body), "wsgi.errors": sys.stderr,
+                   "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False}
+        for name, value in request.headers.items():
+            key = name.upper().replace("-", "_")
+            if key == "CONTENT_TYPE":
+                environ[key] = value
+            elif key != "CONTENT_LENGTH":
+                environ["HTTP_" + key] = value
+
+        status_and_headers = []
+        chunks = []
+        def start_response(status, headers, exc_info = None):
+            status_and_headers[:] = [status, headers]
+            return chunks.append
+        result = self.app(environ, start_response)
+        try:
+            chunks.extend(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+        status, headers = status_and_headers
+        response = requests.Response()
+        response.status_code = int(status.split(" ", 1)[0])
+        response.reason = status.split(" ", 1)[-1]
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(b"".join(chunks))
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+class InMemoryTransport(RequestsTransport):
+    """Serves the requests of a WotkitProxy with a WSGI application called in process, for tests and benchmarks
+    without a WoTKit server or sockets. Requests are prepared and responses read by the requests library as with
+    RequestsTransport. Exceptions raised by the application are raised by the request.
+
+    Example:
+    wotkit_proxy = WotkitProxy(api_url = "http://wotkit.test/api", transport = InMemoryTransport(app))
+    """
+
+    def __init__(self, app):
+        """
+        :param app: The WSGI application, called with the path of the request URL.
+        :type app: function."""
+        RequestsTransport.__init__(self, adapter = _WsgiAdapter(app))
+
+class _HttpxResponse():
+    """An httpx response with the attributes of requests.Response that WotkitProxy reads."""
+
+    def __init__(self, response, transport):
+        self._response = response
+        self._transport = transport
+        self.status_code = response.status_code
+        self.ok = response.status_code < 400
+        self.headers = response.headers
+        self.encoding = response.encoding
+
+    @property
+    def content(self):
+        try:
+            return self._response.read()
+        except self._transport._httpx.HTTPError as e:
+            raise self._transport._translate_error(e, requests.exceptions.ChunkedEncodingError)
+
+    @property
+    def text(self):
+        self.content
+        return self._response.text
+
+    def iter_content(self, chunk_size = 1):
+        try:
+            for chunk in self._response.iter_bytes(chunk_size):
+                yield chunk
+        except self._transport._httpx.HTTPError as e:
+            raise self._transport._translate_error(e, requests.exceptions.ChunkedEncodingError)
+
+    def close(self):
+        self._response.close()
+
+class HttpxTransport():
+    """Sends the requests of a WotkitProxy with httpx, which multiplexes concurrent requests over one HTTP/2 connection
+    per host instead of opening a connection for each. Servers that do not support HTTP/2 are sent HTTP/1.1 requests.
+    Requires the httpx package, and the h2 package for HTTP/2 (pip install httpx[http2]).
+
+    One httpx Client is shared by every thread. httpx errors are raised as the matching requests exceptions, so they are
+    retried and handled the same way as with RequestsTransport.
+
+    Example:
+    wotkit_proxy = WotkitProxy(transport = HttpxTransport(), **wotkit_config)
+    """
+
+    def __init__(self, **kwargs):
+        """
+        :param http2: If False, only HTTP/1.1 is used. (OPTIONAL, defaults to True)
+        :type http2: bool.
+        :param max_connections: Maximum number of connections open at once. (OPTIONAL, defaults to 10)
+        :type max_connections: int.
+        :param timeout: Seconds to wait to connect and for each read, or None to wait forever. (OPTIONAL, defaults to None)
+        :type timeout: float.
+        :param verify: False to skip verifying the TLS certificates of servers, or the path of a CA bundle. (OPTIONAL, defaults to True)
+        :type verify: bool or str.
+
+        :raises: WotkitConfigException if httpx, or h2 for HTTP/2, is not installed"""
+        try:
+            import httpx
+        except ImportError:
+            raise WotkitConfigException("HttpxTransport requires the httpx package.")
+        self._httpx = httpx
+        max_connections = kwargs.get("max_connections", DEFAULT_POOL_MAXSIZE)
+        try:
+            self._client = httpx.Client(http2 = kwargs.get("http2", True), timeout = kwargs.get("timeout"), verify = kwargs.get("verify", True),
+                                        limits = httpx.Limits(max_connections = max_connections, max_keepalive_connections = max_connections))
+        except ImportError:
+            # httpx only imports h2 when a client uses HTTP/2
+            raise WotkitConfigException("HTTP/2 requires the h2 package, install httpx[http2].")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def _translate_error(self, e, default = requests.exceptions.ConnectionError):
+        """Returns the requests exception matching the httpx exception e."""
+        httpx = self._httpx
+        if isinstance(e, httpx.ConnectTimeout):
+            error_class = requests.exceptions.ConnectTimeout
+        elif isinstance(e, httpx.ReadTimeout):
+            error_class = requests.exceptions.ReadTimeout
+        elif isinstance(e, httpx.TimeoutException):
+            error_class = requests.exceptions.Timeout
+        elif isinstance(e, httpx.ConnectError):
+            error_class = requests.exceptions.ConnectionError
+        elif isinstance(e, httpx.TransportError):
+            error_class = default
+        else:
+            error_class = requests.exceptions.RequestException
+        return error_class("%s: %s" % (type(e).__name__, e))
+
+    def request(self, method, url, **kwargs):
+        """Sends a request, taking the same arguments as RequestsTransport.request, and returns the response."""
+        params = kwargs.get("params")
+        if params:
+            url += ("&" if "?" in url else "?") + requests.models.RequestEncodingMixin._encode_params(params)
+        headers = dict(kwargs.get("headers") or {})
+        data = kwargs.get("data")
+        if isinstance(data, dict):
+            headers.setdefault("content-type", "application/x-www-form-urlencoded")
+            data = requests.models.RequestEncodingMixin._encode_params(data)
+        if hasattr(data, "read"):
+            if hasattr(data, "__len__"):
+                headers["content-length"] = str(len(data))
+            data = iter(functools.partial(data.read, STREAM_CHUNK_SIZE), b"")
+        elif data is not None and not isinstance(data, bytes):
+            data = data.encode("utf-8")
+
+        try:
+            request = self._client.build_request(method, url, content = data, headers = headers)
+            response = self._client.send(request, auth = kwargs.get("auth"), stream = bool(kwargs.get("stream")))
+        except self._httpx.HTTPError as e:
+            raise self._translate_error(e)
+        return _HttpxResponse(response, self)
+
+    def close(self):
+        """Closes all connections."""
+        self._client.close()
+
 class WotkitProxy():
     """Acts as a network proxy to the WotKit based on the configuration supplied.
     
@@ -78,6 +1518,13 @@ class WotkitProxy():
     wotkit_proxy = WotkitProxy( WOTKIT_URL_HERE, USERNAME, PASSWORD)
     wotkit_proxy.get_sensor_by_id(SENSOR_ID_HERE)
 
+    All calls made through the proxy share one pool of keep-alive connections, so a single
+    proxy can (and should) be shared between threads. Call close() when done, or use the
+    proxy as a context manager:
+
+    with WotkitProxy(**wotkit_config) as wotkit_proxy:
+        wotkit_proxy.get_sensor_by_id(SENSOR_ID_HERE)
+
     """
     
     def __init__(self, **kwargs):
@@ -89,11 +1536,297 @@ class WotkitProxy():
         :type username: str.
         :param password: The default password or key password that will be used. (OPTIONAL)
         :type password: str.
+        :param pool_connections: Number of per-host connection pools to keep. (OPTIONAL, defaults to 10)
+        :type pool_connections: int.
+        :param pool_maxsize: Maximum number of connections kept open to a single host. (OPTIONAL, defaults to 10)
+        :type pool_maxsize: int.
+        :param pool_block: If True, requests wait for a free connection once pool_maxsize connections to a host are in use instead of opening extra connections. (OPTIONAL, defaults to False)
+        :type pool_block: bool.
+        :param max_retries: Number of times a failed connection attempt is retried. Requests that reached the server are never retried. (OPTIONAL, defaults to 0)
+        :type max_retries: int.
+        :param keep_alive: If False, connections are closed after every request. (OPTIONAL, defaults to True)
+        :type keep_alive: bool.
+        :param cache_size: If greater than 0, up to this many results of get_sensor_by_id, get_sensor_by_name and get_sensor_fields are cached. Cached sensors are invalidated when they are updated or deleted through this proxy. (OPTIONAL, defaults to 0)
+        :type cache_size: int.
+        :param cache_ttl: Seconds a cached sensor or field stays valid. (OPTIONAL, defaults to 60)
+        :type cache_ttl: float.
+        :param cache_negative_ttl: Seconds it is remembered that a sensor does not exist. (OPTIONAL, defaults to 10)
+        :type cache_negative_ttl: float.
+        :param compression: "gzip" or "deflate" to compress the request bodies of send_data_post, send_bulk_data_put and register_multiple_sensors. If the WoTKit rejects a compressed body, it is sent again uncompressed and compression is turned off. (OPTIONAL, defaults to None)
+        :type compression: str.
+        :param compression_min_size: Bodies smaller than this many bytes are sent uncompressed. (OPTIONAL, defaults to 1024)
+        :type compression_min_size: int.
+        :param compression_level: zlib compression level from 1 (fastest) to 9 (smallest). (OPTIONAL, defaults to 6)
+        :type compression_level: int.
+        :param retry_policy: Retries failed requests with exponential backoff. See RetryPolicy. (OPTIONAL, defaults to no retries)
+        :type retry_policy: RetryPolicy.
+        :param circuit_breaker: Fails requests fast while the WoTKit keeps failing. See CircuitBreaker. (OPTIONAL, defaults to None)
+        :type circuit_breaker: CircuitBreaker.
+        :param rate_limiter: Paces requests to stay within the WoTKit's rate limits. See RateLimiter. (OPTIONAL, defaults to None)
+        :type rate_limiter: RateLimiter.
+        :param metrics: Collects the number, latency, size and status codes of the requests per endpoint. See WotkitMetrics. (OPTIONAL, defaults to None)
+        :type metrics: WotkitMetrics.
+        :param tracer: Records how long each phase of the requests of sampled calls takes. See WotkitTracer. (OPTIONAL, defaults to None)
+        :type tracer: WotkitTracer.
+        :param transport: Sends the requests, e.g. an HttpxTransport for HTTP/2 or an InMemoryTransport. The pool options and keep_alive only apply to the default RequestsTransport. A transport passed in is not closed by close(), so it can be shared by several proxies. (OPTIONAL, defaults to a RequestsTransport)
+        :type transport: RequestsTransport.
 
         :raises: WotkitConfigException """
         self.api_url = _get_required_field("api_url", **kwargs)
         self.username = kwargs.get("username", "")
         self.password = kwargs.get("password", "")
+        self.keep_alive = kwargs.get("keep_alive", True)
+        self.tracer = kwargs.get("tracer")
+
+        self.transport = kwargs.get("transport")
+        self._owns_transport = self.transport is None
+        if self.transport is None:
+            self.transport = RequestsTransport(pool_connections = kwargs.get("pool_connections", DEFAULT_POOL_CONNECTIONS),
+                                               pool_maxsize = kwargs.get("pool_maxsize", DEFAULT_POOL_MAXSIZE),
+                                               max_retries = kwargs.get("max_retries", DEFAULT_MAX_RETRIES),
+                                               pool_block = kwargs.get("pool_block", False),
+                                               keep_alive = self.keep_alive,
+                                               trace_connections = self.tracer is not None)
+        self._closed = False
+
+        self._cache = None
+        if kwargs.get("cache_size", 0) > 0:
+            self._cache = _MetadataCache(kwargs["cache_size"], kwargs.get("cache_ttl", DEFAULT_CACHE_TTL), kwargs.get("cache_negative_ttl", DEFAULT_CACHE_NEGATIVE_TTL))
+
+        self.compression = kwargs.get("compression")
+        if self.compression is not None and self.compression not in COMPRESSION_WBITS:
+            raise WotkitConfigException("Unsupported compression %s." % self.compression)
+        self.compression_min_size = kwargs.get("compression_min_size", COMPRESSION_MIN_SIZE)
+        self.compression_level = kwargs.get("compression_level", COMPRESSION_LEVEL)
+        self._compression_lock = threading.Lock()
+        self._compression_stats = {"compressed_requests": 0, "bytes_before": 0, "bytes_after": 0, "fallbacks": 0}
+
+        self.retry_policy = kwargs.get("retry_policy")
+        self.circuit_breaker = kwargs.get("circuit_breaker")
+        self.rate_limiter = kwargs.get("rate_limiter")
+        self.metrics = kwargs.get("metrics")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def close(self):
+        """Closes all pooled connections of the default transport. The proxy cannot be used after it is closed."""
+        self._closed = True
+        if self._owns_transport:
+            self.transport.close()
+
+    def cache_stats(self):
+        """Returns the hits, misses, evictions and size of the sensor cache.
+
+        :rtype: dict, or None if caching is disabled."""
+        if self._cache is None:
+            return None
+        return self._cache.stats()
+
+    def clear_cache(self):
+        """Removes all cached sensors and fields."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _invalidate_sensor(self, sensor_id):
+        if self._cache is not None:
+            self._cache.invalidate(sensor_id)
+
+    def compression_stats(self):
+        """Returns the number of compressed requests, their total size before and after compression, and the number of compressed requests the WoTKit rejected.
+
+        :rtype: dict"""
+        with self._compression_lock:
+            return dict(self._compression_stats)
+
+    def _compress(self, body):
+        """Returns body, bytes or a file-like object, compressed with the configured compression."""
+        compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, COMPRESSION_WBITS[self.compression])
+        if isinstance(body, bytes):
+            return compressor.compress(body) + compressor.flush()
+        compressed = []
+        while True:
+            chunk = body.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            compressed.append(compressor.compress(chunk))
+        compressed.append(compressor.flush())
+        return b"".join(compressed)
+
+    def _request_body(self, method, url, body, **kwargs):
+        """Sends a request with body, bytes or a _JsonArrayBody, compressed when compression is configured and the body is at least compression_min_size bytes."""
+        if self.compression is None or len(body) < self.compression_min_size:
+            return self._request(method, url, data = body, **kwargs)
+
+        compressed_body = self._compress(body)
+        headers = dict(kwargs.pop("headers", None) or {})
+        compressed_headers = dict(headers)
+        compressed_headers["Content-Encoding"] = self.compression
+        response = self._request(method, url, data = compressed_body, headers = compressed_headers, **kwargs)
+        with self._compression_lock:
+            self._compression_stats["compressed_requests"] += 1
+            self._compression_stats["bytes_before"] += len(body)
+            self._compression_stats["bytes_after"] += len(compressed_body)
+
+        if response.status_code in (400, 415):
+            # The WoTKit may not accept compressed bodies, try again without compression
+            if isinstance(body, _JsonArrayBody):
+                body = body.copy()
+            response = self._request(method, url, data = body, headers = headers, **kwargs)
+            if response.ok:
+                log.warning("The WoTKit rejected a %s compressed body, turning compression off." % self.compression)
+                self.compression = None
+                with self._compression_lock:
+                    self._compression_stats["fallbacks"] += 1
+        return response
+
+    def _request(self, method, url, **kwargs):
+        """Performs an HTTP request through the transport and returns the response.
+
+        Every attempt waits for the rate_limiter and is checked by the circuit_breaker. Failed requests are retried according to retry_policy.
+
+        :raises: WotkitCircuitOpenException if the circuit breaker is open."""
+        attempt = 0
+        endpoint_class = None
+        if self.rate_limiter is not None:
+            endpoint_class = self._get_endpoint_class(method, url)
+        endpoint_name = None
+        if self.metrics is not None:
+            endpoint_name = self._get_endpoint_name(url)
+        while True:
+            if self._closed:
+                raise WotkitException("WotkitProxy is closed.")
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(endpoint_class)
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before_request()
+
+            response = None
+            started = time.time()
+            try:
+                span = getattr(_trace_local, "span", None)
+                if span:
+                    response = self._traced_request(span, method, url, attempt, kwargs)
+                else:
+                    response = self.transport.request(method, url, **kwargs)
+            except Exception as e:
+                if self.metrics is not None:
+                    self._record_metrics(method, endpoint_name, kwargs, attempt, started, exception = e)
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure()
+                delay = self._get_retry_delay(method, attempt, kwargs, exception = e)
+                if delay is None:
+                    raise
+                log.info("%s %s failed with %r, retrying in %.2f seconds.", method, url, e, delay)
+            else:
+                if self.metrics is not None:
+                    self._record_metrics(method, endpoint_name, kwargs, attempt, started, response = response)
+                if self.circuit_breaker is not None:
+                    if self.circuit_breaker.is_failure(response):
+                        self.circuit_breaker.record_failure()
+                    else:
+                        self.circuit_breaker.record_success()
+                delay = self._get_retry_delay(method, attempt, kwargs, response = response)
+                if delay is None:
+                    return response
+                log.info("%s %s returned %d, retrying in %.2f seconds.", method, url, response.status_code, delay)
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+            if isinstance(kwargs.get("data"), _JsonArrayBody):
+                kwargs["data"] = kwargs["data"].copy()
+
+    def _traced_request(self, span, method, url, attempt, kwargs):
+        """Performs an HTTP request, adding the time spent on each of its phases to span."""
+        timings = {"connect": 0.0, "tls": 0.0}
+        entry = {"method": method, "endpoint": self._get_endpoint_name(url), "status": None, "error": None, "retry": attempt > 0,
+                 "reused": True, "connect": 0.0, "tls": 0.0, "wait": None, "download": None}
+        span["requests"].append(entry)
+        _trace_local.connect = timings
+        started = time.time()
+        headers_received = None
+        try:
+            # Stream the response so the wait for the first byte and the download are timed separately
+            response = self.transport.request(method, url, **dict(kwargs, stream = True))
+            headers_received = time.time()
+            if not kwargs.get("stream"):
+                response.content
+                entry["download"] = time.time() - headers_received
+            entry["status"] = response.status_code
+            return response
+        except Exception as e:
+            entry["error"] = repr(e)
+            raise
+        finally:
+            _trace_local.connect = None
+            entry["connect"] = timings["connect"]
+            entry["tls"] = timings["tls"]
+            entry["reused"] = timings["connect"] == 0.0
+            entry["wait"] = max(0.0, (headers_received or time.time()) - started - timings["connect"] - timings["tls"])
+            for phase in ("connect", "tls", "wait", "download"):
+                span[phase] += entry[phase] or 0.0
+
+    def _get_endpoint_class(self, method, url):
+        """Returns the RATE_* endpoint class of a request, or None if it only counts towards the global rate."""
+        path = url[len(self.api_url):] if url.startswith(self.api_url) else url
+        segments = path.split("?", 1)[0].strip("/").split("/")
+        if segments[0] == "control" or segments[-1] == "message":
+            return RATE_ACTUATOR
+        if segments[0] == "data" or (segments[0] == "sensors" and len(segments) > 2 and segments[2] in ("data", "dataTable")):
+            return RATE_DATA_READ if method == "GET" else RATE_DATA_WRITE
+        if segments[0] in ("sensors", "subscribe"):
+            return RATE_SENSOR_QUERY
+        return None
+
+    def _get_endpoint_name(self, url):
+        """Returns the path of url relative to api_url with the IDs replaced by placeholders, e.g. /sensors/{sensor}/fields/{field}."""
+        path = url[len(self.api_url):] if url.startswith(self.api_url) else url
+        segments = path.split("?", 1)[0].strip("/").split("/")
+        placeholders = {"sensors": "{sensor}", "subscribe": "{sensor}", "users": "{user}", "sub": "{id}", "fields": "{field}", "data": "{timestamp}"}
+        names = []
+        for index, segment in enumerate(segments):
+            # An ID follows a collection name, unless that name was replaced as an ID itself or is the top level /data
+            previous = names[-1] if names else None
+            if previous in placeholders and not (previous == "data" and index == 1):
+                segment = placeholders[previous]
+            names.append(segment)
+        return "/" + "/".join(names)
+
+    def _record_metrics(self, method, endpoint_name, kwargs, attempt, started, response = None, exception = None):
+        latency = time.time() - started
+        body = kwargs.get("data")
+        if isinstance(body, dict):
+            # Form data is sent URL encoded
+            body = requests.models.RequestEncodingMixin._encode_params(body)
+            if not isinstance(body, bytes):
+                body = body.encode("utf-8")
+        try:
+            request_bytes = len(body) if body is not None else 0
+        except TypeError:
+            request_bytes = 0
+        response_bytes = 0
+        if response is not None:
+            if kwargs.get("stream"):
+                response_bytes = int(response.headers.get("Content-Length") or 0)
+            else:
+                response_bytes = len(response.content)
+        self.metrics.record({"method": method, "endpoint": endpoint_name, "status": None if response is None else response.status_code,
+                             "latency": latency, "request_bytes": request_bytes, "response_bytes": response_bytes,
+                             "retry": attempt > 0, "error": exception})
+
+    def _get_retry_delay(self, method, attempt, kwargs, response = None, exception = None):
+        """Returns the seconds to wait before retrying the request, or None if it is not retried."""
+        if self.retry_policy is None:
+            return None
+        data = kwargs.get("data")
+        if hasattr(data, "read") and not isinstance(data, _JsonArrayBody):
+            # A file-like body that was already read cannot be sent again
+            return None
+        return self.retry_policy.get_delay(method, attempt, response = response, exception = exception)
     
     def _get_login_credentials(self, username = None, password = None):
         """Returns a (username, password) tuple. Uses the defaults supplied upon initialization if username or password are empty."""
@@ -102,6 +1835,7 @@ class WotkitProxy():
         else:
             return (self.username, self.password)
     
+    @_traced
     def get_sensor_by_name(self, sensor_name, username = None, password = None):
         '''Get a sensor by name.
 
@@ -117,6 +1851,7 @@ class WotkitProxy():
         user, pwd = self._get_login_credentials(username, password)
         return self.get_sensor_by_id(user + "." + sensor_name, user, pwd)
 
+    @_traced
     def get_sensor_by_id(self, sensor_id, username = None, password = None):
         '''Get a sensor by ID.
 
@@ -131,22 +1866,36 @@ class WotkitProxy():
         
         sensor_id = str(sensor_id)
         auth_credentials = self._get_login_credentials(username, password)
+
+        if self._cache is not None:
+            cache_key = ("sensor", sensor_id, None, auth_credentials)
+            sensor = self._cache.get(cache_key)
+            if sensor is not _MISSING:
+                return sensor
         
         url = self.api_url+'/sensors/'+sensor_id
         try:
-            response = requests.get(url, auth = auth_credentials)
+            response = self._request("GET", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in getting sensor " + sensor_id + ". Error: " + str(e))
 
         if response.status_code == 200:
-            log.debug("Success getting sensor " + sensor_id)
-            return _load_response_json(response)
+            log.debug("Success getting sensor %s", sensor_id)
+            sensor = _load_response_json(response)
+            if self._cache is not None:
+                self._cache.put(cache_key, sensor)
+            return sensor
         elif response.status_code == 404:
-            log.debug("Sensor doesn't exist " + sensor_id)
+            log.debug("Sensor doesn't exist %s", sensor_id)
+            if self._cache is not None:
+                self._cache.put(cache_key, None)
             return None
         else:
-            raise WotkitException("Error in getting sensor " + sensor_id + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in getting sensor " + sensor_id + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
 
+    @_traced
     def query_all_sensors(self, **kwargs):
         """Searches all sensors that match the search query. A wrapper function on top of query_sensors that performs multiple API calls to retrieve all matches for search results more than 1000 sensors.
 
@@ -172,21 +1921,101 @@ class WotkitProxy():
         :param password: Used in combination with username.
         :type password: str.
 
+        :param concurrency: number of pages of 1000 sensors to request at once. Pages past the end of the results are requested speculatively and discarded. (Defaults to 1, one page at a time.)
+        :type concurrency: int.
+
         :rtype: list of dict's containing each sensor's data. Empty list of no matches. 
         :raises: WotkitException if a status code is not 200's"""
+        concurrency = kwargs.pop("concurrency", 1)
+        if concurrency > 1:
+            return self._query_all_sensors_concurrently(concurrency, **kwargs)
+
         sensors = {}
+        for result_sensor in self.iter_sensors(**kwargs):
+            sensors[result_sensor['id']] = result_sensor
+        return sensors.items()
+
+    @_traced
+    def iter_sensors(self, **kwargs):
+        """Generator over all sensors that match the search query. Takes the same search parameters as query_all_sensors, but yields each sensor as its page of 1000 arrives instead of collecting every sensor first. Only the ids of sensors already yielded are kept, to skip sensors that move between pages while paging.
+
+        :param keys: if given, only these keys of each sensor are kept, ie. keys=["id", "name"].
+        :type keys: list of str.
+
+        :rtype: generator of dict's containing each sensor's data.
+        :raises: WotkitException if a status code is not 200's"""
+        keys = kwargs.pop("keys", None)
+        seen_ids = set()
         kwargs["offset"] = 0
         kwargs["limit"] = QUERY_MAX_SENSORS
         while True:
             result_sensors = self.query_sensors(**kwargs)
             if not result_sensors:
                 break
-            log.debug("Searching.. found %d sensors.." % len(result_sensors))
+            log.debug("Searching.. found %d sensors..", len(result_sensors))
             for result_sensor in result_sensors:
+                sensor_id = result_sensor['id']
+                if sensor_id in seen_ids:
+                    continue
+                seen_ids.add(sensor_id)
+                if keys is not None:
+                    result_sensor = dict([ (key, result_sensor[key]) for key in keys if key in result_sensor ])
+                yield result_sensor
+            # The WoTKit may return fewer sensors than the limit, continue after the last one returned
+            kwargs["offset"] += len(result_sensors)
+            del result_sensors
+
+    def _query_all_sensors_concurrently(self, concurrency, **kwargs):
+        """query_all_sensors with up to concurrency windows of QUERY_MAX_SENSORS in flight. Each worker thread takes the
+        next window and requests it until it is full or a page comes back empty, in case the WoTKit caps the page size.
+        An empty window marks the end of the results."""
+        lock = threading.Lock()
+        state = {"next_offset": 0, "end_offset": None}
+        pages = {}
+        errors = []
+
+        def fetch_pages():
+            while True:
+                with lock:
+                    if errors or (state["end_offset"] is not None and state["next_offset"] > state["end_offset"]):
+                        return
+                    offset = state["next_offset"]
+                    state["next_offset"] += QUERY_MAX_SENSORS
+                result_sensors = []
+                try:
+                    while len(result_sensors) < QUERY_MAX_SENSORS:
+                        page = self.query_sensors(**dict(kwargs, offset = offset + len(result_sensors), limit = QUERY_MAX_SENSORS - len(result_sensors)))
+                        if not page:
+                            break
+                        result_sensors.extend(page)
+                except Exception as e:
+                    with lock:
+                        errors.append(e)
+                    return
+                with lock:
+                    pages[offset] = result_sensors
+                    if not result_sensors and (state["end_offset"] is None or offset < state["end_offset"]):
+                        state["end_offset"] = offset
+
+        workers = [ threading.Thread(target = fetch_pages) for i in range(concurrency) ]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if errors:
+            raise errors[0]
+
+        sensors = {}
+        for offset in sorted(pages):
+            if offset > state["end_offset"]:
+                break
+            log.debug("Searching.. found %d sensors..", len(pages[offset]))
+            for result_sensor in pages[offset]:
                 sensors[result_sensor['id']] = result_sensor
-            kwargs["offset"] += QUERY_MAX_SENSORS
         return sensors.items()
 
+    @_traced
     def query_sensors(self, **kwargs):
         """Searches sensors that match the search query. 
         
@@ -223,15 +2052,18 @@ class WotkitProxy():
         search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
         
         try:
-            response = requests.get(self.api_url + "/sensors", params=search_params, auth=auth_credentials)
+            response = self._request("GET", self.api_url + "/sensors", params=search_params, auth=auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in querying sensor. Params: " + str(search_params) + ", Error: " + str(e))
         
         if not response.ok:
-            raise WotkitException("Error in querying sensor. Params: " + str(search_params) + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in querying sensor. Params: " + str(search_params) + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
         
         return _load_response_json(response)
 
+    @_traced
     def register_sensor(self, registration_dict, username = None, password = None):
         """Registers a new sensor to the WoTKit. 
         
@@ -246,21 +2078,24 @@ class WotkitProxy():
         
         auth_credentials = self._get_login_credentials(username, password)
         url = self.api_url+'/sensors'
-        json_data = json.dumps(registration_dict)
+        json_data = _dump_json(registration_dict)
         headers = {"content-type": "application/json"}
         try:
-            response = requests.post(url = url, auth=auth_credentials, data = json_data, headers = headers)
+            response = self._request("POST", url, auth=auth_credentials, data = json_data, headers = headers)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in registering sensor to url: " + url + ". Registration Data: " + str(registration_dict) + ". Error: " + str(e))
+        self._invalidate_sensor(auth_credentials[0] + "." + str(registration_dict.get("name")))
         
         if response.ok:
-            log.debug("Success registering sensor for sensor: " + str(registration_dict["name"]))
+            log.debug("Success registering sensor for sensor: %s", registration_dict["name"])
             return True
         else:
-            msg = "Error while registering sensor '%s' to url: %s \nResp: %s"
-            resp = json.loads(response.content)
-            raise WotkitException(msg % (registration_dict["name"], url, resp))
+            msg = "Error while registering sensor '%s' to url: %s \n Response Code: %d\n Response Text: %s"
+            raise WotkitException(msg % (registration_dict["name"], url, response.status_code, response.text))
 
+    @_traced
     def register_multiple_sensors(self, registration_list, username = None, password = None):
         """Registers multiple new sensor to the WoTKit. If there are more than 100 sensor's in registration_list, performs multiple bulk registration requests to the WoTKit.
         
@@ -274,24 +2109,76 @@ class WotkitProxy():
         :raises: WotkitException if a status code is not 200's"""
         
         auth_credentials = self._get_login_credentials(username, password)
-        url = self.api_url+'/sensors'
-
-        headers = {"content-type": "application/json"}
         
         for registration_chunk in [ registration_list[i:i+REGISTER_MAX_SENSORS] for i in range(0, len(registration_list), REGISTER_MAX_SENSORS) ]:
-            json_data = json.dumps(registration_chunk)
+            self._register_sensor_chunk(registration_chunk, auth_credentials)
+
+        log.debug("Success registering multiple sensors to url: %s/sensors", self.api_url)
+        return True
+
+    @_traced
+    def register_multiple_sensors_concurrently(self, registration_list, concurrency = 4, bisect = False, username = None, password = None):
+        """Registers multiple new sensors to the WoTKit like register_multiple_sensors, but sends up to concurrency chunks of 100 sensors at once and does not stop at the first failed chunk.
+
+        :param registration_list: See register_multiple_sensors.
+        :type registration_list: list of dict
+        :param concurrency: number of chunks registered at once.
+        :type concurrency: int.
+        :param bisect: if True, a failed chunk is split in halves which are retried until the registrations that fail on their own are found. Otherwise every registration of a failed chunk is reported as failed.
+        :type bisect: bool.
+
+        :param username: If provided with password, overrides the default login credentials supplied on initialization.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str.
+        :rtype: dict with "succeeded", the list of registered registration_dict's, and "failed", a list of (registration_dict, WotkitException) tuples."""
+
+        auth_credentials = self._get_login_credentials(username, password)
+        report = {"succeeded": [], "failed": []}
+
+        def register_chunk(registration_chunk):
             try:
-                response = requests.put(url = url, auth=auth_credentials, data = json_data, headers = headers)
-            except Exception as e:
-                raise WotkitException("Error in registering multiple sensors to url: " + url + ". Registration Chunk: " + str(registration_chunk) + ". Error: " + str(e))
+                self._register_sensor_chunk(registration_chunk, auth_credentials)
+            except WotkitException as e:
+                if not bisect or len(registration_chunk) == 1:
+                    return [], [ (registration, e) for registration in registration_chunk ]
+                middle = len(registration_chunk) // 2
+                first_succeeded, first_failed = register_chunk(registration_chunk[:middle])
+                second_succeeded, second_failed = register_chunk(registration_chunk[middle:])
+                return first_succeeded + second_succeeded, first_failed + second_failed
+            return registration_chunk, []
+
+        registration_chunks = [ registration_list[i:i+REGISTER_MAX_SENSORS] for i in range(0, len(registration_list), REGISTER_MAX_SENSORS) ]
+        for result, error in _parallel_map(register_chunk, registration_chunks, concurrency):
+            if error is not None:
+                raise error
+            succeeded, failed = result
+            report["succeeded"].extend(succeeded)
+            report["failed"].extend(failed)
+
+        log.debug("Registered %d sensors, %d failed", len(report["succeeded"]), len(report["failed"]))
+        return report
+
+    def _register_sensor_chunk(self, registration_chunk, auth_credentials):
+        """Registers up to 100 sensors in one bulk PUT request.
 
-            if not response.ok:
-                msg = "Error in registering multiple sensors to url: " + url + ". Registration Chunk: " + str(registration_chunk) + ". Code: " + str(response.status_code) + ". Response: " + json.loads(response.text)
-                raise msg
+        :raises: WotkitException if a status code is not 200's"""
+        url = self.api_url+'/sensors'
+        json_data = _dump_json(registration_chunk)
+        headers = {"content-type": "application/json"}
+        try:
+            response = self._request_body("PUT", url, json_data, auth=auth_credentials, headers = headers)
+        except WotkitException:
+            raise
+        except Exception as e:
+            raise WotkitException("Error in registering multiple sensors to url: " + url + ". Registration Chunk: " + str(registration_chunk) + ". Error: " + str(e))
+        for registration in registration_chunk:
+            self._invalidate_sensor(auth_credentials[0] + "." + str(registration.get("name")))
 
-        log.debug("Success registering multiple sensors to url: " + url)
-        return True
+        if not response.ok:
+            raise WotkitException("Error in registering multiple sensors to url: " + url + ". Registration Chunk: " + str(registration_chunk) + ". Code: " + str(response.status_code) + ". Response: " + response.text)
         
+    @_traced
     def update_sensor(self, sensor_id, update_dict, username = None, password = None):
         """Updates a sensor on the WoTKit. 
 
@@ -309,20 +2196,24 @@ class WotkitProxy():
         auth_credentials = self._get_login_credentials(username, password)
         sensor_id = str(sensor_id)
         url = self.api_url + "/sensors/" + sensor_id
-        json_data = json.dumps(update_dict)
+        json_data = _dump_json(update_dict)
         headers = {"content-type": "application/json"}
         try:
-            response = requests.put(url = url, auth=auth_credentials, data = json_data, headers = headers)
+            response = self._request("PUT", url, auth=auth_credentials, data = json_data, headers = headers)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in updating sensor to url: " + url + ". Update Data: " + str(update_dict) + ". Error: " + str(e))
+        self._invalidate_sensor(sensor_id)
         
         if response.ok:
-            log.debug("Success updating sensor schema for url " + url)
+            log.debug("Success updating sensor schema for url %s", url)
             return True
         else:
             raise WotkitException("Error while updating sensor %s to url: %s  " % (sensor_id, url) + ", Reason: " + str(response.text))
 
 
+    @_traced
     def delete_sensor(self, sensor_id, username = None, password = None):
         """Delete sensor from WoTKit.
         
@@ -340,17 +2231,145 @@ class WotkitProxy():
         auth_credentials = self._get_login_credentials(username, password)
         
         try:
-            delete_response = requests.delete(url, auth = auth_credentials)
+            delete_response = self._request("DELETE", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in deleting sensor at url: " + url + ". Error: " + str(e)) 
+        self._invalidate_sensor(sensor_id)
         
         if delete_response.ok:
-            log.debug("Deleted sensor %s" % sensor_id)
+            log.debug("Deleted sensor %s", sensor_id)
             return True
         else:
-            msg = "Failed to delete sensor %s: code: %d. Message: %s" % (sensor_id, delete_response.status_code, delete_response.text.encode(delete_response.encoding))
+            msg = "Failed to delete sensor %s: code: %d. Message: %s" % (sensor_id, delete_response.status_code, delete_response.text)
             raise WotkitException(msg)
 
+    @_traced
+    def sync_sensors(self, sensor_definitions, **kwargs):
+        """Makes the sensors on the WoTKit match sensor_definitions with as few calls as possible. The current sensors are fetched with query_all_sensors and matched by name: missing sensors are registered in chunks of 100 with register_multiple_sensors_concurrently, sensors whose metadata or tags differ are updated with update_sensor, and listed fields that are missing or differ are updated with update_sensor_field. Keys a definition leaves out and fields it does not list are left as they are. The calls are made up to concurrency at once and a failed call does not stop the others.
+
+        :param sensor_definitions: The registration_dict of each sensor, see register_sensor.
+        :type sensor_definitions: list of dict.
+        :param delete: if True, the sensors found by the query that are not in sensor_definitions are deleted. (Defaults to False)
+        :type delete: bool.
+        :param dry_run: if True, the plan is returned without making any changes. (Defaults to False)
+        :type dry_run: bool.
+        :param concurrency: number of calls made at once. (Defaults to 4)
+        :type concurrency: int.
+
+        :param scope: The search parameters of query_all_sensors (scope, tags, orgs, visibility, text, active, location) select the current sensors. (Defaults to scope "contributed")
+        :type scope: str.
+
+        :param username: If provided with password, overrides the default login credentials supplied on initialization.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str.
+        :raises: WotkitException if the current sensors cannot be fetched
+        :rtype: dict with "plan", a dict of "register" (list of registration_dict's), "update" (list of (sensor ID, update_dict) tuples), "update_fields" (list of (sensor ID, field_data) tuples), "delete" (list of sensor IDs) and "unchanged" (list of sensor names); "succeeded", a list of (action, target) tuples; and "failed", a list of (action, target, WotkitException) tuples. action is a key of the plan, target the sensor name for "register", (sensor ID, field name) for "update_fields" and the sensor ID otherwise."""
+
+        delete = kwargs.pop("delete", False)
+        dry_run = kwargs.pop("dry_run", False)
+        concurrency = kwargs.pop("concurrency", 4)
+        username = kwargs.get("username")
+        password = kwargs.get("password")
+        kwargs.setdefault("scope", "contributed")
+
+        plan = self._plan_sensor_sync(sensor_definitions, delete, concurrency, **kwargs)
+        report = {"plan": plan, "succeeded": [], "failed": []}
+        log.debug("Sensor sync plan: %d to register, %d to update, %d fields to update, %d to delete, %d unchanged",
+                  len(plan["register"]), len(plan["update"]), len(plan["update_fields"]), len(plan["delete"]), len(plan["unchanged"]))
+        if dry_run:
+            return report
+
+        if plan["register"]:
+            registered = self.register_multiple_sensors_concurrently(plan["register"], concurrency, bisect = True, username = username, password = password)
+            report["succeeded"].extend([ ("register", registration["name"]) for registration in registered["succeeded"] ])
+            report["failed"].extend([ ("register", registration["name"], e) for registration, e in registered["failed"] ])
+
+        # The changes to one sensor are made in order by one worker
+        changes = OrderedDict()
+        for sensor_id, update_dict in plan["update"]:
+            changes.setdefault(sensor_id, []).append(("update", sensor_id, update_dict))
+        for sensor_id, field_data in plan["update_fields"]:
+            changes.setdefault(sensor_id, []).append(("update_fields", (sensor_id, field_data["name"]), field_data))
+        for sensor_id in plan["delete"]:
+            changes.setdefault(sensor_id, []).append(("delete", sensor_id, None))
+
+        def apply_changes(sensor_changes):
+            succeeded = []
+            failed = []
+            for action, target, data in sensor_changes:
+                try:
+                    if action == "update":
+                        self.update_sensor(target, data, username, password)
+                    elif action == "update_fields":
+                        self.update_sensor_field(target[0], target[1], data, username, password)
+                    else:
+                        self.delete_sensor(target, username, password)
+                except WotkitException as e:
+                    failed.append((action, target, e))
+                else:
+                    succeeded.append((action, target))
+            return succeeded, failed
+
+        for result, error in _parallel_map(apply_changes, list(changes.values()), concurrency):
+            if error is not None:
+                raise error
+            report["succeeded"].extend(result[0])
+            report["failed"].extend(result[1])
+
+        log.debug("Synced sensors, %d calls succeeded, %d failed", len(report["succeeded"]), len(report["failed"]))
+        return report
+
+    def _plan_sensor_sync(self, sensor_definitions, delete, concurrency, **kwargs):
+        """Returns the plan of sync_sensors, the changes that make the sensors found by query_all_sensors(**kwargs) match sensor_definitions."""
+        owner = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))[0]
+        current = OrderedDict()
+        for sensor_id, sensor in self.query_all_sensors(concurrency = concurrency, **kwargs):
+            name = sensor.get("name")
+            if name not in current or sensor.get("owner") == owner:
+                current[name] = sensor
+
+        plan = {"register": [], "update": [], "update_fields": [], "delete": [], "unchanged": []}
+        matched = []
+        for definition in sensor_definitions:
+            sensor = current.get(definition["name"])
+            if sensor is None:
+                plan["register"].append(definition)
+            else:
+                matched.append((definition, sensor))
+
+        # Sensors from the query normally include their fields, otherwise they are fetched for the sensors with fields to compare
+        without_fields = [ sensor for definition, sensor in matched if "fields" in definition and sensor.get("fields") is None ]
+        fetched_fields = {}
+        for sensor, (fields, error) in zip(without_fields, _parallel_map(lambda sensor: self.get_sensor_fields(sensor["id"], username = kwargs.get("username"), password = kwargs.get("password")), without_fields, concurrency)):
+            if error is not None:
+                raise error
+            fetched_fields[sensor["id"]] = fields
+
+        for definition, sensor in matched:
+            changed = False
+            update_dict = dict((key, value) for key, value in definition.items() if key != "fields")
+            if any(_sensor_value_differs(key, value, sensor.get(key, _MISSING)) for key, value in update_dict.items()):
+                plan["update"].append((sensor["id"], update_dict))
+                changed = True
+            current_fields = fetched_fields.get(sensor["id"], sensor.get("fields") or [])
+            current_fields = dict((field.get("name"), field) for field in current_fields)
+            for field_data in definition.get("fields") or []:
+                current_field = current_fields.get(field_data["name"])
+                if current_field is None or any(_sensor_value_differs(key, value, current_field.get(key, _MISSING)) for key, value in field_data.items()):
+                    plan["update_fields"].append((sensor["id"], field_data))
+                    changed = True
+            if not changed:
+                plan["unchanged"].append(definition["name"])
+
+        if delete:
+            defined = set(definition["name"] for definition in sensor_definitions)
+            plan["delete"] = [ sensor["id"] for name, sensor in current.items() if name not in defined ]
+        return plan
+
+    @_traced
     def get_sensor_subscriptions(self, username = None, password = None):
         """View sensors that user is subscribed to.
         
@@ -364,15 +2383,18 @@ class WotkitProxy():
         url = self.api_url + "/subscribe"
         auth_credentials = self._get_login_credentials(username, password)
         try:
-            response = requests.get(url, auth = auth_credentials)
+            response = self._request("GET", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in getting sensor subscriptions at url: " + url + ". Error: " + str(e))
         
         if response.ok:
             return _load_response_json(response)
         else:
-            raise WotkitException("Error in getting subscriptions\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in getting subscriptions\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
         
+    @_traced
     def subscribe_sensor(self, sensor_id, username = None, password = None):
         """Subscribe to sensor for user.
 
@@ -388,15 +2410,18 @@ class WotkitProxy():
         url = self.api_url + "/subscribe/" + sensor_id
         auth_credentials = self._get_login_credentials(username, password)
         try:
-            response = requests.put(url, auth = auth_credentials)
+            response = self._request("PUT", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in sensor subscribe at url: " + url + ". Error: " + str(e))
         
         if response.ok:
             return True
         else:
-            raise WotkitException("Error in sensor subscribe for sensor: " + sensor_id + ".\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in sensor subscribe for sensor: " + sensor_id + ".\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
             
+    @_traced
     def unsubscribe_sensor(self, sensor_id, username = None, password = None):
         """Unsubscribe sensor for user.
 
@@ -412,15 +2437,74 @@ class WotkitProxy():
         url = self.api_url + "/subscribe/" + sensor_id
         auth_credentials = self._get_login_credentials(username, password)
         try:
-            response = requests.delete(url, auth = auth_credentials)
+            response = self._request("DELETE", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in sensor unsubscribe at url: " + url + ". Error: " + str(e))
         
         if response.ok:
             return True
         else:
-            raise WotkitException("Error in sensor unsubscribe for sensor: " + sensor_id + ".\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in sensor unsubscribe for sensor: " + sensor_id + ".\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
     
+    @_traced
+    def reconcile_sensor_subscriptions(self, sensor_ids, concurrency = 4, unsubscribe = True, username = None, password = None):
+        """Subscribes the user to exactly the sensors in sensor_ids. The current subscriptions are fetched with get_sensor_subscriptions and only the sensors that differ are subscribed or unsubscribed, up to concurrency at once. A failed call does not stop the others.
+
+        :param sensor_ids: IDs or names (owner.name) of the sensors the user should be subscribed to.
+        :type sensor_ids: list of str.
+        :param concurrency: number of subscribe and unsubscribe calls made at once.
+        :type concurrency: int.
+        :param unsubscribe: if False, subscriptions to sensors not in sensor_ids are kept.
+        :type unsubscribe: bool.
+
+        :param username: If provided with password, overrides the default login credentials supplied on initialization.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str.
+        :raises: WotkitException if the current subscriptions cannot be fetched
+        :rtype: dict with "subscribed", "unsubscribed" and "unchanged", lists of sensor IDs, and "failed", a list of (sensor ID, "subscribe" or "unsubscribe", WotkitException) tuples. Every sensor appears in one of them."""
+
+        current = {}
+        for sensor in self.get_sensor_subscriptions(username, password):
+            current[str(sensor.get("id"))] = sensor
+            current[str(sensor.get("owner")) + "." + str(sensor.get("name"))] = sensor
+
+        report = {"subscribed": [], "unsubscribed": [], "unchanged": [], "failed": []}
+        desired = set()
+        changes = []
+        for sensor_id in OrderedDict((str(sensor_id), None) for sensor_id in sensor_ids):
+            sensor = current.get(sensor_id)
+            if sensor is None:
+                changes.append(("subscribe", sensor_id))
+            else:
+                desired.add(str(sensor.get("id")))
+                report["unchanged"].append(sensor_id)
+        if unsubscribe:
+            for key, sensor in current.items():
+                if key == str(sensor.get("id")) and key not in desired:
+                    changes.append(("unsubscribe", key))
+
+        def apply_change(change):
+            action, sensor_id = change
+            if action == "subscribe":
+                return self.subscribe_sensor(sensor_id, username, password)
+            return self.unsubscribe_sensor(sensor_id, username, password)
+
+        for (action, sensor_id), (result, error) in zip(changes, _parallel_map(apply_change, changes, concurrency)):
+            if error is None:
+                report[action + "d"].append(sensor_id)
+            elif isinstance(error, WotkitException):
+                report["failed"].append((sensor_id, action, error))
+            else:
+                raise error
+
+        log.debug("Subscribed %d sensors, unsubscribed %d, %d unchanged, %d failed", len(report["subscribed"]),
+                  len(report["unsubscribed"]), len(report["unchanged"]), len(report["failed"]))
+        return report
+
+    @_traced
     def get_sensor_fields(self, sensor_id, field_name = None, username = None, password = None):
         """Get sensor fields.
 
@@ -440,17 +2524,29 @@ class WotkitProxy():
         if field_name:
             url += "/" + field_name
         auth_credentials = self._get_login_credentials(username, password)
+
+        if self._cache is not None:
+            cache_key = ("fields", sensor_id, field_name, auth_credentials)
+            fields = self._cache.get(cache_key)
+            if fields is not _MISSING:
+                return fields
         
         try:
-            response = requests.get(url, auth = auth_credentials)
+            response = self._request("GET", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in getting sensor fields at url: " + url + ". Error: " + str(e))
         
         if response.ok:
-            return _load_response_json(response)
+            fields = _load_response_json(response)
+            if self._cache is not None:
+                self._cache.put(cache_key, fields)
+            return fields
         else:
-            raise WotkitException("Error in getting sensor fields for sensor: " + sensor_id + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in getting sensor fields for sensor: " + sensor_id + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
     
+    @_traced
     def update_sensor_field(self, sensor_id, field_name, field_data, username = None, password = None):
         """Update sensor field.
 
@@ -470,17 +2566,21 @@ class WotkitProxy():
         url = self.api_url + "/sensors/" + sensor_id + "/fields/" + field_name
 
         auth_credentials = self._get_login_credentials(username, password)
-        json_data = json.dumps(field_data)
+        json_data = _dump_json(field_data)
         try:
-            response = requests.put(url, data = json_data, auth = auth_credentials, headers={"content-type": "application/json"})
+            response = self._request("PUT", url, data = json_data, auth = auth_credentials, headers={"content-type": "application/json"})
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in updating sensor field at url: " + url + ". Error: " + str(e))
+        self._invalidate_sensor(sensor_id)
         
         if response.ok:
             return True
         else:
-            raise WotkitException("Error in updating sensor field at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in updating sensor field at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
 
+    @_traced
     def delete_sensor_field(self, sensor_id, field_name, username = None, password = None):
         """Delete sensor field.
 
@@ -500,15 +2600,19 @@ class WotkitProxy():
 
         auth_credentials = self._get_login_credentials(username, password)
         try:
-            response = requests.delete(url, auth = auth_credentials)
+            response = self._request("DELETE", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in deleting sensor field at url: " + url + ". Error: " + str(e))
+        self._invalidate_sensor(sensor_id)
         
         if response.ok:
             return True
         else:
-            raise WotkitException("Error in deleting sensor field at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in deleting sensor field at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
       
+    @_traced
     def send_data_post_by_name(self, sensor_name, data, username = None, password = None):
         """ Wrapper around send_data_post that allows sending new data to a given sensor name .
         
@@ -525,6 +2629,7 @@ class WotkitProxy():
         user, pwd = self._get_login_credentials(username, password)
         return self.send_data_post(user + "." + sensor_name, data, user, pwd)
 
+    @_traced
     def send_data_post(self, sensor_id, data, username = None, password = None):
         """ Send new data to a sensor.
         
@@ -543,64 +2648,130 @@ class WotkitProxy():
         auth_credentials = self._get_login_credentials(username, password)
         url = self.api_url+'/sensors/'+sensor_id+'/data'
         try:
-            response = requests.post(url = url, auth=auth_credentials, data = data)
+            if self.compression is None:
+                response = self._request("POST", url, auth=auth_credentials, data = data)
+            else:
+                form_data = requests.models.RequestEncodingMixin._encode_params(data)
+                if not isinstance(form_data, bytes):
+                    form_data = form_data.encode("utf-8")
+                response = self._request_body("POST", url, form_data, auth=auth_credentials, headers = {"content-type": "application/x-www-form-urlencoded"})
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in sending new data by POST to sensor at url: " + url + ". Error: " + str(e))
         
         if response.ok:
-            log.debug("Success sending POST sensor data to url: " + url)
+            log.debug("Success sending POST sensor data to url: %s", url)
             return True
         else:
-            raise WotkitException("Error in sending new data by POST to sensor at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in sending new data by POST to sensor at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
             
 
 
-    def send_bulk_data_put_by_name(self, sensor_name, data, username = None, password = None):
+    @_traced
+    def send_bulk_data_put_by_name(self, sensor_name, data, username = None, password = None, **kwargs):
         """ Wrapper around send_bulk_data_put that allows sending new data to a given sensor name .
 
         :param sensor_name: Sensor name to send data to (no username component prepended, ie. if the full name is admin.sensor_name, use sensor_name).
         :type sensor_name: str.
         :param data: Data to send to this sensor. Compared with sending single new data by POST, each data item must contain a timestamp. The current timestamp can be obtained by calling get_wotkit_timestamp().
-        :type data: list of dict
+        :type data: iterable of dict
         :param username: If provided with password, overrides the default login credentials supplied on initialization.
         :type username: str.
         :param password: Used in combination with username.
         :type password: str.
+
+        Also takes the max_part_bytes, max_part_records, on_progress and stop_on_error parameters of send_bulk_data_put.
+
         :raises: WotkitException if a status code is not 200's"""
 
         user, pwd = self._get_login_credentials(username, password)
-        self.send_bulk_data_put(user + "." + sensor_name, data, user, pwd)
+        self.send_bulk_data_put(user + "." + sensor_name, data, user, pwd, **kwargs)
         
 
-    def send_bulk_data_put(self, sensor_id, data, username = None, password = None):
+    @_traced
+    def send_bulk_data_put(self, sensor_id, data, username = None, password = None, **kwargs):
         """ Send multiple data dictionaries to WoTKit. 
         .. note:: data sent this way is not processed in real time. 
+
+        data is encoded one item at a time and sent in parts of at most max_part_records items and max_part_bytes bytes, so any number of items can be sent from a generator without holding them all in memory.
         
         :param sensor_id: Sensor ID to send data to.
         :type sensor_id: str.
         :param data: Data to send to this sensor. Compared with sending single new data by POST, each data item must contain a timestamp. The current timestamp can be obtained by calling get_wotkit_timestamp().
-        :type data: list of dict
+        :type data: iterable of dict
         :param username: If provided with password, overrides the default login credentials supplied on initialization.
         :type username: str.
         :param password: Used in combination with username.
         :type password: str.
+        :param max_part_bytes: Maximum size in bytes of the body of one request. A single item larger than this is sent on its own. (Defaults to 4MB)
+        :type max_part_bytes: int.
+        :param max_part_records: Maximum number of items sent in one request. (Defaults to 10000)
+        :type max_part_records: int.
+        :param on_progress: Called after each part as on_progress(part) where part is a dict with the "part" number, the index of its "first_record", its number of "records" and "bytes", and the "error" it failed with or None.
+        :type on_progress: function.
+        :param stop_on_error: If False, the remaining parts are still sent after a part failed, and a WotkitException listing the failed parts is raised at the end. (Defaults to True)
+        :type stop_on_error: bool.
+        :param timestamp_format: TIMESTAMP_ISO or TIMESTAMP_MILLIS to convert the timestamps of the items, for instance UNIX timestamps in milliseconds or datetimes to ISO strings, in blocks with encode_wotkit_timestamps or decode_wotkit_timestamps. The items themselves are not modified. (Defaults to sending timestamps as given)
+        :type timestamp_format: str.
         :raises: WotkitException if a status code is not 200's"""
         sensor_id = str(sensor_id)
-        json_data = json.dumps(data)
+        max_part_bytes = kwargs.get("max_part_bytes", BULK_MAX_PART_BYTES)
+        max_part_records = kwargs.get("max_part_records", BULK_MAX_PART_RECORDS)
+        on_progress = kwargs.get("on_progress")
+        stop_on_error = kwargs.get("stop_on_error", True)
         
         auth_credentials = self._get_login_credentials(username, password)
         url = self.api_url+'/sensors/'+sensor_id+'/data'
-        
-        try:
-            response = requests.put(url = url, auth=auth_credentials, data = json_data, headers = {"content-type": "application/json"})
-        except Exception as e:
-            raise WotkitException("Error in sending bulk sensor data via PUT to url: " + url + ". Error: " + str(e))
-        if response.ok:
-            log.debug("Success sending bulk PUT data to sensor url: " + url)
-            return True
-        else:
-            raise WotkitException("Error in sending bulk data by PUT to sensor at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+
+        records = iter(data)
+        if kwargs.get("timestamp_format") is not None:
+            records = _iter_converted_timestamps(records, kwargs["timestamp_format"])
+        next_value = None
+        failed_parts = []
+        part = {"part": 0, "first_record": 0}
+        while True:
+            values = []
+            num_bytes = 2
+            if next_value is not None:
+                values.append(next_value)
+                num_bytes += len(next_value)
+                next_value = None
+            for record in records:
+                value = _dump_json(record)
+                if values and (len(values) >= max_part_records or num_bytes + len(value) + 1 > max_part_bytes):
+                    next_value = value
+                    break
+                num_bytes += len(value) + (1 if values else 0)
+                values.append(value)
+
+            part = {"part": part["part"] + 1, "first_record": part["first_record"] + part.get("records", 0), "records": len(values), "bytes": num_bytes, "error": None}
+            try:
+                response = self._request_body("PUT", url, _JsonArrayBody(values), auth=auth_credentials, headers = {"content-type": "application/json"})
+            except WotkitException as e:
+                part["error"] = e
+            except Exception as e:
+                part["error"] = WotkitException("Error in sending bulk sensor data via PUT to url: " + url + ", part " + str(part["part"]) + ". Error: " + str(e))
+            else:
+                if response.ok:
+                    log.debug("Success sending bulk PUT data to sensor url: %s, part %s", url, part["part"])
+                else:
+                    part["error"] = WotkitException("Error in sending bulk data by PUT to sensor at url: " + url + ", part " + str(part["part"]) + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+            if on_progress:
+                on_progress(part)
+            if part["error"] is not None:
+                if stop_on_error:
+                    raise part["error"]
+                failed_parts.append(part)
+            if next_value is None:
+                break
+
+        if failed_parts:
+            raise WotkitException("Error in sending bulk data by PUT to sensor at url: " + url + ", failed parts: " + ", ".join([ "%d (records %d to %d)" % (failed["part"], failed["first_record"], failed["first_record"] + failed["records"] - 1) for failed in failed_parts ]))
+        return True
     
+    @_traced
     def delete_data(self, sensor_id, timestamp, username = None, password = None):
         """ Delete all data corresponding with timestamp.
 
@@ -620,15 +2791,18 @@ class WotkitProxy():
         url = self.api_url+'/sensors/'+sensor_id+'/data/' + str(timestamp)
         
         try:
-            response = requests.delete(url = url, auth=auth_credentials)
+            response = self._request("DELETE", url, auth=auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in deleting sensor data to url: " + url + ". Error: " + str(e))
         if response.ok:
-            log.debug("Success deleting data to sensor url: " + url)
+            log.debug("Success deleting data to sensor url: %s", url)
             return True
         else:
-            raise WotkitException("Error in deleting sensor data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in deleting sensor data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
 
+    @_traced
     def get_raw_data(self, sensor_id, **kwargs):
         """Get raw data from a WoTKit sensor.
         
@@ -649,6 +2823,10 @@ class WotkitProxy():
         :type beforeE: int
         :param reverse: true: order the data from newest to oldest; false (default):order from oldest to newest
         :type reverse: bool
+        :param columnar: if True, returns WotkitColumns with a typed numpy array per sensor field instead of a list. Requires numpy.
+        :type columnar: bool
+        :param timestamp_format: TIMESTAMP_MILLIS to convert the timestamps of the readings to milliseconds since the epoch, or TIMESTAMP_ISO to ISO strings. (Defaults to timestamps as returned by the WoTKit)
+        :type timestamp_format: str
 
         :param username: If provided with password, overrides the default login credentials supplied on initialization.
         :type username: str.
@@ -656,7 +2834,7 @@ class WotkitProxy():
         :type password: str.
             
         :raises: WotkitException if a status code is not 200's
-        :rtype: list of sensor data"""
+        :rtype: list of sensor data, or WotkitColumns"""
         
         sensor_id = str(sensor_id)
         auth_credentials = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))
@@ -664,16 +2842,172 @@ class WotkitProxy():
         valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "reverse"])
         search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
         url = self.api_url+'/sensors/'+sensor_id+'/data'
+        if kwargs.get("columnar"):
+            _require_numpy()
         try:
-            response = requests.get(url, auth = auth_credentials, params=search_params)
+            response = self._request("GET", url, auth = auth_credentials, params=search_params)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in getting raw data at url: " + url + ". Error: " + str(e))
         
         if response.ok:
-            return _load_response_json(response)
+            readings = _load_response_json(response)
+            if kwargs.get("columnar"):
+                fields = self.get_sensor_fields(sensor_id, username = kwargs.get("username"), password = kwargs.get("password"))
+                field_types = dict([ (field["name"], field.get("type")) for field in fields if field["name"] != "timestamp" ])
+                return _readings_to_columns(readings, field_types)
+            if kwargs.get("timestamp_format") is not None:
+                readings = list(_iter_converted_timestamps(readings, kwargs["timestamp_format"]))
+            return readings
         else:
-            raise WotkitException("Error in getting raw data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in getting raw data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    @_traced
+    def get_raw_data_range(self, sensor_id, start, end, **kwargs):
+        """Get raw data between start and end from a WoTKit sensor by splitting the range into shards that are fetched concurrently with get_raw_data. The shard duration adapts so each shard returns about shard_rows readings.
+
+        :param sensor_id: Sensor ID to get data from.
+        :type sensor_id: str.
+        :param start: the absolute start time of the range in milliseconds.
+        :type start: int
+        :param end: the absolute end time of the range in milliseconds.
+        :type end: int
+        :param shard_duration: the duration of the first shards in milliseconds. (Defaults to one hour.)
+        :type shard_duration: int
+        :param shard_rows: the number of readings a shard should return, used to grow or shrink later shards. (Defaults to 5000.)
+        :type shard_rows: int
+        :param concurrency: number of shards fetched at once. (Defaults to 4.)
+        :type concurrency: int
+        :param timestamp_format: TIMESTAMP_MILLIS or TIMESTAMP_ISO to convert the timestamps of the readings, as in get_raw_data.
+        :type timestamp_format: str
+
+        :param username: If provided with password, overrides the default login credentials supplied on initialization.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: list of sensor data ordered by timestamp, oldest first"""
+        start = int(start)
+        end = int(end)
+        shard_rows = kwargs.get("shard_rows", RANGE_SHARD_ROWS)
+        credentials = {"username": kwargs.get("username"), "password": kwargs.get("password")}
+        lock = threading.Lock()
+        state = {"next_start": start, "shard_duration": max(int(kwargs.get("shard_duration", RANGE_SHARD_DURATION)), RANGE_MIN_SHARD_DURATION)}
+        shards = []
+        errors = []
+
+        def fetch_shards():
+            while True:
+                with lock:
+                    if errors or state["next_start"] > end:
+                        return
+                    shard_start = state["next_start"]
+                    shard_end = min(shard_start + state["shard_duration"], end)
+                    state["next_start"] = shard_end + 1
+                # Shards overlap by one millisecond in case the WoTKit treats end as exclusive,
+                # readings on the boundary are de-duplicated when merging
+                try:
+                    readings = self.get_raw_data(sensor_id, start = shard_start, end = shard_end + 1 if shard_end < end else end, **credentials)
+                except Exception as e:
+                    with lock:
+                        errors.append(e)
+                    return
+                with lock:
+                    shards.append(readings)
+                    factor = float(shard_rows) / max(len(readings), 1)
+                    duration = int((shard_end - shard_start + 1) * min(max(factor, 0.25), 4.0))
+                    state["shard_duration"] = max(duration, RANGE_MIN_SHARD_DURATION)
+                log.debug("Got %d readings of sensor %s between %d and %d", len(readings), sensor_id, shard_start, shard_end)
+
+        workers = [ threading.Thread(target = fetch_shards) for i in range(kwargs.get("concurrency", 4)) ]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        for worker in workers:
+            worker.join()
+        if errors:
+            raise errors[0]
+
+        merged = {}
+        for readings in shards:
+            for reading in readings:
+                key = reading.get("id")
+                if key is None:
+                    key = json.dumps(reading, sort_keys = True)
+                merged[key] = reading
+        readings = list(merged.values())
+        millis = decode_wotkit_timestamps([ reading["timestamp"] for reading in readings ])
+        readings = [ reading for timestamp, index, reading in sorted(zip(millis, range(len(readings)), readings)) ]
+        if kwargs.get("timestamp_format") is not None:
+            readings = list(_iter_converted_timestamps(readings, kwargs["timestamp_format"]))
+        return readings
+
+    @_traced
+    def iter_raw_data(self, sensor_id, **kwargs):
+        """Generator over the raw data of a WoTKit sensor that parses the response as it is downloaded, yielding one reading at a time. Takes the same parameters as get_raw_data, except columnar. Memory use does not grow with the number of readings.
+
+        .. note:: The connection is held until the generator is exhausted or closed.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: generator of sensor data"""
+        sensor_id = str(sensor_id)
+        auth_credentials = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))
+
+        valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "reverse"])
+        search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
+        url = self.api_url+'/sensors/'+sensor_id+'/data'
+        readings = self._iter_response_array("raw data", url, auth_credentials, search_params)
+        if kwargs.get("timestamp_format") is not None:
+            readings = _iter_converted_timestamps(readings, kwargs["timestamp_format"])
+        return readings
+
+    @_traced
+    def iter_aggregated_data(self, **kwargs):
+        """Generator over data from multiple sensors that parses the response as it is downloaded, yielding one reading at a time. Takes the same parameters as get_aggregated_data, except columnar and field_types.
+
+        .. note:: The connection is held until the generator is exhausted or closed.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: generator of sensor data"""
+        auth_credentials = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))
+
+        valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "reverse"])
+        search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
+        url = self.api_url+'/data'
+        readings = self._iter_response_array("aggregated data", url, auth_credentials, search_params)
+        if kwargs.get("timestamp_format") is not None:
+            readings = _iter_converted_timestamps(readings, kwargs["timestamp_format"])
+        return readings
+
+    def _iter_response_array(self, description, url, auth_credentials, search_params):
+        """Sends a GET request with a streamed response and returns a generator over the elements of the JSON array it contains."""
+        try:
+            response = self._request("GET", url, auth = auth_credentials, params = search_params, stream = True)
+        except WotkitException:
+            raise
+        except Exception as e:
+            raise WotkitException("Error in getting " + description + " at url: " + url + ". Error: " + str(e))
+
+        if not response.ok:
+            raise WotkitException("Error in getting " + description + " at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
 
+        def iter_elements():
+            try:
+                for element in _iter_json_array(response.iter_content(STREAM_CHUNK_SIZE)):
+                    yield element
+            except ValueError as e:
+                raise WotkitException("Invalid JSON. Error: " + str(e))
+            except WotkitException:
+                raise
+            except Exception as e:
+                raise WotkitException("Error in getting " + description + " at url: " + url + ". Error: " + str(e))
+            finally:
+                response.close()
+        return iter_elements()
+
+    @_traced
     def get_formatted_data(self, sensor_id, **kwargs):
         """Get formatted data from a WoTKit sensor suitable for Google Visualizations.
         
@@ -697,15 +3031,18 @@ class WotkitProxy():
         search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
         url = self.api_url+'/sensors/'+sensor_id+'/dataTable'
         try:
-            response = requests.get(url, auth = auth_credentials, params=search_params)
+            response = self._request("GET", url, auth = auth_credentials, params=search_params)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in getting formatted data at url: " + url + ". Error: " + str(e))
         
         if response.ok:
             return response.text.encode(response.encoding)
         else:
-            raise WotkitException("Error in getting formatted data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in getting formatted data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
 
+    @_traced
     def get_aggregated_data(self, **kwargs):
         """Get data from multiple sensors queried using the same parameters.
         
@@ -735,8 +3072,14 @@ class WotkitProxy():
         :type beforeE: int
         :param orderBy: "sensor" groups by sensor id or "time" orders by timestamp (default). 
         :type orderBy: str
+        :param columnar: if True, returns WotkitColumns with a numpy array per key of the readings instead of a list. Requires numpy.
+        :type columnar: bool
+        :param field_types: with columnar, maps field names to their WoTKit type ("NUMBER", "INTEGER", "BOOLEAN" or "STRING") to select and type the columns. By default every key becomes a column whose type is inferred from its values.
+        :type field_types: dict
+        :param timestamp_format: TIMESTAMP_MILLIS to convert the timestamps of the readings to milliseconds since the epoch, or TIMESTAMP_ISO to ISO strings. (Defaults to timestamps as returned by the WoTKit)
+        :type timestamp_format: str
         :raises: WotkitException if a status code is not 200's
-        :rtype: list of sensor data"""
+        :rtype: list of sensor data, or WotkitColumns"""
             
         valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "orderBy", "scope", "tags", "orgs", "visibility", "text", "active"])        
         search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
@@ -747,16 +3090,29 @@ class WotkitProxy():
         valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "reverse"])
         search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
 
+        if kwargs.get("columnar"):
+            _require_numpy()
         try:
-            response = requests.get(url, auth = auth_credentials, params=search_params)
+            response = self._request("GET", url, auth = auth_credentials, params=search_params)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in getting aggregated data at url: " + url + ". Error: " + str(e))
         
         if response.ok:
-            return _load_response_json(response)
+            readings = _load_response_json(response)
+            if kwargs.get("columnar"):
+                field_types = kwargs.get("field_types")
+                if field_types is None:
+                    field_types = dict.fromkeys(set().union(*readings) - set(["timestamp"]))
+                return _readings_to_columns(readings, field_types)
+            if kwargs.get("timestamp_format") is not None:
+                readings = list(_iter_converted_timestamps(readings, kwargs["timestamp_format"]))
+            return readings
         else:
-            raise WotkitException("Error in getting aggregated data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in getting aggregated data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
 
+    @_traced
     def send_actuator_message(self, sensor_id, **kwargs):
         """ Send actuator message to a sensor. 
         
@@ -775,15 +3131,18 @@ class WotkitProxy():
         auth_credentials = self._get_login_credentials(kwargs.pop("username", None), kwargs.pop("password", None))
 
         try:
-            response = requests.post(url, auth = auth_credentials, params=kwargs)
+            response = self._request("POST", url, auth = auth_credentials, params=kwargs)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in sending actuator message at url: " + url + ". Error: " + str(e))
         
         if response.ok:
             return True
         else:
-            raise WotkitException("Error in sending catuator message at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in sending catuator message at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
                              
+    @_traced
     def subscribe_actuator(self, sensor_id, **kwargs):
         """ Subscribe to actuator. 
         
@@ -803,15 +3162,18 @@ class WotkitProxy():
         auth_credentials = self._get_login_credentials(kwargs.pop("username", None), kwargs.pop("password", None))
 
         try:
-            response = requests.post(url, auth = auth_credentials, params=kwargs)
+            response = self._request("POST", url, auth = auth_credentials, params=kwargs)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in subscribing to actuator at url: " + url + ". Error: " + str(e))
         
         if response.ok:
             return _load_response_json(response)
         else:
-            raise WotkitException("Error in subscribing to actuator at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in subscribing to actuator at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
                              
+    @_traced
     def query_actuator(self, subscription_id, wait_time, **kwargs):
         """ Query actuator
         
@@ -833,59 +3195,776 @@ class WotkitProxy():
         auth_credentials = self._get_login_credentials(kwargs.pop("username", None), kwargs.pop("password", None))
 
         try:
-            response = requests.get(url, auth = auth_credentials)
+            response = self._request("GET", url, auth = auth_credentials)
+        except WotkitException:
+            raise
         except Exception as e:
             raise WotkitException("Error in querying actuator at url: " + url + ". Error: " + str(e))
         
         if response.ok:
             return _load_response_json(response)
         else:
-            raise WotkitException("Error in querying actuator at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text.encode(response.encoding))
+            raise WotkitException("Error in querying actuator at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
 
     """ Admin functions """
+    @_traced
     def get_wotkit_user(self, user_id, username = None, password = None):
         '''Get wotkit user with user_id. Requires admin credentials in WotkitConfig'''
         user_id = str(user_id)
         url = self.api_url + "/users/" + user_id
         auth_credentials = self._get_login_credentials(username, password)
-        response = requests.get(url, auth = auth_credentials)
+        response = self._request("GET", url, auth = auth_credentials)
         
         if not response.ok:
-            log.info("Wotkit account username %s not found." % user_id)
+            log.info("Wotkit account username %s not found.", user_id)
             return None 
         else:
-            return json.loads(response.text)
+            return _load_response_json(response)
     
+    @_traced
     def create_wotkit_user(self, data, username = None, password = None):
         '''Creates user given in data dictionary. Requires admin credentials in WotkitConfig'''
         url = self.api_url + "/users"
         auth_credentials = self._get_login_credentials(username, password)
-        json_data = json.dumps(data)
+        json_data = _dump_json(data)
         headers = {"content-type": "application/json"}
         
-        response = requests.post(url, auth = auth_credentials, data = json_data, headers = headers)
+        response = self._request("POST", url, auth = auth_credentials, data = json_data, headers = headers)
         
         if response.ok:
-            log.info("Created wotkit account: " + str(data))
+            log.info("Created wotkit account: %s", data)
             return True
         else:
-            msg = "Failed to create wotkit account: " + str(data) + ", code: " + str(response.status_code) + "message: " + response.text.encode(response.encoding)
+            msg = "Failed to create wotkit account: " + str(data) + ", code: " + str(response.status_code) + "message: " + response.text
             log.warning(msg)
             raise WotkitException(msg)
     
+    @_traced
     def update_wotkit_user(self, user_id, data, username = None, password = None):
         '''Updates user user_id with data dictionary. Requires admin credentials in WotkitConfig'''
         user_id = str(user_id)
         url = self.api_url + "/users/" + user_id
         auth_credentials = self._get_login_credentials(username, password)
-        json_data = json.dumps(data)
+        json_data = _dump_json(data)
         headers = {"content-type": "application/json"}
-        response = requests.put(url, auth = auth_credentials, data = json_data, headers = headers)
+        response = self._request("PUT", url, auth = auth_credentials, data = json_data, headers = headers)
         
         if response.ok:
-            log.info("Updated wotkit account: " + str(data))
+            log.info("Updated wotkit account: %s", data)
             return True
         else:
             log.warning("Failed to update wotkit account: " + str(data) + ", code: " + str(response.status_code) + ", reason: " + str(response.text))
             log.warning(response.text)
             raise WotkitException(response.text)
+
+class _IngestBatch():
+    """Readings waiting to be sent to one sensor."""
+
+    def __init__(self, sensor_id):
+        self.sensor_id = sensor_id
+        self.readings = []
+        self.sizes = []
+        self.num_bytes = 0
+        self.created = time.time()
+
+class WotkitIngestQueue():
+    """Buffers readings per sensor and sends them with WotkitProxy.send_bulk_data_put from background worker threads.
+
+    A sensor's readings are sent once max_batch_size readings or max_batch_bytes of JSON are buffered, or max_latency seconds after the first of them was added, whichever comes first.
+
+    Example:
+    with WotkitIngestQueue(wotkit_proxy, max_latency = 5) as ingest_queue:
+        ingest_queue.add(SENSOR_ID_HERE, {"value": 5})
+
+    """
+
+    def __init__(self, proxy, **kwargs):
+        """Starts the worker threads.
+
+        :param proxy: The proxy used to send the readings.
+        :type proxy: WotkitProxy.
+        :param max_batch_size: Maximum number of readings sent in one request. (OPTIONAL, defaults to 1000)
+        :type max_batch_size: int.
+        :param max_batch_bytes: Maximum JSON size in bytes of the readings sent in one request. (OPTIONAL, defaults to 1MB)
+        :type max_batch_bytes: int.
+        :param max_latency: Maximum number of seconds a reading waits before it is sent. (OPTIONAL, defaults to 1)
+        :type max_latency: float.
+        :param max_queue_size: Maximum number of readings buffered over all sensors. (OPTIONAL, defaults to 100000)
+        :type max_queue_size: int.
+        :param backpressure: What add() does when the queue is full: "block" waits for space, "drop_oldest" discards the oldest buffered reading, "raise" raises WotkitQueueFullException. (OPTIONAL, defaults to "block")
+        :type backpressure: str.
+        :param workers: Number of worker threads sending batches. (OPTIONAL, defaults to 1)
+        :type workers: int.
+        :param on_success: Called as on_success(sensor_id, readings) after a batch was sent. (OPTIONAL)
+        :type on_success: function.
+        :param on_failure: Called as on_failure(sensor_id, readings, exception) when a batch could not be sent. Failed batches are not retried. (OPTIONAL)
+        :type on_failure: function.
+        :param on_drop: Called as on_drop(sensor_id, reading) for each reading discarded by the "drop_oldest" backpressure. (OPTIONAL)
+        :type on_drop: function.
+        :param username: If provided with password, overrides the default login credentials of the proxy.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str.
+
+        :raises: WotkitConfigException """
+        self.proxy = proxy
+        self.max_batch_size = kwargs.get("max_batch_size", INGEST_MAX_BATCH_SIZE)
+        self.max_batch_bytes = kwargs.get("max_batch_bytes", INGEST_MAX_BATCH_BYTES)
+        self.max_latency = kwargs.get("max_latency", INGEST_MAX_LATENCY)
+        self.max_queue_size = kwargs.get("max_queue_size", INGEST_MAX_QUEUE_SIZE)
+        self.backpressure = kwargs.get("backpressure", BACKPRESSURE_BLOCK)
+        if self.backpressure not in (BACKPRESSURE_BLOCK, BACKPRESSURE_DROP_OLDEST, BACKPRESSURE_RAISE):
+            raise WotkitConfigException("Invalid backpressure %s." % self.backpressure)
+        if self.max_queue_size < 1:
+            raise WotkitConfigException("max_queue_size must be at least 1, got %s." % self.max_queue_size)
+        self.on_success = kwargs.get("on_success")
+        self.on_failure = kwargs.get("on_failure")
+        self.on_drop = kwargs.get("on_drop")
+        self.username = kwargs.get("username")
+        self.password = kwargs.get("password")
+
+        self._batches = {}
+        self._queued = 0
+        self._in_flight = 0
+        self._flushing = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        self._workers = [ threading.Thread(target = self._run_worker) for i in range(kwargs.get("workers", 1)) ]
+        for worker in self._workers:
+            worker.daemon = True
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def __len__(self):
+        """Number of readings buffered and not yet handed to a worker."""
+        return self._queued
+
+    def add(self, sensor_id, data):
+        """Queues one reading for a sensor. A "timestamp" of the current time is added if data has none.
+
+        :param sensor_id: Sensor ID to send data to.
+        :type sensor_id: str.
+        :param data: Data to send to this sensor.
+        :type data: dict
+        :raises: WotkitQueueFullException if the queue is full and backpressure is "raise", WotkitException if the queue is closed"""
+        sensor_id = str(sensor_id)
+        if "timestamp" not in data:
+            data = dict(data, timestamp = get_wotkit_timestamp())
+        size = len(_dump_json(data))
+        dropped = []
+
+        with self._condition:
+            if self._closed:
+                raise WotkitException("WotkitIngestQueue is closed.")
+            while self._queued >= self.max_queue_size:
+                if self.backpressure == BACKPRESSURE_RAISE:
+                    raise WotkitQueueFullException("Ingest queue is full, %d readings queued." % self._queued)
+                elif self.backpressure == BACKPRESSURE_DROP_OLDEST:
+                    dropped.append(self._drop_oldest())
+                else:
+                    self._condition.wait()
+                    if self._closed:
+                        raise WotkitException("WotkitIngestQueue is closed.")
+
+            batch = self._batches.get(sensor_id)
+            if batch is None:
+                batch = self._batches[sensor_id] = _IngestBatch(sensor_id)
+                # Wake the workers so they wait for the deadline of the new batch
+                self._condition.notify_all()
+            batch.readings.append(data)
+            batch.sizes.append(size)
+            batch.num_bytes += size
+            self._queued += 1
+            if self._is_full(batch):
+                self._condition.notify_all()
+
+        for dropped_sensor_id, reading in dropped:
+            self._call_back(self.on_drop, dropped_sensor_id, reading)
+
+    def flush(self):
+        """Sends all buffered readings now and waits until they have been sent."""
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+            try:
+                while self._batches or self._in_flight:
+                    self._condition.wait()
+            finally:
+                self._flushing -= 1
+
+    def close(self):
+        """Sends all buffered readings, waits for them to be sent and stops the worker threads."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def _is_full(self, batch):
+        return len(batch.readings) >= self.max_batch_size or batch.num_bytes >= self.max_batch_bytes
+
+    def _drop_oldest(self):
+        """Discards the oldest buffered reading, which is the first reading of the oldest batch, and returns (sensor_id, reading). Called with the lock held."""
+        batch = min(self._batches.values(), key = lambda batch: batch.created)
+        reading = batch.readings.pop(0)
+        batch.num_bytes -= batch.sizes.pop(0)
+        self._queued -= 1
+        if not batch.readings:
+            del self._batches[batch.sensor_id]
+        log.debug("Ingest queue full, dropped reading for sensor %s", batch.sensor_id)
+        return batch.sensor_id, reading
+
+    def _take_ready_batch(self):
+        """Waits for a batch that is due to be sent and removes it from the queue. Returns None once closed and drained."""
+        with self._condition:
+            while True:
+                now = time.time()
+                send_all = self._closed or self._flushing
+                next_due = None
+                for batch in self._batches.values():
+                    due = batch.created + self.max_latency
+                    if send_all or self._is_full(batch) or due <= now:
+                        count, num_bytes = 1, batch.sizes[0]
+                        while count < min(len(batch.readings), self.max_batch_size) and num_bytes + batch.sizes[count] <= self.max_batch_bytes:
+                            num_bytes += batch.sizes[count]
+                            count += 1
+                        readings = batch.readings[:count]
+                        if count < len(batch.readings):
+                            # The rest keeps its place as the oldest batch of this sensor
+                            del batch.readings[:count]
+                            del batch.sizes[:count]
+                            batch.num_bytes -= num_bytes
+                        else:
+                            del self._batches[batch.sensor_id]
+                        self._queued -= count
+                        self._in_flight += 1
+                        self._condition.notify_all()
+                        return batch.sensor_id, readings
+                    if next_due is None or due < next_due:
+                        next_due = due
+                if self._closed:
+                    return None
+                self._condition.wait(None if next_due is None else max(next_due - now, 0.001))
+
+    def _run_worker(self):
+        while True:
+            ready = self._take_ready_batch()
+            if ready is None:
+                return
+            sensor_id, readings = ready
+            try:
+                self.proxy.send_bulk_data_put(sensor_id, readings, self.username, self.password)
+            except Exception as e:
+                log.warning("Failed to send %d readings to sensor %s: %s" % (len(readings), sensor_id, str(e)))
+                self._call_back(self.on_failure, sensor_id, readings, e)
+            else:
+                self._call_back(self.on_success, sensor_id, readings)
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _call_back(self, callback, *args):
+        if callback is None:
+            return
+        try:
+            callback(*args)
+        except Exception:
+            log.warning("Ingest queue callback failed: " + traceback.format_exc())
+
+class WotkitDataTail():
+    """Follows the new data of many sensors, fetching only the readings after the last one seen of each sensor with get_raw_data(start, afterE).
+
+    The last seen timestamp of each sensor is checkpointed to checkpoint_file, so a restarted tail continues where it stopped. A sensor's checkpoint only moves forward once its callback returned without raising, so every reading is delivered at least once.
+
+    Example:
+    tail = WotkitDataTail(wotkit_proxy, checkpoint_file = "wotkit_tail.json")
+    tail.add_sensor(SENSOR_ID_HERE, handle_readings)
+    tail.start()
+
+    """
+
+    def __init__(self, proxy, **kwargs):
+        """
+        :param proxy: The proxy used to get the data.
+        :type proxy: WotkitProxy.
+        :param checkpoint_file: Path of the JSON file checkpoints are loaded from and saved to. (OPTIONAL, checkpoints are kept in memory only)
+        :type checkpoint_file: str.
+        :param batch_size: Maximum number of readings fetched per request. (OPTIONAL, defaults to 1000)
+        :type batch_size: int.
+        :param interval: Seconds between polls when started with start(). (OPTIONAL, defaults to 10)
+        :type interval: float.
+        :param concurrency: Number of sensors polled at once. (OPTIONAL, defaults to 4)
+        :type concurrency: int.
+        :param username: If provided with password, overrides the default login credentials of the proxy.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str."""
+        self.proxy = proxy
+        self.checkpoint_file = kwargs.get("checkpoint_file")
+        self.batch_size = kwargs.get("batch_size", TAIL_BATCH_SIZE)
+        self.interval = kwargs.get("interval", TAIL_INTERVAL)
+        self.concurrency = kwargs.get("concurrency", 4)
+        self.username = kwargs.get("username")
+        self.password = kwargs.get("password")
+
+        self._callbacks = {}
+        self._checkpoints = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file) as checkpoint_file:
+                self._checkpoints = json.load(checkpoint_file)
+
+    def add_sensor(self, sensor_id, callback, start = None):
+        """Starts following a sensor.
+
+        :param sensor_id: Sensor ID to follow.
+        :type sensor_id: str.
+        :param callback: Called as callback(sensor_id, readings) with each batch of new readings, oldest first.
+        :type callback: function.
+        :param start: Time in milliseconds to get data from if the sensor has no checkpoint yet. (OPTIONAL, defaults to the current time)
+        :type start: int."""
+        sensor_id = str(sensor_id)
+        with self._lock:
+            self._callbacks[sensor_id] = callback
+            if sensor_id not in self._checkpoints:
+                if start is None:
+                    start = int(time.time() * 1000)
+                self._checkpoints[sensor_id] = {"timestamp": int(start), "ids": []}
+
+    def remove_sensor(self, sensor_id):
+        """Stops following a sensor. Its checkpoint is kept."""
+        with self._lock:
+            self._callbacks.pop(str(sensor_id), None)
+
+    def get_checkpoint(self, sensor_id):
+        """Returns the timestamp in milliseconds of the last reading delivered for a sensor, or None."""
+        checkpoint = self._checkpoints.get(str(sensor_id))
+        return checkpoint and checkpoint["timestamp"]
+
+    def poll(self):
+        """Fetches and delivers the new readings of every sensor once, then saves the checkpoints.
+
+        :rtype: dict of sensor id to the number of new readings delivered."""
+        with self._lock:
+            sensor_ids = list(self._callbacks)
+        results = _parallel_map(self._poll_sensor, sensor_ids, self.concurrency)
+        self.save_checkpoints()
+
+        counts = {}
+        for sensor_id, (count, error) in zip(sensor_ids, results):
+            if error is not None:
+                log.warning("Failed to get new data of sensor %s: %s" % (sensor_id, str(error)))
+            counts[sensor_id] = count or 0
+        return counts
+
+    def save_checkpoints(self):
+        """Writes the checkpoints to checkpoint_file, replacing it atomically."""
+        if not self.checkpoint_file:
+            return
+        with self._lock:
+            data = json.dumps(self._checkpoints)
+        temp_file = self.checkpoint_file + ".tmp"
+        with open(temp_file, "w") as checkpoint_file:
+            checkpoint_file.write(data)
+        if hasattr(os, "replace"):
+            os.replace(temp_file, self.checkpoint_file)
+        else:
+            if os.name == "nt" and os.path.exists(self.checkpoint_file):
+                os.remove(self.checkpoint_file)
+            os.rename(temp_file, self.checkpoint_file)
+
+    def start(self):
+        """Polls every interval seconds on a background thread until stop() is called."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target = self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread after the current poll and saves the checkpoints."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.save_checkpoints()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception:
+                log.warning("Polling sensor data failed: " + traceback.format_exc())
+            self._stop_event.wait(self.interval)
+
+    def _poll_sensor(self, sensor_id):
+        """Delivers the readings after the checkpoint of a sensor, in batches of batch_size, until there are none left."""
+        count = 0
+        while True:
+            with self._lock:
+                callback = self._callbacks.get(sensor_id)
+                checkpoint = self._checkpoints[sensor_id]
+            if callback is None:
+                return count
+            # start is exclusive, so query from 1 ms before the checkpoint to get the readings that share its timestamp
+            # but did not fit in the last batch, and skip the ones already delivered by their ids. Those come first,
+            # so the batch is made larger by their number to always get batch_size readings past them.
+            limit = self.batch_size + len(checkpoint["ids"])
+            readings = self.proxy.get_raw_data(sensor_id, start = checkpoint["timestamp"] - 1, afterE = limit, username = self.username, password = self.password)
+            fetched = len(readings)
+
+            seen_ids = set(checkpoint["ids"])
+            new_readings = []
+            for timestamp, reading in zip(decode_wotkit_timestamps([ reading["timestamp"] for reading in readings ]), readings):
+                if timestamp > checkpoint["timestamp"] or (timestamp == checkpoint["timestamp"] and reading.get("id") not in seen_ids):
+                    new_readings.append((timestamp, reading))
+            if not new_readings:
+                return count
+
+            new_readings.sort(key = lambda timestamp_reading: timestamp_reading[0])
+            callback(sensor_id, [ reading for timestamp, reading in new_readings ])
+            count += len(new_readings)
+
+            last_timestamp = new_readings[-1][0]
+            last_ids = [ reading.get("id") for timestamp, reading in new_readings if timestamp == last_timestamp ]
+            if last_timestamp == checkpoint["timestamp"]:
+                last_ids.extend(checkpoint["ids"])
+            with self._lock:
+                self._checkpoints[sensor_id] = {"timestamp": last_timestamp, "ids": last_ids}
+            if fetched < limit:
+                return count
+
+class _ActuatorSubscription():
+    def __init__(self, sensor_id, callback):
+        self.sensor_id = sensor_id
+        self.callback = callback
+        self.subscription_id = None
+        self.failures = 0
+        self.next_poll = 0
+
+class WotkitActuatorListener():
+    """Listens for the control messages of many actuators on a bounded pool of worker threads.
+
+    Each actuator is subscribed to with subscribe_actuator and long-polled with query_actuator. A worker takes the next
+    actuator that is due, polls it and hands every message to the actuator's callback, so the messages of one actuator
+    are delivered in order. When there are more actuators than workers, polls wait at most 1 second so that every
+    actuator is polled regularly. If a poll fails, for instance because the subscription expired, the actuator is
+    subscribed to again, backing off on repeated failures.
+
+    The end-to-end latency of each message, from its timestamp until its callback returned, is kept and summarized by
+    stats(). It includes any clock difference between the WoTKit and this host.
+
+    Example:
+    with WotkitActuatorListener(wotkit_proxy, workers = 8) as listener:
+        listener.add_actuator(SENSOR_ID_HERE, handle_message)
+        ...
+
+    """
+
+    def __init__(self, proxy, **kwargs):
+        """
+        :param proxy: The proxy used to subscribe to and query the actuators.
+        :type proxy: WotkitProxy.
+        :param workers: Number of worker threads, and so of actuators polled at once. (OPTIONAL, defaults to 4)
+        :type workers: int.
+        :param wait_time: Seconds a poll waits for a message, Max 20. (OPTIONAL, defaults to 20)
+        :type wait_time: int.
+        :param username: If provided with password, overrides the default login credentials of the proxy.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str."""
+        self.proxy = proxy
+        self.workers = kwargs.get("workers", 4)
+        self.wait_time = kwargs.get("wait_time", ACTUATOR_WAIT_TIME)
+        self.username = kwargs.get("username")
+        self.password = kwargs.get("password")
+
+        self._subscriptions = OrderedDict()
+        self._polling = set()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._threads = []
+        self._latencies = []
+        self._stats = {"messages": 0, "polls": 0, "subscriptions": 0, "errors": 0, "callback_errors": 0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def add_actuator(self, sensor_id, callback):
+        """Starts listening for the control messages of an actuator.
+
+        :param sensor_id: Sensor ID of the actuator.
+        :type sensor_id: str.
+        :param callback: Called as callback(sensor_id, message) with every message received, on a worker thread.
+        :type callback: function."""
+        sensor_id = str(sensor_id)
+        with self._condition:
+            if sensor_id in self._subscriptions:
+                self._subscriptions[sensor_id].callback = callback
+            else:
+                self._subscriptions[sensor_id] = _ActuatorSubscription(sensor_id, callback)
+            self._condition.notify_all()
+
+    def remove_actuator(self, sensor_id):
+        """Stops listening to an actuator. A poll already in progress still delivers its messages."""
+        with self._condition:
+            self._subscriptions.pop(str(sensor_id), None)
+
+    def start(self):
+        """Starts the worker threads."""
+        with self._condition:
+            self._stopping = False
+        for index in range(self.workers):
+            thread = threading.Thread(target = self._run_worker)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stops the worker threads once their current polls return."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        """Returns the number of actuators, messages, polls, subscriptions made, failed polls and failed callbacks, and the minimum, mean, maximum and 50th, 95th and 99th percentile end-to-end latency in milliseconds of the last 1000 messages.
+
+        :rtype: dict"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats["actuators"] = len(self._subscriptions)
+            latencies = sorted(self._latencies)
+        latency = {"count": len(latencies)}
+        if latencies:
+            latency["min"] = latencies[0]
+            latency["max"] = latencies[-1]
+            latency["mean"] = float(sum(latencies)) / len(latencies)
+            for percentile in (50, 95, 99):
+                latency["p%d" % percentile] = latencies[min(len(latencies) - 1, len(latencies) * percentile // 100)]
+        stats["latency"] = latency
+        return stats
+
+    def _take_due_subscription(self):
+        """Waits for an actuator that is due to be polled and is not being polled already, or returns None when stopping."""
+        with self._condition:
+            while not self._stopping:
+                now = time.time()
+                next_poll = None
+                for sensor_id, subscription in self._subscriptions.items():
+                    if sensor_id in self._polling:
+                        continue
+                    if subscription.next_poll <= now:
+                        # Move it to the end so the other actuators are polled first next time
+                        del self._subscriptions[sensor_id]
+                        self._subscriptions[sensor_id] = subscription
+                        self._polling.add(sensor_id)
+                        return subscription
+                    if next_poll is None or subscription.next_poll < next_poll:
+                        next_poll = subscription.next_poll
+                self._condition.wait(None if next_poll is None else next_poll - now)
+            return None
+
+    def _run_worker(self):
+        while True:
+            subscription = self._take_due_subscription()
+            if subscription is None:
+                return
+            try:
+                self._poll(subscription)
+                subscription.failures = 0
+            except Exception as e:
+                subscription.subscription_id = None
+                subscription.failures += 1
+                subscription.next_poll = time.time() + min(ACTUATOR_MAX_BACKOFF, 0.5 * 2 ** subscription.failures)
+                log.warning("Listening to actuator %s failed, subscribing again: %s" % (subscription.sensor_id, str(e)))
+                with self._condition:
+                    self._stats["errors"] += 1
+            with self._condition:
+                self._polling.discard(subscription.sensor_id)
+                self._condition.notify_all()
+
+    def _poll(self, subscription):
+        """Subscribes to the actuator if needed, waits for its messages and delivers them."""
+        if subscription.subscription_id is None:
+            response = self.proxy.subscribe_actuator(subscription.sensor_id, username = self.username, password = self.password)
+            subscription.subscription_id = response["subscription"]
+            with self._condition:
+                self._stats["subscriptions"] += 1
+
+        with self._condition:
+            shared = len(self._subscriptions) > self.workers
+        wait_time = min(self.wait_time, ACTUATOR_SHARED_WAIT_TIME) if shared else self.wait_time
+        messages = self.proxy.query_actuator(subscription.subscription_id, wait_time, username = self.username, password = self.password)
+        with self._condition:
+            self._stats["polls"] += 1
+
+        for message in messages or []:
+            try:
+                subscription.callback(subscription.sensor_id, message)
+            except Exception:
+                log.warning("Actuator callback failed: " + traceback.format_exc())
+                with self._condition:
+                    self._stats["callback_errors"] += 1
+            latency = None
+            if isinstance(message, dict) and message.get("timestamp") is not None:
+                try:
+                    latency = int(time.time() * 1000) - _timestamp_to_millis(message["timestamp"])
+                except (TypeError, ValueError):
+                    pass
+            with self._condition:
+                self._stats["messages"] += 1
+                if latency is not None:
+                    self._latencies.append(latency)
+                    if len(self._latencies) > ACTUATOR_LATENCY_SAMPLES:
+                        del self._latencies[0]
+
+class WotkitDataCache():
+    """Keeps raw sensor data in a local SQLite database, together with the time intervals of each sensor that are held completely, so repeated requests for the same history only fetch the parts that are not held yet.
+
+    Data newer than recent_window milliseconds is never considered complete and is fetched again on every request. When the database holds more than max_rows readings, the sensors used least recently are evicted.
+
+    Example:
+    data_cache = WotkitDataCache(wotkit_proxy, "wotkit_data.db")
+    readings = data_cache.get_raw_data(SENSOR_ID_HERE, start, end)
+
+    """
+
+    def __init__(self, proxy, path, **kwargs):
+        """
+        :param proxy: The proxy used to get the data.
+        :type proxy: WotkitProxy.
+        :param path: Path of the SQLite database file, created if it does not exist.
+        :type path: str.
+        :param max_rows: Maximum number of readings kept. (OPTIONAL, defaults to 10 million)
+        :type max_rows: int.
+        :param recent_window: Milliseconds before the current time after which data is always refreshed. (OPTIONAL, defaults to 5 minutes)
+        :type recent_window: int.
+        :param username: If provided with password, overrides the default login credentials of the proxy.
+        :type username: str.
+        :param password: Used in combination with username.
+        :type password: str."""
+        self.proxy = proxy
+        self.path = path
+        self.max_rows = kwargs.get("max_rows", DATA_CACHE_MAX_ROWS)
+        self.recent_window = kwargs.get("recent_window", DATA_CACHE_RECENT_WINDOW)
+        self.username = kwargs.get("username")
+        self.password = kwargs.get("password")
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread = False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS readings (sensor_id TEXT, reading_key TEXT, timestamp INTEGER, data TEXT, PRIMARY KEY (sensor_id, reading_key))")
+            self._db.execute("CREATE INDEX IF NOT EXISTS readings_time ON readings (sensor_id, timestamp)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS intervals (sensor_id TEXT, start INTEGER, end INTEGER)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sensors (sensor_id TEXT PRIMARY KEY, last_used REAL)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def get_raw_data(self, sensor_id, start, end):
+        """Get raw data between start and end of a sensor, fetching only the sub-intervals that are not held locally with WotkitProxy.get_raw_data_range.
+
+        :param sensor_id: Sensor ID to get data from.
+        :type sensor_id: str.
+        :param start: the absolute start time of the range in milliseconds.
+        :type start: int
+        :param end: the absolute end time of the range in milliseconds.
+        :type end: int
+        :raises: WotkitException if a status code is not 200's
+        :rtype: list of sensor data ordered by timestamp, oldest first"""
+        sensor_id = str(sensor_id)
+        start = int(start)
+        end = int(end)
+        complete_before = int(time.time() * 1000) - self.recent_window
+
+        with self._lock:
+            intervals = self._db.execute("SELECT start, end FROM intervals WHERE sensor_id = ? ORDER BY start", (sensor_id,)).fetchall()
+
+        missing = []
+        cursor = start
+        for interval_start, interval_end in intervals:
+            if interval_end < cursor or cursor > end:
+                continue
+            if interval_start > cursor:
+                missing.append((cursor, min(interval_start - 1, end)))
+            cursor = max(cursor, interval_end + 1)
+        if cursor <= end:
+            missing.append((cursor, end))
+
+        for missing_start, missing_end in missing:
+            log.debug("Data cache miss for sensor %s between %d and %d", sensor_id, missing_start, missing_end)
+            readings = self.proxy.get_raw_data_range(sensor_id, missing_start, missing_end, username = self.username, password = self.password)
+            self._store(sensor_id, readings, missing_start, min(missing_end, complete_before))
+
+        with self._lock:
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO sensors VALUES (?, ?)", (sensor_id, time.time()))
+                rows = self._db.execute("SELECT data FROM readings WHERE sensor_id = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp", (sensor_id, start, end)).fetchall()
+        return [ _load_json(row[0]) for row in rows ]
+
+    def evict(self, sensor_id):
+        """Removes all data held for a sensor."""
+        with self._lock:
+            with self._db:
+                self._delete_sensor(str(sensor_id))
+
+    def _store(self, sensor_id, readings, start, complete_end):
+        """Saves readings and marks [start, complete_end] as held, merging it with the intervals it touches."""
+        rows = []
+        for timestamp, reading in zip(decode_wotkit_timestamps([ reading["timestamp"] for reading in readings ]), readings):
+            key = reading.get("id")
+            key = json.dumps(reading, sort_keys = True) if key is None else str(key)
+            rows.append((sensor_id, key, timestamp, _dump_json(reading).decode("utf-8")))
+
+        with self._lock:
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO readings VALUES (?, ?, ?, ?)", rows)
+                if complete_end >= start:
+                    merged_start, merged_end = start, complete_end
+                    touching = self._db.execute("SELECT start, end FROM intervals WHERE sensor_id = ? AND start <= ? AND end >= ?", (sensor_id, complete_end + 1, start - 1)).fetchall()
+                    for interval_start, interval_end in touching:
+                        merged_start = min(merged_start, interval_start)
+                        merged_end = max(merged_end, interval_end)
+                    self._db.execute("DELETE FROM intervals WHERE sensor_id = ? AND start <= ? AND end >= ?", (sensor_id, complete_end + 1, start - 1))
+                    self._db.execute("INSERT INTO intervals VALUES (?, ?, ?)", (sensor_id, merged_start, merged_end))
+                self._db.execute("INSERT OR REPLACE INTO sensors VALUES (?, ?)", (sensor_id, time.time()))
+                self._evict_to_limit(sensor_id)
+
+    def _evict_to_limit(self, keep_sensor_id):
+        """Evicts the least recently used sensors, other than keep_sensor_id, while there are more than max_rows readings. Called with the lock held."""
+        total = self._db.execute("SELECT COUNT(*) FROM readings").fetchone()[0]
+        if total <= self.max_rows:
+            return
+        for sensor_id, in self._db.execute("SELECT sensor_id FROM sensors WHERE sensor_id != ? ORDER BY last_used", (keep_sensor_id,)).fetchall():
+            count = self._db.execute("SELECT COUNT(*) FROM readings WHERE sensor_id = ?", (sensor_id,)).fetchone()[0]
+            self._delete_sensor(sensor_id)
+            log.debug("Data cache evicted %d readings of sensor %s", count, sensor_id)
+            total -= count
+            if total <= self.max_rows:
+                return
+
+    def _delete_sensor(self, sensor_id):
+        self._db.execute("DELETE FROM readings WHERE sensor_id = ?", (sensor_id,))
+        self._db.execute("DELETE FROM intervals WHERE sensor_id = ?", (sensor_id,))
+        self._db.execute("DELETE FROM sensors WHERE sensor_id = ?", (sensor_id,))
@@ -0,0 +1,661 @@
+"""An asyncio client for communicating to the WoTKit API using the aiohttp library.
+
+.. module:: wotkitpy_async
+
+AsyncWotkitProxy mirrors the public methods of wotkitpy.WotkitProxy as coroutines and raises the
+same WotkitException/WotkitConfigException, so code can switch between the two. Requires Python 3.5+
+and aiohttp.
+
+Example:
+async with AsyncWotkitProxy(api_url = WOTKIT_URL_HERE, username = USERNAME, password = PASSWORD) as wotkit_proxy:
+    sensor = await wotkit_proxy.get_sensor_by_id(SENSOR_ID_HERE)
+
+Released under the MIT License, see wotkitpy.py.
+
+"""
+
+import asyncio
+import logging
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from wotkitpy import WotkitException, WotkitConfigException, _get_required_field, _dump_json, _load_json, QUERY_MAX_SENSORS, REGISTER_MAX_SENSORS
+
+log = logging.getLogger(__name__)
+
+DEFAULT_CONNECTION_LIMIT = 100
+DEFAULT_CONNECTION_LIMIT_PER_HOST = 0
+
+class _AsyncResponse(object):
+    """The parts of an aiohttp response the proxy needs once the body has been read."""
+
+    def __init__(self, status_code, content, encoding):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.ok = status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, "replace")
+
+def _load_response_json(response):
+    """Load a the JSON response into Python format."""
+    try:
+        return _load_json(response.content)
+    except Exception as e:
+        raise WotkitException("Invalid JSON. Error: " + str(e))
+
+def _str_params(params):
+    """aiohttp only accepts str, int and float query values, the WoTKit expects booleans as strings."""
+    return dict([ (key, str(value)) for key, value in params.items() ])
+
+class AsyncWotkitProxy(object):
+    """Asyncio counterpart of wotkitpy.WotkitProxy. Every public method is a coroutine.
+
+    Requests share one aiohttp connection pool, so many requests can be in flight at once from a
+    single event loop. Call close() when done, or use the proxy as an async context manager."""
+
+    def __init__(self, **kwargs):
+        """Configures the settings necessary for connecting to the WoTKit.
+
+        :param api_url: The base url for the WoTKit API.
+        :type api_url: str.
+        :param username: The default username or key ID that will be used. (OPTIONAL)
+        :type username: str.
+        :param password: The default password or key password that will be used. (OPTIONAL)
+        :type password: str.
+        :param limit: Maximum number of simultaneous connections. (OPTIONAL, defaults to 100)
+        :type limit: int.
+        :param limit_per_host: Maximum number of simultaneous connections to a single host, 0 for no limit. (OPTIONAL, defaults to 0)
+        :type limit_per_host: int.
+        :param keep_alive: If False, connections are closed after every request. (OPTIONAL, defaults to True)
+        :type keep_alive: bool.
+
+        :raises: WotkitConfigException """
+        if aiohttp is None:
+            raise WotkitConfigException("AsyncWotkitProxy requires the aiohttp package.")
+        self.api_url = _get_required_field("api_url", **kwargs)
+        self.username = kwargs.get("username", "")
+        self.password = kwargs.get("password", "")
+        self.keep_alive = kwargs.get("keep_alive", True)
+        self.limit = kwargs.get("limit", DEFAULT_CONNECTION_LIMIT)
+        self.limit_per_host = kwargs.get("limit_per_host", DEFAULT_CONNECTION_LIMIT_PER_HOST)
+        self._session = None
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        await self.close()
+
+    async def close(self):
+        """Closes all pooled connections. The proxy cannot be used after it is closed."""
+        self._closed = True
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self):
+        """Returns the aiohttp ClientSession, creating it on first use so it binds to the running loop."""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit = self.limit, limit_per_host = self.limit_per_host, force_close = not self.keep_alive)
+            self._session = aiohttp.ClientSession(connector = connector)
+        return self._session
+
+    def _get_login_credentials(self, username = None, password = None):
+        """Returns a (username, password) tuple. Uses the defaults supplied upon initialization if username or password are empty."""
+        if username and password:
+            return (username, password)
+        else:
+            return (self.username, self.password)
+
+    async def _request(self, method, url, auth = None, **kwargs):
+        """Performs an HTTP request over the pooled connections and returns the fully read response."""
+        if self._closed:
+            raise WotkitException("AsyncWotkitProxy is closed.")
+        if auth is not None:
+            # aiohttp 3.14 deprecates the auth argument and BasicAuth, the header works with every version
+            headers = dict(kwargs.pop("headers", None) or {})
+            encode_basic_auth = getattr(aiohttp, "encode_basic_auth", None)
+            headers["Authorization"] = encode_basic_auth(*auth) if encode_basic_auth is not None else aiohttp.BasicAuth(*auth).encode()
+            kwargs["headers"] = headers
+        async with self._get_session().request(method, url, **kwargs) as response:
+            content = await response.read()
+            return _AsyncResponse(response.status, content, response.charset)
+
+    async def get_sensor_by_name(self, sensor_name, username = None, password = None):
+        '''Get a sensor by name. See WotkitProxy.get_sensor_by_name.
+
+        :rtype: dict representing sensor data, or None if sensor does not exist.
+        :raises: WotkitException if a status code is not 200 or 404'''
+        user, pwd = self._get_login_credentials(username, password)
+        return await self.get_sensor_by_id(user + "." + sensor_name, user, pwd)
+
+    async def get_sensor_by_id(self, sensor_id, username = None, password = None):
+        '''Get a sensor by ID. See WotkitProxy.get_sensor_by_id.
+
+        :rtype: dict representing sensor data, or None if sensor does not exist.
+        :raises: WotkitException if a status code is not 200 or 404'''
+        sensor_id = str(sensor_id)
+        auth_credentials = self._get_login_credentials(username, password)
+
+        url = self.api_url+'/sensors/'+sensor_id
+        try:
+            response = await self._request("GET", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in getting sensor " + sensor_id + ". Error: " + str(e))
+
+        if response.status_code == 200:
+            log.debug("Success getting sensor %s", sensor_id)
+            return _load_response_json(response)
+        elif response.status_code == 404:
+            log.debug("Sensor doesn't exist %s", sensor_id)
+            return None
+        else:
+            raise WotkitException("Error in getting sensor " + sensor_id + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def query_all_sensors(self, **kwargs):
+        """Searches all sensors that match the search query. See WotkitProxy.query_all_sensors.
+
+        :param concurrency: number of pages of 1000 sensors to request at once. (Defaults to 1, one page at a time.)
+        :type concurrency: int.
+        :rtype: list of (id, sensor) tuples. Empty list of no matches.
+        :raises: WotkitException if a status code is not 200's"""
+        concurrency = kwargs.pop("concurrency", 1)
+        if concurrency > 1:
+            return await self._query_all_sensors_concurrently(concurrency, **kwargs)
+
+        sensors = {}
+        kwargs["offset"] = 0
+        kwargs["limit"] = QUERY_MAX_SENSORS
+        while True:
+            result_sensors = await self.query_sensors(**kwargs)
+            if not result_sensors:
+                break
+            log.debug("Searching.. found %d sensors..", len(result_sensors))
+            for result_sensor in result_sensors:
+                sensors[result_sensor['id']] = result_sensor
+            kwargs["offset"] += QUERY_MAX_SENSORS
+        return list(sensors.items())
+
+    async def _query_all_sensors_concurrently(self, concurrency, **kwargs):
+        """query_all_sensors with up to concurrency pages in flight, see WotkitProxy._query_all_sensors_concurrently."""
+        state = {"next_offset": 0, "end_offset": None}
+        pages = {}
+
+        async def fetch_pages():
+            while state["end_offset"] is None or state["next_offset"] <= state["end_offset"]:
+                offset = state["next_offset"]
+                state["next_offset"] += QUERY_MAX_SENSORS
+                result_sensors = await self.query_sensors(**dict(kwargs, offset = offset, limit = QUERY_MAX_SENSORS))
+                pages[offset] = result_sensors
+                if len(result_sensors) < QUERY_MAX_SENSORS and (state["end_offset"] is None or offset < state["end_offset"]):
+                    state["end_offset"] = offset
+
+        workers = [ asyncio.ensure_future(fetch_pages()) for i in range(concurrency) ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+        sensors = {}
+        for offset in sorted(pages):
+            if offset > state["end_offset"]:
+                break
+            for result_sensor in pages[offset]:
+                sensors[result_sensor['id']] = result_sensor
+        return list(sensors.items())
+
+    async def query_sensors(self, **kwargs):
+        """Searches sensors that match the search query. See WotkitProxy.query_sensors.
+
+        :raises: WotkitException if a status code is not 200's"""
+        auth_credentials = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))
+
+        valid_params = set(["scope", "tags", "orgs", "visibility", "text", "active", "location", "offset", "limit"])
+        search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
+
+        try:
+            response = await self._request("GET", self.api_url + "/sensors", params=search_params, auth=auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in querying sensor. Params: " + str(search_params) + ", Error: " + str(e))
+
+        if not response.ok:
+            raise WotkitException("Error in querying sensor. Params: " + str(search_params) + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+        return _load_response_json(response)
+
+    async def register_sensor(self, registration_dict, username = None, password = None):
+        """Registers a new sensor to the WoTKit. See WotkitProxy.register_sensor.
+
+        :raises: WotkitException if a status code is not 200's"""
+        auth_credentials = self._get_login_credentials(username, password)
+        url = self.api_url+'/sensors'
+        json_data = _dump_json(registration_dict)
+        headers = {"content-type": "application/json"}
+        try:
+            response = await self._request("POST", url, auth=auth_credentials, data = json_data, headers = headers)
+        except Exception as e:
+            raise WotkitException("Error in registering sensor to url: " + url + ". Registration Data: " + str(registration_dict) + ". Error: " + str(e))
+
+        if response.ok:
+            log.debug("Success registering sensor for sensor: %s", registration_dict["name"])
+            return True
+        else:
+            msg = "Error while registering sensor '%s' to url: %s \nResp: %s"
+            raise WotkitException(msg % (registration_dict["name"], url, response.text))
+
+    async def register_multiple_sensors(self, registration_list, username = None, password = None):
+        """Registers multiple new sensor to the WoTKit in chunks of 100. See WotkitProxy.register_multiple_sensors.
+
+        :raises: WotkitException if a status code is not 200's"""
+        auth_credentials = self._get_login_credentials(username, password)
+        url = self.api_url+'/sensors'
+
+        headers = {"content-type": "application/json"}
+
+        for registration_chunk in [ registration_list[i:i+REGISTER_MAX_SENSORS] for i in range(0, len(registration_list), REGISTER_MAX_SENSORS) ]:
+            json_data = _dump_json(registration_chunk)
+            try:
+                response = await self._request("PUT", url, auth=auth_credentials, data = json_data, headers = headers)
+            except Exception as e:
+                raise WotkitException("Error in registering multiple sensors to url: " + url + ". Registration Chunk: " + str(registration_chunk) + ". Error: " + str(e))
+
+            if not response.ok:
+                raise WotkitException("Error in registering multiple sensors to url: " + url + ". Registration Chunk: " + str(registration_chunk) + ". Code: " + str(response.status_code) + ". Response: " + response.text)
+
+        log.debug("Success registering multiple sensors to url: %s", url)
+        return True
+
+    async def update_sensor(self, sensor_id, update_dict, username = None, password = None):
+        """Updates a sensor on the WoTKit. See WotkitProxy.update_sensor.
+
+        :raises: WotkitException if a status code is not 200's"""
+        auth_credentials = self._get_login_credentials(username, password)
+        sensor_id = str(sensor_id)
+        url = self.api_url + "/sensors/" + sensor_id
+        json_data = _dump_json(update_dict)
+        headers = {"content-type": "application/json"}
+        try:
+            response = await self._request("PUT", url, auth=auth_credentials, data = json_data, headers = headers)
+        except Exception as e:
+            raise WotkitException("Error in updating sensor to url: " + url + ". Update Data: " + str(update_dict) + ". Error: " + str(e))
+
+        if response.ok:
+            log.debug("Success updating sensor schema for url %s", url)
+            return True
+        else:
+            raise WotkitException("Error while updating sensor %s to url: %s  " % (sensor_id, url) + ", Reason: " + response.text)
+
+    async def delete_sensor(self, sensor_id, username = None, password = None):
+        """Delete sensor from WoTKit. See WotkitProxy.delete_sensor.
+
+        :raises: WotkitException if a status code is not 204"""
+        sensor_id = str(sensor_id)
+        url = self.api_url + "/sensors/" + sensor_id
+        auth_credentials = self._get_login_credentials(username, password)
+
+        try:
+            delete_response = await self._request("DELETE", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in deleting sensor at url: " + url + ". Error: " + str(e))
+
+        if delete_response.ok:
+            log.debug("Deleted sensor %s", sensor_id)
+            return True
+        else:
+            msg = "Failed to delete sensor %s: code: %d. Message: %s" % (sensor_id, delete_response.status_code, delete_response.text)
+            raise WotkitException(msg)
+
+    async def get_sensor_subscriptions(self, username = None, password = None):
+        """View sensors that user is subscribed to. See WotkitProxy.get_sensor_subscriptions.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: list of sensors subscribed"""
+        url = self.api_url + "/subscribe"
+        auth_credentials = self._get_login_credentials(username, password)
+        try:
+            response = await self._request("GET", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in getting sensor subscriptions at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return _load_response_json(response)
+        else:
+            raise WotkitException("Error in getting subscriptions\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def subscribe_sensor(self, sensor_id, username = None, password = None):
+        """Subscribe to sensor for user. See WotkitProxy.subscribe_sensor.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+        url = self.api_url + "/subscribe/" + sensor_id
+        auth_credentials = self._get_login_credentials(username, password)
+        try:
+            response = await self._request("PUT", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in sensor subscribe at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return True
+        else:
+            raise WotkitException("Error in sensor subscribe for sensor: " + sensor_id + ".\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def unsubscribe_sensor(self, sensor_id, username = None, password = None):
+        """Unsubscribe sensor for user. See WotkitProxy.unsubscribe_sensor.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+        url = self.api_url + "/subscribe/" + sensor_id
+        auth_credentials = self._get_login_credentials(username, password)
+        try:
+            response = await self._request("DELETE", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in sensor unsubscribe at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return True
+        else:
+            raise WotkitException("Error in sensor unsubscribe for sensor: " + sensor_id + ".\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def get_sensor_fields(self, sensor_id, field_name = None, username = None, password = None):
+        """Get sensor fields. See WotkitProxy.get_sensor_fields.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: list of sensor fields, or dict of sensor field if field_name was specified"""
+        sensor_id = str(sensor_id)
+        url = self.api_url + "/sensors/" + sensor_id + "/fields"
+        if field_name:
+            url += "/" + field_name
+        auth_credentials = self._get_login_credentials(username, password)
+
+        try:
+            response = await self._request("GET", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in getting sensor fields at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return _load_response_json(response)
+        else:
+            raise WotkitException("Error in getting sensor fields for sensor: " + sensor_id + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def update_sensor_field(self, sensor_id, field_name, field_data, username = None, password = None):
+        """Update sensor field. See WotkitProxy.update_sensor_field.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+        url = self.api_url + "/sensors/" + sensor_id + "/fields/" + field_name
+
+        auth_credentials = self._get_login_credentials(username, password)
+        json_data = _dump_json(field_data)
+        try:
+            response = await self._request("PUT", url, data = json_data, auth = auth_credentials, headers={"content-type": "application/json"})
+        except Exception as e:
+            raise WotkitException("Error in updating sensor field at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return True
+        else:
+            raise WotkitException("Error in updating sensor field at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def delete_sensor_field(self, sensor_id, field_name, username = None, password = None):
+        """Delete sensor field. See WotkitProxy.delete_sensor_field.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+        url = self.api_url + "/sensors/" + sensor_id + "/fields/" + field_name
+
+        auth_credentials = self._get_login_credentials(username, password)
+        try:
+            response = await self._request("DELETE", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in deleting sensor field at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return True
+        else:
+            raise WotkitException("Error in deleting sensor field at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def send_data_post_by_name(self, sensor_name, data, username = None, password = None):
+        """Wrapper around send_data_post that allows sending new data to a given sensor name. See WotkitProxy.send_data_post_by_name.
+
+        :raises: WotkitException if a status code is not 200's"""
+        user, pwd = self._get_login_credentials(username, password)
+        return await self.send_data_post(user + "." + sensor_name, data, user, pwd)
+
+    async def send_data_post(self, sensor_id, data, username = None, password = None):
+        """Send new data to a sensor. See WotkitProxy.send_data_post.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+        auth_credentials = self._get_login_credentials(username, password)
+        url = self.api_url+'/sensors/'+sensor_id+'/data'
+        try:
+            response = await self._request("POST", url, auth=auth_credentials, data = _str_params(data))
+        except Exception as e:
+            raise WotkitException("Error in sending new data by POST to sensor at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            log.debug("Success sending POST sensor data to url: %s", url)
+            return True
+        else:
+            raise WotkitException("Error in sending new data by POST to sensor at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def send_bulk_data_put_by_name(self, sensor_name, data, username = None, password = None):
+        """Wrapper around send_bulk_data_put that allows sending new data to a given sensor name. See WotkitProxy.send_bulk_data_put_by_name.
+
+        :raises: WotkitException if a status code is not 200's"""
+        user, pwd = self._get_login_credentials(username, password)
+        await self.send_bulk_data_put(user + "." + sensor_name, data, user, pwd)
+
+    async def send_bulk_data_put(self, sensor_id, data, username = None, password = None):
+        """Send multiple data dictionaries to WoTKit. See WotkitProxy.send_bulk_data_put.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+        json_data = _dump_json(data)
+
+        auth_credentials = self._get_login_credentials(username, password)
+        url = self.api_url+'/sensors/'+sensor_id+'/data'
+
+        try:
+            response = await self._request("PUT", url, auth=auth_credentials, data = json_data, headers = {"content-type": "application/json"})
+        except Exception as e:
+            raise WotkitException("Error in sending bulk sensor data via PUT to url: " + url + ". Error: " + str(e))
+        if response.ok:
+            log.debug("Success sending bulk PUT data to sensor url: %s", url)
+            return True
+        else:
+            raise WotkitException("Error in sending bulk data by PUT to sensor at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def delete_data(self, sensor_id, timestamp, username = None, password = None):
+        """Delete all data corresponding with timestamp. See WotkitProxy.delete_data.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+
+        auth_credentials = self._get_login_credentials(username, password)
+        url = self.api_url+'/sensors/'+sensor_id+'/data/' + str(timestamp)
+
+        try:
+            response = await self._request("DELETE", url, auth=auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in deleting sensor data to url: " + url + ". Error: " + str(e))
+        if response.ok:
+            log.debug("Success deleting data to sensor url: %s", url)
+            return True
+        else:
+            raise WotkitException("Error in deleting sensor data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def get_raw_data(self, sensor_id, **kwargs):
+        """Get raw data from a WoTKit sensor. See WotkitProxy.get_raw_data.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: list of sensor data"""
+        sensor_id = str(sensor_id)
+        auth_credentials = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))
+
+        valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "reverse"])
+        search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
+        url = self.api_url+'/sensors/'+sensor_id+'/data'
+        try:
+            response = await self._request("GET", url, auth = auth_credentials, params=search_params)
+        except Exception as e:
+            raise WotkitException("Error in getting raw data at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return _load_response_json(response)
+        else:
+            raise WotkitException("Error in getting raw data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def get_formatted_data(self, sensor_id, **kwargs):
+        """Get formatted data from a WoTKit sensor suitable for Google Visualizations. See WotkitProxy.get_formatted_data.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: bytes that are javascript, the same as WotkitProxy.get_formatted_data returns"""
+        sensor_id = str(sensor_id)
+        auth_credentials = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))
+
+        valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "reverse", "tqx", "tq"])
+        search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
+        url = self.api_url+'/sensors/'+sensor_id+'/dataTable'
+        try:
+            response = await self._request("GET", url, auth = auth_credentials, params=search_params)
+        except Exception as e:
+            raise WotkitException("Error in getting formatted data at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return response.text.encode(response.encoding)
+        else:
+            raise WotkitException("Error in getting formatted data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def get_aggregated_data(self, **kwargs):
+        """Get data from multiple sensors queried using the same parameters. See WotkitProxy.get_aggregated_data.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: list of sensor data"""
+        url = self.api_url+'/data'
+
+        auth_credentials = self._get_login_credentials(kwargs.get("username"), kwargs.get("password"))
+
+        valid_params = set(["start", "end", "after", "afterE", "before", "beforeE", "reverse"])
+        search_params = dict([ (key, str(value)) for key, value in kwargs.items() if key in valid_params ])
+
+        try:
+            response = await self._request("GET", url, auth = auth_credentials, params=search_params)
+        except Exception as e:
+            raise WotkitException("Error in getting aggregated data at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return _load_response_json(response)
+        else:
+            raise WotkitException("Error in getting aggregated data at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def send_actuator_message(self, sensor_id, **kwargs):
+        """Send actuator message to a sensor. See WotkitProxy.send_actuator_message.
+
+        :raises: WotkitException if a status code is not 200's"""
+        sensor_id = str(sensor_id)
+        url = self.api_url+'/sensors/' + sensor_id + "/message"
+        auth_credentials = self._get_login_credentials(kwargs.pop("username", None), kwargs.pop("password", None))
+
+        try:
+            response = await self._request("POST", url, auth = auth_credentials, params=_str_params(kwargs))
+        except Exception as e:
+            raise WotkitException("Error in sending actuator message at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return True
+        else:
+            raise WotkitException("Error in sending actuator message at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def subscribe_actuator(self, sensor_id, **kwargs):
+        """Subscribe to actuator. See WotkitProxy.subscribe_actuator.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: dict containing subscription id"""
+        sensor_id = str(sensor_id)
+        url = self.api_url+'/control/sub/' + sensor_id
+        auth_credentials = self._get_login_credentials(kwargs.pop("username", None), kwargs.pop("password", None))
+
+        try:
+            response = await self._request("POST", url, auth = auth_credentials, params=_str_params(kwargs))
+        except Exception as e:
+            raise WotkitException("Error in subscribing to actuator at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return _load_response_json(response)
+        else:
+            raise WotkitException("Error in subscribing to actuator at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    async def query_actuator(self, subscription_id, wait_time, **kwargs):
+        """Query actuator. See WotkitProxy.query_actuator.
+
+        :raises: WotkitException if a status code is not 200's
+        :rtype: dict of control messages"""
+        subscription_id = str(subscription_id)
+        url = self.api_url+'/control/sub/' + subscription_id + "?wait=" + str(wait_time)
+        auth_credentials = self._get_login_credentials(kwargs.pop("username", None), kwargs.pop("password", None))
+
+        try:
+            response = await self._request("GET", url, auth = auth_credentials)
+        except Exception as e:
+            raise WotkitException("Error in querying actuator at url: " + url + ". Error: " + str(e))
+
+        if response.ok:
+            return _load_response_json(response)
+        else:
+            raise WotkitException("Error in querying actuator at url: " + url + "\n Response Code: " + str(response.status_code) + "\n Response Text: " + response.text)
+
+    """ Admin functions """
+    async def get_wotkit_user(self, user_id, username = None, password = None):
+        '''Get wotkit user with user_id. Requires admin credentials in WotkitConfig'''
+        user_id = str(user_id)
+        url = self.api_url + "/users/" + user_id
+        auth_credentials = self._get_login_credentials(username, password)
+        response = await self._request("GET", url, auth = auth_credentials)
+
+        if not response.ok:
+            log.info("Wotkit account username %s not found.", user_id)
+            return None
+        else:
+            return _load_response_json(response)
+
+    async def create_wotkit_user(self, data, username = None, password = None):
+        '''Creates user given in data dictionary. Requires admin credentials in WotkitConfig'''
+        url = self.api_url + "/users"
+        auth_credentials = self._get_login_credentials(username, password)
+        json_data = _dump_json(data)
+        headers = {"content-type": "application/json"}
+
+        response = await self._request("POST", url, auth = auth_credentials, data = json_data, headers = headers)
+
+        if response.ok:
+            log.info("Created wotkit account: %s", data)
+            return True
+        else:
+            msg = "Failed to create wotkit account: " + str(data) + ", code: " + str(response.status_code) + "message: " + response.text
+            log.warning(msg)
+            raise WotkitException(msg)
+
+    async def update_wotkit_user(self, user_id, data, username = None, password = None):
+        '''Updates user user_id with data dictionary. Requires admin credentials in WotkitConfig'''
+        user_id = str(user_id)
+        url = self.api_url + "/users/" + user_id
+        auth_credentials = self._get_login_credentials(username, password)
+        json_data = _dump_json(data)
+        headers = {"content-type": "application/json"}
+        response = await self._request("PUT", url, auth = auth_credentials, data = json_data, headers = headers)
+
+        if response.ok:
+            log.info("Updated wotkit account: %s", data)
+            return True
+        else:
+            log.warning("Failed to update wotkit account: " + str(data) + ", code: " + str(response.status_code) + ", reason: " + response.text)
+            raise WotkitException(response.text)